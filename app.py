@@ -3,29 +3,88 @@
 # Implements Master Agent + 4 Worker Agents with full workflow
 
 import gradio as gr
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
-from reportlab.lib.units import inch
 import pandas as pd
 import random
 import os
 import json
 import re
+import asyncio
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+import time
+import threading
 from datetime import datetime
-import google.generativeai as genai
 from dotenv import load_dotenv
+from session_store import SessionStore
+from llm_client import make_provider, DEFAULT_MODEL, GuardedProvider, CircuitBreaker, LLMUnavailable, LLMDeadlineExceeded
+from application_store import open_application_store, RunningStatistics, JsonLinesWriter
+from turn_router import RuleRouter, tokenize, stage_intents, tenure_choice
+from crm_repository import open_customer_repository
+from entity_extractor import extract as extract_entities
+from gazetteer import load_gazetteer
+from intent_classifier import load_saved as load_intent_classifier
+import finance
+from policy_replay import PolicyReplay
+from offer_engine import offer_tiers, counter_offer
+from offer_book import OfferBook
+from pricing import default_pricing as pricing
+from underwriting_policy import default_policy as underwriting_policy
+from conversation_fsm import ConversationFSM, Stage, STAGE_NAMES, parse_stage, transition_stats
+from sanction_letter import SanctionLetterGenerator, PdfJobQueue, fork_context, new_job_id
+from response_cache import ResponseCache, CUSTOMER_PLACEHOLDER, fingerprint, credit_band, amount_bucket
 
 load_dotenv()
+
+# Sanction letters are drawn in worker processes; chat turns only queue them (see sanction_letter.py).
+# Nothing is started here, so importing this module forks nothing: the workers start in __main__ just
+# before launch, or with the first letter. They are forked because a spawn or forkserver worker would
+# re-run this whole module; where fork is unavailable or unsafe (Windows, macOS) letters are rendered
+# by one background thread instead (as with PDF_WORKERS=0). Forked workers only run reportlab and
+# write files, so the threads already running in the app do not matter to them
+pdf_context = fork_context()
+sanction_letters = PdfJobQueue(workers=int(os.getenv("PDF_WORKERS", "2")) if pdf_context else 0,
+                               mp_context=pdf_context)
+atexit.register(sanction_letters.close)
+
 api_key = os.getenv("GEMINI_API_KEY")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "true").lower() == "true"
+# LLM backend: "gemini" (needs GEMINI_API_KEY) or "stub" (offline, for load tests)
+llm_backend = make_provider(os.getenv("LLM_PROVIDER", "gemini"), api_key, os.getenv("GEMINI_MODEL", DEFAULT_MODEL))
+# Every AI call goes through the guard: bounded in-flight calls, a deadline, and a circuit breaker
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "32"))
+llm = GuardedProvider(
+    llm_backend,
+    max_in_flight=LLM_MAX_IN_FLIGHT,
+    deadline=LLM_TIMEOUT_SECONDS,
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+        p95_threshold=float(os.getenv("LLM_BREAKER_P95_SECONDS", "8")),
+        reset_timeout=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+    )
+)
+# Rule-first routing: only free text the stage's rules can't parse goes to the LLM
+turn_router = RuleRouter(lambda tokens: find_customer_name(" ".join(tokens)), threshold=float(os.getenv("ROUTER_CONFIDENCE", "0.8")))
+# Rule handlers are sync and may make short decorative AI calls; give them their own pool
+# (asyncio's default executor is only cpu_count + 4 threads)
+rule_executor = ThreadPoolExecutor(max_workers=int(os.getenv("RULE_WORKERS", "40")), thread_name_prefix="rules")
+# Shared across sessions: greeting/objection/salary texts only vary by a few bucketed fields
+ai_reply_cache = ResponseCache(
+    max_keys=int(os.getenv("LLM_CACHE_MAX_KEYS", "2048")),
+    ttl=float(os.getenv("LLM_CACHE_TTL_SECONDS", "21600")),
+    variants=int(os.getenv("LLM_CACHE_VARIANTS", "3"))
+)
 print("=" * 60)
 print("🤖 TATA CAPITAL AI LOAN ASSISTANT - AI STATUS CHECK")
 print("=" * 60)
-if api_key:
-    genai.configure(api_key=api_key)
+if llm_backend.name == "stub":
+    print(f"🧪 STUB LLM: Offline provider (median {llm_backend.median_ms:.0f} ms, error rate {llm_backend.error_rate:.0%})")
+elif llm.available:
     print("✅ GOOGLE GEMINI AI: Successfully configured and ready!")
     print(f"🔑 API Key: {api_key[:15]}...{api_key[-5:] if len(api_key) > 20 else api_key}")
     print("🚀 AI FEATURES: Enhanced greetings, smart responses, contextual conversations")
+    if os.getenv("LLM_WARMUP", "true").lower() == "true":
+        llm.warm_up_in_background(LLM_TIMEOUT_SECONDS)
 else:
     print("ℹ️ FALLBACK MODE: Running without Gemini AI - using built-in intelligent responses")
     print("💡 NOTE: App works perfectly with advanced rule-based AI system")
@@ -34,7 +93,8 @@ print("=" * 60)
 # ------------------------------
 # 1️⃣ SYNTHETIC CUSTOMER DATABASE (10+ Customers)
 # ------------------------------
-customers = {
+# Seed records for an empty CRM (see crm_repository.py)
+SEED_CUSTOMERS = {
     "Rahul": {
         "age": 32, "city": "Mumbai", "phone": "9876543210",
         "address": "Andheri West, Mumbai",
@@ -97,20 +157,72 @@ customers = {
     }
 }
 
+# CRM lookups by normalized name/phone/PAN: "memory" (the seed customers) or "sqlite"
+# (indexed, LRU of hot records; bulk-load with python crm_repository.py load customers.csv)
+crm = open_customer_repository(
+    os.getenv("CRM_BACKEND", "memory"), os.getenv("CRM_DB", "crm.db"),
+    seed=SEED_CUSTOMERS, cache_size=int(os.getenv("CRM_CACHE", "10000"))
+)
+atexit.register(crm.close)
+
+# Cities, loan types and customer names in one word-level automaton (data/cities.txt,
+# data/loan_types.txt); CRMs larger than GAZETTEER_MAX_CUSTOMERS keep name lookups in the repository
+GAZETTEER_MAX_CUSTOMERS = int(os.getenv("GAZETTEER_MAX_CUSTOMERS", "100000"))
+_gazetteer_names = crm.names(limit=GAZETTEER_MAX_CUSTOMERS + 1)
+customers_in_gazetteer = len(_gazetteer_names) <= GAZETTEER_MAX_CUSTOMERS
+gazetteer = load_gazetteer(customer_names=_gazetteer_names if customers_in_gazetteer else ())
+del _gazetteer_names
+
+
+def find_customer_name(message):
+    """Canonical name of a CRM customer mentioned in a message, or None"""
+    if customers_in_gazetteer:
+        return gazetteer.find(message, "customer")
+    return crm.find_name(tokenize(message))
+
 # Persistent storage files
 DATA_FILE = "loan_applications.csv"
-CONVERSATION_LOG = "conversation_logs.json"
+CONVERSATION_LOG = os.getenv("CONVERSATION_LOG", "conversation_logs.jsonl")  # one JSON line per conversation
+APPLICATION_STORE = os.getenv("APPLICATION_STORE", "csv")  # "csv" or "sqlite"
+APPLICATION_DB = os.getenv("APPLICATION_DB", "loan_applications.db")
+DASHBOARD_ROWS = int(os.getenv("DASHBOARD_ROWS", "500"))
 
 # Initialize files
-if not os.path.exists(DATA_FILE):
-    pd.DataFrame(columns=[
-        "Timestamp", "Customer", "Age", "City", "Amount", "Tenure", "Interest Rate",
-        "Credit Score", "Pre-Approved Limit", "Salary", "Decision", "Confidence (%)"
-    ]).to_csv(DATA_FILE, index=False)
-
-if not os.path.exists(CONVERSATION_LOG):
-    with open(CONVERSATION_LOG, 'w') as f:
-        json.dump([], f)
+application_store = open_application_store(
+    APPLICATION_STORE, DATA_FILE, APPLICATION_DB,
+    fsync_every=int(os.getenv("APPLICATION_FSYNC_EVERY", "0"))
+)
+atexit.register(application_store.close)
+
+# Incremental statistics: updated on every save, checkpointed so restarts only replay new rows
+application_stats = RunningStatistics(os.getenv("APPLICATION_STATS_CHECKPOINT", "loan_applications.stats.json"))
+application_store.attach_statistics(application_stats)
+atexit.register(application_stats.checkpoint)
+
+# Offer sheets precomputed per CRM customer; stale entries are rebuilt on first read
+offer_book = OfferBook(os.getenv("OFFER_BOOK_DB", "offer_book.db"),
+                       capacity=int(os.getenv("OFFER_BOOK_CACHE", "10000")))
+atexit.register(offer_book.close)
+
+# Finished conversations, appended one line each (closed tabs, evicted and reset sessions)
+conversation_log = JsonLinesWriter(CONVERSATION_LOG)
+atexit.register(conversation_log.close)
+
+# Offline intent classifier for free text, read from disk on the first free-text turn (trained with
+# `python intent_classifier.py train`); confident questions with a stock answer skip the LLM round trip
+intent_model = {"loaded": False, "classifier": None}
+intent_model_lock = threading.Lock()
+INTENT_CONFIDENCE = float(os.getenv("INTENT_CONFIDENCE", "0.7"))
+# Intents answered locally -> the contextual-fallback topic that answers them
+LOCAL_INTENT_TOPICS = {"rate_inquiry": "rates", "loan_inquiry": "loan", "confusion": "help"}
+
+def get_intent_classifier():
+    """The saved intent classifier, loaded once (None if no model has been trained)"""
+    with intent_model_lock:
+        if not intent_model["loaded"]:
+            intent_model["classifier"] = load_intent_classifier()
+            intent_model["loaded"] = True
+        return intent_model["classifier"]
 
 # ------------------------------
 # 2️⃣ WORKER AGENTS
@@ -120,17 +232,18 @@ class SalesAgent:
     """Negotiates loan terms and convinces customers"""
     
     @staticmethod
-    def pitch_loan(name, customer_data):
+    def pitch_loan(name, customer_data, offer=None):
         limit = customer_data["pre_approved_limit"]
         current_loans = customer_data["current_loans"]
         credit_score = customer_data["credit_score"]
+        rate = pricing.starting_rate("Personal Loan")
         
         pitch = f"""🎉 **EXCLUSIVE OFFER FOR {name.upper()}!**
 
 🚀 **You have a SPECIAL pre-approved loan of Rs.{limit:,}** waiting for you!
 
 ✨ **Your VIP Benefits:**
-- 🏆 **Premium rate**: Just **10.99% p.a.** (Market rate: 12-18%)
+- 🏆 **Premium rate**: Just **{rate:g}% p.a.** (Market rate: 12-18%)
 - ⚡ **30-second approval** - No waiting, no hassles!
 - 💳 **Flexible EMIs**: Choose 12-60 months
 - 🎯 **Zero processing fees** (Save Rs.{int(limit*0.02):,}!)
@@ -143,6 +256,10 @@ class SalesAgent:
         elif credit_score >= 700:
             pitch += f"✅ **QUALIFIED CUSTOMER** - Your good credit score ({credit_score}) ensures **INSTANT APPROVAL**!\n\n"
             
+        if offer and offer["tiers"]:
+            top = offer["tiers"][-1]
+            pitch += f"📒 **Your offer sheet**: Up to **Rs.{offer['max_eligible']:,}** | Rs.{top['amount']:,} from **Rs.{top['emi_36']:,.0f}/month** over 36 months\n\n"
+            
         if current_loans:
             pitch += f"🤝 **LOYAL CUSTOMER BONUS** - Existing relationship = **Additional 0.25% discount**!\n\n"
         
@@ -156,22 +273,16 @@ Type your amount like: **"I need 2 lakh"** or **"Rs.300000"** 👇"""
         return pitch
     
     @staticmethod
-    def negotiate_terms(amount, tenure=None, rate=None, loan_type="Personal Loan"):
+    def negotiate_terms(amount, tenure=None, rate=None, loan_type="Personal Loan", credit_score=None):
         """Provides flexible loan terms"""
         if not tenure:
             tenure = 24 if amount <= 200000 else 36
         if not rate:
-            # Special rates for different loan types
-            if loan_type == "Medical Loan":
-                rate = 9.99 if amount <= 300000 else 10.5
-            elif loan_type == "Home Renovation Loan":
-                rate = 10.5 if amount <= 300000 else 11.0
-            elif loan_type == "Education Loan":
-                rate = 10.25 if amount <= 300000 else 10.75
-            else:
-                rate = 10.99 if amount <= 300000 else 11.5
+            # Loan type x credit band x amount band (see pricing.py / data/pricing.json)
+            rate = pricing.price_one(loan_type, credit_score, amount)
+        loan_type = loan_type or "Personal Loan"
         
-        emi = (amount * rate/100/12 * (1 + rate/100/12)**tenure) / ((1 + rate/100/12)**tenure - 1)
+        emi = finance.emi(amount, rate, tenure)
         
         # Add special benefits message
         special_msg = ""
@@ -186,7 +297,7 @@ Type your amount like: **"I need 2 lakh"** or **"Rs.300000"** 👇"""
 ━━━━━━━━━━━━━━━━━━━━
 💰 Loan Amount: Rs.{amount:,}
 ⏱️ Tenure: {tenure} months  
-📊 Interest Rate: {rate}% p.a.
+📊 Interest Rate: {rate:g}% p.a.
 💳 Monthly EMI: Rs.{emi:,.2f}
 🎯 Loan Type: {loan_type}{special_msg}
 ━━━━━━━━━━━━━━━━━━━━
@@ -199,11 +310,11 @@ class VerificationAgent:
     
     def verify_kyc(self, name, customer_data=None):
         # Handle existing customers
-        if name in customers:
-            data = customers[name]
+        data = crm.get(name)
+        if data is not None:
             if data["kyc"]:
                 # Update verification timestamp in database
-                customers[name]["last_verified"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                crm.update(name, last_verified=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
                 
                 return f"""✅ **KYC Verification Successful** ✅
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -273,28 +384,25 @@ class UnderwritingAgent:
     
     def fetch_credit_score(self, name, customer_data=None):
         """Mock Credit Bureau API Call"""
-        if name in customers:
-            return customers[name]["credit_score"]
+        data = crm.get(name)
+        if data is not None:
+            return data["credit_score"]
         elif customer_data:
             return customer_data["credit_score"]
         return None
     
     def assess_eligibility(self, name, amount, tenure=24, customer_data=None):
-        # Handle existing customers
-        if name in customers:
-            data = customers[name]
-        # Handle new customers
-        elif customer_data:
-            data = customer_data
-        else:
+        # Existing customers come from the CRM, new customers bring their own data
+        data = crm.get(name) or customer_data
+        if not data:
             return "❌ Customer data not available."
         score = data["credit_score"]
         limit = data["pre_approved_limit"]
         salary = data["salary"]
         
         # Calculate EMI
-        rate = 11.5
-        emi = (amount * rate/100/12 * (1 + rate/100/12)**tenure) / ((1 + rate/100/12)**tenure - 1)
+        rate = pricing.price_one("Personal Loan", score, amount)
+        emi = finance.emi(amount, rate, tenure)
         emi_to_salary_ratio = (emi / salary) * 100
         
         confidence = random.randint(82, 98)
@@ -359,109 +467,119 @@ Consider applying for Rs.{limit:,} for instant approval."""
         return result
 
 
-class SanctionLetterGenerator:
-    """Generates PDF sanction letter"""
-    
-    @staticmethod
-    def generate_pdf(name, amount, tenure, rate, customer_data):
-        filename = f"sanction_letter_{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        
-        c = canvas.Canvas(filename, pagesize=letter)
-        width, height = letter
-        
-        # Header
-        c.setFillColor(colors.HexColor('#1E3A8A'))
-        c.rect(0, height - 1.5*inch, width, 1.5*inch, fill=True, stroke=False)
-        
-        c.setFillColor(colors.white)
-        c.setFont("Helvetica-Bold", 24)
-        c.drawString(1*inch, height - 1*inch, "TATA CAPITAL")
-        c.setFont("Helvetica", 12)
-        c.drawString(1*inch, height - 1.2*inch, "Financial Services Limited")
-        
-        # Date and Reference
-        c.setFillColor(colors.black)
-        c.setFont("Helvetica", 10)
-        c.drawString(1*inch, height - 2*inch, f"Date: {datetime.now().strftime('%d %B %Y')}")
-        c.drawString(1*inch, height - 2.2*inch, f"Reference No: TC/PL/{random.randint(100000, 999999)}")
-        
-        # Title
-        c.setFont("Helvetica-Bold", 16)
-        c.drawString(1*inch, height - 2.8*inch, "PERSONAL LOAN SANCTION LETTER")
-        
-        # Customer Details
-        c.setFont("Helvetica-Bold", 11)
-        c.drawString(1*inch, height - 3.3*inch, "Customer Details:")
-        c.setFont("Helvetica", 10)
-        y_pos = height - 3.5*inch
-        details = [
-            f"Name: {name}",
-            f"Address: {customer_data['address']}",
-            f"Phone: {customer_data['phone']}",
-        ]
-        for detail in details:
-            c.drawString(1.2*inch, y_pos, detail)
-            y_pos -= 0.2*inch
-        
-        # Loan Details
-        c.setFont("Helvetica-Bold", 11)
-        c.drawString(1*inch, y_pos - 0.3*inch, "Loan Details:")
-        y_pos -= 0.5*inch
-        
-        emi = (amount * rate/100/12 * (1 + rate/100/12)**tenure) / ((1 + rate/100/12)**tenure - 1)
-        
-        c.setFont("Helvetica", 10)
-        loan_details = [
-            f"Sanctioned Amount: Rs.{amount:,}",
-            f"Interest Rate: {rate}% per annum",
-            f"Loan Tenure: {tenure} months",
-            f"Monthly EMI: Rs.{emi:,.2f}",
-            f"Processing Fee: Rs.{int(amount * 0.02):,} (2% of loan amount)",
-        ]
-        for detail in loan_details:
-            c.drawString(1.2*inch, y_pos, detail)
-            y_pos -= 0.2*inch
-        
-        # Terms
-        c.setFont("Helvetica-Bold", 11)
-        c.drawString(1*inch, y_pos - 0.3*inch, "Terms & Conditions:")
-        y_pos -= 0.5*inch
-        c.setFont("Helvetica", 9)
-        terms = [
-            "- This sanction is valid for 30 days from the date of issue",
-            "- Final disbursement subject to verification of documents",
-            "- Pre-payment charges: 2% on outstanding principal",
-            "- Please visit the nearest branch to complete formalities",
-        ]
-        for term in terms:
-            c.drawString(1*inch, y_pos, term)
-            y_pos -= 0.18*inch
-        
-        # Footer
-        c.setFont("Helvetica-Bold", 10)
-        c.drawString(1*inch, 1.5*inch, "For Tata Capital Financial Services Ltd.")
-        c.drawString(1*inch, 1*inch, "Authorized Signatory")
-        
-        c.setFont("Helvetica-Oblique", 8)
-        c.drawString(1*inch, 0.5*inch, "This is a computer-generated document and does not require a physical signature.")
-        
-        c.save()
-        return os.path.abspath(filename)
-
-
 # ------------------------------
 # 3️⃣ MASTER AGENT (Orchestrator)
 # ------------------------------
 
+# Structured output for the AI-first turn: reply, stage update and extracted fields in one call
+TURN_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "reply": {"type": "string"},
+        # Every stage the conversation can be in (the only values the AI may move to)
+        "stage_update": {"type": "string", "enum": STAGE_NAMES + ["none"]},
+        "extracted": {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "salary": {"type": "integer"},
+                "city": {"type": "string"},
+                "loan_amount": {"type": "integer"},
+                "loan_type": {"type": "string"},
+                "phone": {"type": "string"}
+            }
+        }
+    },
+    "required": ["reply", "stage_update"]
+}
+
+EXTRACTED_FIELD_TYPES = {
+    "name": str, "salary": int, "city": str,
+    "loan_amount": int, "loan_type": str, "phone": str
+}
+
+
+# Streamed turns can't use JSON mode, so the model writes the reply first and
+# finishes with these trailer lines, which are held back from the chat window
+STREAM_TRAILER_MARKER = "STAGE_UPDATE:"
+STREAM_EXTRACTED_MARKER = "EXTRACTED:"
+
+
+def parse_turn_response(raw_turn):
+    """Validate a structured AI turn against TURN_RESPONSE_SCHEMA; returns None if it doesn't match"""
+    try:
+        data = json.loads(raw_turn)
+    except (TypeError, ValueError):
+        return None
+    return validate_turn(data)
+
+
+def parse_stream_trailer(reply, trailer):
+    """Build a validated turn from a streamed reply and the text after its STAGE_UPDATE marker"""
+    stage_update, extracted = None, {}
+    if trailer:
+        stage_part, _, extracted_part = trailer.partition(STREAM_EXTRACTED_MARKER)
+        stage_update = stage_part.strip(" \n\t`*.\"'") or None
+        json_match = re.search(r"\{.*\}", extracted_part, re.DOTALL)
+        if json_match:
+            try:
+                extracted = json.loads(json_match.group(0))
+            except ValueError:
+                print("⚠️ AI STREAM TRAILER: EXTRACTED was not valid JSON, ignoring it")
+    return validate_turn({"reply": reply, "stage_update": stage_update, "extracted": extracted})
+
+
+def validate_turn(data):
+    """Check a decoded turn dict against TURN_RESPONSE_SCHEMA; returns None if it doesn't match"""
+    if not isinstance(data, dict):
+        return None
+    
+    reply = data.get("reply")
+    if not isinstance(reply, str) or not reply.strip():
+        return None
+    
+    stage_update = data.get("stage_update")
+    stage = parse_stage(stage_update)
+    if stage is None:
+        if stage_update not in (None, "", "none"):
+            print(f"⚠️ AI STAGE UPDATE REJECTED: Unknown stage '{stage_update}'")
+        stage_update = None
+    else:
+        stage_update = stage.value
+    
+    extracted = data.get("extracted")
+    fields = {}
+    if isinstance(extracted, dict):
+        for key, field_type in EXTRACTED_FIELD_TYPES.items():
+            value = extracted.get(key)
+            if value is None or isinstance(value, bool):
+                continue
+            if field_type is int:
+                if isinstance(value, str):
+                    digits = "".join(filter(str.isdigit, value))
+                    value = int(digits) if digits else None
+                elif isinstance(value, (int, float)):
+                    value = int(value)
+                else:
+                    value = None
+                if value and value > 0:
+                    fields[key] = value
+            elif isinstance(value, str) and value.strip():
+                fields[key] = value.strip()
+    
+    return {"reply": reply.strip(), "stage_update": stage_update, "extracted": fields}
+
+
 class MasterAgent:
     def __init__(self):
         self.context = {}
-        self.conversation_stage = "greeting"
+        self.fsm = ConversationFSM()
         self.sales_agent = SalesAgent()
         self.verification_agent = VerificationAgent()
         self.underwriting_agent = UnderwritingAgent()
-        self.sanction_generator = SanctionLetterGenerator()
         self.conversation_history = []
+        self.turn_routes = []  # (stage, route, confidence, message) per turn: "rules", "intent", "llm" or "fallback"
+        self.last_route = None
         self.full_chat_context = []  # Store complete conversation for AI context
         self.entry_scenario = random.choice([
             "clicking our Instagram festive personal loan ad",
@@ -472,28 +590,114 @@ class MasterAgent:
         ])
         self.context["entry_scenario"] = self.entry_scenario
     
-    def _get_ai_response(self, prompt, fallback_response):
+    @property
+    def conversation_stage(self):
+        return self.fsm.stage.value
+    
+    @conversation_stage.setter
+    def conversation_stage(self, stage):
+        self.fsm.transition(stage, source="rules")
+    
+    def _get_ai_response(self, prompt, fallback_response, response_schema=None, with_context=True):
         """Get AI response with full conversation context"""
         try:
-            if api_key:
-                print("🤖 AI ACTIVE: Using Google Gemini AI with full conversation context...")
+            if llm.available:
+                print(f"🤖 AI ACTIVE: Using {llm.label} with full conversation context...")
+                
+                # Build comprehensive context for AI (cacheable prompts go out bare so the reply depends only on the prompt)
+                context_prompt = self._build_full_context_prompt(prompt) if with_context else prompt
+                
+                response_text = llm.generate(context_prompt, response_schema, timeout=LLM_TIMEOUT_SECONDS)
+                print(f"✅ AI SUCCESS: Generated {len(response_text)} character response with full context")
+                print(f"🎯 AI RESPONSE PREVIEW: {response_text[:100]}...")
+                return response_text
+            else:
+                print("💡 FALLBACK MODE: Using built-in intelligent responses (AI unavailable)")
+                return fallback_response
+        except LLMUnavailable as e:
+            print(f"⚡ AI BYPASSED: {e} - using built-in intelligent responses")
+            return fallback_response
+        except LLMDeadlineExceeded:
+            print(f"⏱️ AI TIMEOUT: No response within {LLM_TIMEOUT_SECONDS:.0f}s")
+            print("🔄 SWITCHING TO FALLBACK: Using built-in intelligent responses")
+            return fallback_response
+        except Exception as e:
+            print(f"❌ AI ERROR: {e}")
+            print("🔄 SWITCHING TO FALLBACK: Using built-in intelligent responses")
+            return fallback_response
+    
+    def _get_cached_ai_response(self, kind, fields, prompt):
+        """Decorative AI text served from ai_reply_cache when the same (bucketed) prompt was seen before"""
+        key = fingerprint(kind, **fields)
+        reply = ai_reply_cache.get(key)
+        if reply is not None:
+            print(f"🧠 AI CACHE HIT: {kind} {fields}")
+        else:
+            reply = self._get_ai_response(prompt, "", with_context=False)
+            ai_reply_cache.put(key, reply)
+        return reply.replace(CUSTOMER_PLACEHOLDER, self.context.get("name", "there"))
+    
+    async def _get_ai_response_async(self, prompt, fallback_response, response_schema=None):
+        """Non-blocking version of _get_ai_response using the async Gemini client"""
+        try:
+            if llm.available:
+                print(f"🤖 AI ACTIVE (async): Using {llm.label} with full conversation context...")
                 
-                # Build comprehensive context for AI
                 context_prompt = self._build_full_context_prompt(prompt)
                 
-                model = genai.GenerativeModel('gemini-2.5-flash')
-                response = model.generate_content(context_prompt)
-                print(f"✅ AI SUCCESS: Generated {len(response.text)} character response with full context")
-                print(f"🎯 AI RESPONSE PREVIEW: {response.text[:100]}...")
-                return response.text
+                response_text = await llm.generate_async(context_prompt, response_schema, timeout=LLM_TIMEOUT_SECONDS)
+                print(f"✅ AI SUCCESS: Generated {len(response_text)} character response with full context")
+                return response_text
             else:
-                print("💡 FALLBACK MODE: Using built-in intelligent responses (no API key)")
+                print("💡 FALLBACK MODE: Using built-in intelligent responses (AI unavailable)")
                 return fallback_response
+        except LLMUnavailable as e:
+            print(f"⚡ AI BYPASSED: {e} - using built-in intelligent responses")
+            return fallback_response
+        except LLMDeadlineExceeded:
+            print(f"⏱️ AI TIMEOUT: No response within {LLM_TIMEOUT_SECONDS:.0f}s")
+            print("🔄 SWITCHING TO FALLBACK: Using built-in intelligent responses")
+            return fallback_response
         except Exception as e:
             print(f"❌ AI ERROR: {e}")
             print("🔄 SWITCHING TO FALLBACK: Using built-in intelligent responses")
             return fallback_response
     
+    async def _stream_ai_response_async(self, prompt):
+        """Yield text chunks from a streamed LLM call; yields nothing when no LLM is available.
+        Errors are logged and re-raised, so a stream cut off part-way is never mistaken for a complete reply"""
+        if not llm.available:
+            return
+        try:
+            print(f"🤖 AI ACTIVE (stream): Streaming {llm.label} response...")
+            context_prompt = self._build_full_context_prompt(prompt)
+            
+            started = time.perf_counter()
+            # The guard's deadline bounds the whole reply, not just the wait for each chunk
+            stream = llm.stream_async(context_prompt, timeout=LLM_TIMEOUT_SECONDS)
+            first_token = True
+            try:
+                async for chunk in stream:
+                    if not chunk:
+                        continue
+                    if first_token:
+                        print(f"⚡ AI FIRST TOKEN: {(time.perf_counter() - started) * 1000:.0f} ms")
+                        first_token = False
+                    yield chunk
+            finally:
+                # Close the guarded stream now so its in-flight slot is freed even if the client left
+                await stream.aclose()
+            print(f"✅ AI STREAM COMPLETE: {(time.perf_counter() - started) * 1000:.0f} ms")
+        except LLMUnavailable as e:
+            print(f"⚡ AI BYPASSED: {e} - using built-in intelligent responses")
+            raise
+        except LLMDeadlineExceeded:
+            print(f"⏱️ AI STREAM TIMEOUT: Reply not finished within {LLM_TIMEOUT_SECONDS:.0f}s")
+            raise
+        except Exception as e:
+            print(f"❌ AI STREAM ERROR: {e}")
+            raise
+    
     def _build_full_context_prompt(self, current_prompt):
         """Build comprehensive AI prompt with full conversation context"""
         # Get conversation history
@@ -563,39 +767,195 @@ Respond naturally as if you're having a real conversation:
         else:
             return ["✅ Yes", "❌ No", "📞 Tell me more", "🔄 Start over"]
     
-    def process_message(self, message, history):
-        # Store conversation in full context
-        if len(self.full_chat_context) > 0:
-            # Add user message to context
-            pass  # Will be added after AI response
-        
-        print(f"🧠 PROCESSING MESSAGE: '{message}' in stage '{self.conversation_stage}'")
+    def _turn(self, message, mode=""):
+        """One chat turn, whichever way the AI is called. A generator that yields "rules" when the
+        rule handler must answer and "ai" when the AI should try, is sent back that answer (the AI's
+        applied reply, or None if it had none), and returns the turn's reply. process_message,
+        process_message_async and process_message_stream drive it with a blocking call, an awaited
+        call or a stream"""
+        print(f"🧠 PROCESSING MESSAGE{mode}: '{message}' in stage '{self.conversation_stage}'")
 
         direct_response = self._handle_pan_submission(message)
         if direct_response:
+            self._record_route("kyc_verification", "rules", 1.0, message)
             self.full_chat_context.append((message, direct_response))
             return direct_response
         
-        # AI-FIRST APPROACH: Let AI handle everything with context
-        ai_response = self._get_intelligent_ai_response(message)
+        # RULE-FIRST: buttons and simple answers are handled deterministically, without a network call
+        stage = self.conversation_stage
+        route, confidence = turn_router.route(self, message)
+        if route == "rules":
+            self._record_route(stage, "rules", confidence, message)
+            response = yield "rules"
+            self.full_chat_context.append((message, response))
+            return response
+        
+        # Questions the intent classifier is sure about get their stock answer without a network call
+        local_response = self._local_intent_response(message)
+        if local_response:
+            self._record_route(stage, "intent", confidence, message)
+            self.full_chat_context.append((message, local_response))
+            return local_response
+        
+        # Free text the rules can't parse goes to the AI with full context
+        ai_response = yield "ai"
         if ai_response:
-            # Add to conversation history
+            self._record_route(stage, "llm", confidence, message)
             self.full_chat_context.append((message, ai_response))
             return ai_response
         
         # Fallback to rule-based if AI fails
-        return self._handle_rule_based_response(message)
+        self._record_route(stage, "fallback", confidence, message)
+        return (yield "rules")
+    
+    def process_message(self, message, history):
+        turn = self._turn(message)
+        try:
+            step = next(turn)
+            while True:
+                if step == "rules":
+                    step = turn.send(self._handle_rule_based_response(message))
+                else:
+                    step = turn.send(self._get_intelligent_ai_response(message))
+        except StopIteration as done:
+            return done.value
+    
+    async def process_message_async(self, message, history):
+        """Async version of process_message; the AI-first Gemini call never blocks a worker thread"""
+        turn = self._turn(message, " (async)")
+        try:
+            step = next(turn)
+            while True:
+                if step == "rules":
+                    # Rule handlers may still make short decorative AI calls, so keep them off the event loop
+                    step = turn.send(await self._run_rules_async(message))
+                else:
+                    step = turn.send(await self._get_intelligent_ai_response_async(message))
+        except StopIteration as done:
+            return done.value
+    
+    async def _run_rules_async(self, message):
+        """Run the sync rule handler on rule_executor so the event loop stays free"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(rule_executor, self._handle_rule_based_response, message)
+    
+    def _record_route(self, stage, route, confidence, message):
+        """Remember which path answered this turn (per session and process-wide)"""
+        turn_router.record(route)
+        self.last_route = route
+        self.turn_routes.append((stage, route, round(confidence, 2), message))
+        print(f"🧭 ROUTE: {route} (stage '{stage}', rule confidence {confidence:.2f})")
+    
+    async def process_message_stream(self, message, history):
+        """Stream the reply for a turn, yielding the visible text so far after each chunk"""
+        if not STREAM_RESPONSES:
+            yield await self.process_message_async(message, history)
+            return
+        
+        turn = self._turn(message, " (stream)")
+        try:
+            step = next(turn)
+            while True:
+                if step == "rules":
+                    answer = await self._run_rules_async(message)
+                else:
+                    streamed = {}
+                    async for partial in self._stream_intelligent_ai_response(message, streamed):
+                        yield partial
+                    answer = streamed.get("reply")
+                step = turn.send(answer)
+        except StopIteration as done:
+            yield done.value
+    
+    async def _stream_intelligent_ai_response(self, message, streamed):
+        """Stream the AI-first reply, yielding the visible text so far; the applied reply is left in
+        streamed["reply"] (absent if the stream failed, was cut off or was empty)"""
+        raw = ""
+        shown = 0
+        # Keep back enough characters to catch a trailer marker split across chunks
+        holdback = len(STREAM_TRAILER_MARKER) - 1
+        try:
+            async for chunk in self._stream_ai_response_async(self._build_intelligent_prompt(message, streaming=True)):
+                raw += chunk
+                marker_at = raw.find(STREAM_TRAILER_MARKER)
+                visible_end = marker_at if marker_at != -1 else max(len(raw) - holdback, 0)
+                if visible_end > shown:
+                    shown = visible_end
+                    yield raw[:shown].rstrip()
+        except Exception:
+            # A reply cut off part-way is not a turn: drop it (and its missing trailer) and let the rules answer
+            if raw:
+                print(f"⚠️ AI STREAM: Discarding {len(raw)} characters of an interrupted reply")
+            return
+        
+        reply, _, trailer = raw.partition(STREAM_TRAILER_MARKER)
+        turn = parse_stream_trailer(reply, trailer)
+        if turn:
+            streamed["reply"] = self._apply_turn(turn)
+        elif raw:
+            print("⚠️ AI STREAM: Reply was empty after removing the trailer")
     
     def _get_intelligent_ai_response(self, message):
         """Get intelligent AI response that can handle any message dynamically"""
         try:
-            if not api_key:
+            if not llm.available:
                 return None
                 
             print("🧠 AI INTELLIGENCE: Analyzing message with full conversation context...")
             
-            # Create comprehensive AI prompt for dynamic conversation handling
-            ai_prompt = f"""
+            # One structured call returns the reply, the stage update and any new customer details
+            raw_turn = self._get_ai_response(self._build_intelligent_prompt(message), None, TURN_RESPONSE_SCHEMA)
+            if not raw_turn:
+                return None
+            
+            turn = parse_turn_response(raw_turn)
+            if not turn:
+                print("⚠️ AI STRUCTURED OUTPUT: Response did not match the turn schema")
+                return None
+            
+            return self._apply_turn(turn)
+            
+        except Exception as e:
+            print(f"❌ AI INTELLIGENCE ERROR: {str(e)}")
+            return None
+    
+    async def _get_intelligent_ai_response_async(self, message):
+        """Async version of _get_intelligent_ai_response"""
+        try:
+            if not llm.available:
+                return None
+            
+            print("🧠 AI INTELLIGENCE (async): Analyzing message with full conversation context...")
+            
+            raw_turn = await self._get_ai_response_async(self._build_intelligent_prompt(message), None, TURN_RESPONSE_SCHEMA)
+            if not raw_turn:
+                return None
+            
+            turn = parse_turn_response(raw_turn)
+            if not turn:
+                print("⚠️ AI STRUCTURED OUTPUT: Response did not match the turn schema")
+                return None
+            
+            return self._apply_turn(turn)
+            
+        except Exception as e:
+            print(f"❌ AI INTELLIGENCE ERROR: {str(e)}")
+            return None
+    
+    def _build_intelligent_prompt(self, message, streaming=False):
+        """Prompt for the AI-first turn; the reply format is enforced by TURN_RESPONSE_SCHEMA or the stream trailer"""
+        if streaming:
+            output_format = f"""WRITE YOUR REPLY TO THE CUSTOMER FIRST, then end with exactly these two lines:
+{STREAM_TRAILER_MARKER} <the stage the conversation should move to, or none to stay in the current stage>
+{STREAM_EXTRACTED_MARKER} <JSON object with only NEW information from the customer's message (name, salary, city, loan_amount, loan_type, phone), or {{}}>
+"""
+        else:
+            output_format = """RETURN JSON WITH:
+- reply: your message to the customer
+- stage_update: the stage the conversation should move to, or "none" to stay in the current stage
+- extracted: only NEW information from the customer's message (name, salary, city, loan_amount, loan_type, phone); omit anything not mentioned
+"""
+        return f"""
 You are an expert loan assistant AI for Tata Capital NBFC. You have full conversation context and can handle ANY customer message dynamically.
 
 CURRENT SITUATION:
@@ -615,7 +975,7 @@ YOUR TASK:
 2. DETERMINE what stage they should be in based on their message
 3. RESPOND appropriately and naturally 
 4. ADVANCE the conversation toward loan completion
-5. UPDATE conversation stage if needed (mention: "STAGE_UPDATE: new_stage_name" at the end)
+5. EXTRACT any new customer details they shared in this message
 
 EXAMPLES OF DYNAMIC HANDLING:
 - If they say "I need money for medical emergency" -> Identify as medical loan need, move to loan_type_selection
@@ -626,98 +986,30 @@ EXAMPLES OF DYNAMIC HANDLING:
 
 Be conversational, natural, helpful, and always guide toward loan completion.
 Respond as if you're a helpful human loan expert having a natural conversation.
-"""
-            
-            response = self._get_ai_response(ai_prompt, None)
-            
-            if response:
-                # Extract context updates from AI response
-                self._extract_context_from_ai_response(message, response)
-                
-                # Check if AI suggested stage update
-                if "STAGE_UPDATE:" in response:
-                    parts = response.split("STAGE_UPDATE:")
-                    response = parts[0].strip()
-                    if len(parts) > 1:
-                        new_stage = parts[1].strip()
-                        print(f"🔄 AI STAGE UPDATE: {self.conversation_stage} -> {new_stage}")
-                        self.conversation_stage = new_stage
-            
-            return response
-            
-        except Exception as e:
-            print(f"❌ AI INTELLIGENCE ERROR: {str(e)}")
-            return None
-    
-    def _extract_context_from_ai_response(self, user_message, ai_response):
-        """Extract and update context from AI conversation"""
-        try:
-            if not api_key:
-                return
-                
-            print("🔍 AI CONTEXT EXTRACTION: Updating customer context from conversation...")
-            
-            extraction_prompt = f"""
-Analyze this conversation exchange and extract any customer information to update our records:
 
-Customer said: "{user_message}"
-AI responded: "{ai_response}"
-
-Current context: {self.context}
-
-Extract and return ONLY the new information in this format:
-NAME: [if customer mentioned their name]
-SALARY: [if customer mentioned salary/income]
-CITY: [if customer mentioned location]
-LOAN_AMOUNT: [if customer mentioned how much they need]
-LOAN_TYPE: [if customer mentioned loan type/purpose]
-PHONE: [if customer mentioned phone number]
-
-Only return fields that have NEW information. If nothing new, return "NO_NEW_INFO"
-"""
-            
-            context_update = self._get_ai_response(extraction_prompt, "NO_NEW_INFO")
-            
-            if context_update and context_update != "NO_NEW_INFO":
-                # Parse and update context
-                lines = context_update.split('\n')
-                for line in lines:
-                    if ':' in line:
-                        key, value = line.split(':', 1)
-                        key = key.strip().lower()
-                        value = value.strip()
-                        
-                        if value and value != '[if customer mentioned their name]':  # Skip template text
-                            if key == 'name' and 'name' not in self.context:
-                                self.context['name'] = value
-                                print(f"📝 CONTEXT UPDATE: Name = {value}")
-                            elif key == 'salary' and 'salary' not in self.context:
-                                try:
-                                    salary_num = int(''.join(filter(str.isdigit, value)))
-                                    self.context['salary'] = salary_num
-                                    print(f"📝 CONTEXT UPDATE: Salary = Rs.{salary_num:,}")
-                                except:
-                                    pass
-                            elif key == 'city' and 'city' not in self.context:
-                                self.context['city'] = value
-                                print(f"📝 CONTEXT UPDATE: City = {value}")
-                            elif key == 'loan_amount' and 'amount' not in self.context:
-                                try:
-                                    amount = int(''.join(filter(str.isdigit, value)))
-                                    self.context['amount'] = amount
-                                    print(f"📝 CONTEXT UPDATE: Loan Amount = Rs.{amount:,}")
-                                except:
-                                    pass
-                            elif key == 'loan_type' and 'loan_type' not in self.context:
-                                self.context['loan_type'] = value
-                                print(f"📝 CONTEXT UPDATE: Loan Type = {value}")
-                                
-        except Exception as e:
-            print(f"❌ CONTEXT EXTRACTION ERROR: {e}")
-            
-        except Exception as e:
-            print(f"❌ AI INTELLIGENCE ERROR: {e}")
-            return None
+{output_format}"""
+    
+    def _apply_turn(self, turn):
+        """Apply a validated structured turn to the conversation and return the reply text"""
+        self._apply_extracted_context(turn["extracted"])
+        
+        new_stage = turn["stage_update"]
+        if new_stage and new_stage != self.conversation_stage:
+            previous = self.conversation_stage
+            # The FSM rejects moves the transition table doesn't allow
+            if self.fsm.transition(new_stage, source="llm"):
+                print(f"🔄 AI STAGE UPDATE: {previous} -> {new_stage}")
+        
+        return turn["reply"]
+    
+    def _apply_extracted_context(self, fields):
+        """Update context with customer details the AI extracted (never overwrites known values)"""
+        for key, context_key in (("name", "name"), ("salary", "salary"), ("city", "city"),
+                                 ("loan_amount", "amount"), ("loan_type", "loan_type"), ("phone", "phone")):
+            value = fields.get(key)
+            if value and context_key not in self.context:
+                self.context[context_key] = value
+                print(f"📝 CONTEXT UPDATE: {context_key} = {value}")
     
     def _handle_pan_submission(self, message):
         """Handle PAN inputs immediately to avoid stalled conversations"""
@@ -729,9 +1021,8 @@ Only return fields that have NEW information. If nothing new, return "NO_NEW_INF
 
         if self.conversation_stage == "kyc_verification":
             name = self.context.get("name")
-            if name in customers:
-                customers[name]["kyc"] = True
-                customers[name]["last_verified"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            if crm.get(name) is not None:
+                crm.update(name, kyc=True, last_verified=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
             self.context.setdefault("kyc_documents", {})["pan"] = pan_number
             self.conversation_stage = "sales_pitch"
 
@@ -764,29 +1055,35 @@ Only return fields that have NEW information. If nothing new, return "NO_NEW_INF
 
         msg = message.strip().lower()
         
-        # Stage 1: Greeting & Identification
-        if self.conversation_stage == "greeting":
-            if any(word in msg for word in ["hello", "hi", "hey", "start"]):
-                return self._greet_customer()
-            elif any(name.lower() in msg for name in customers.keys()):
-                return self._identify_customer(message)
-            else:
-                # Accept any name input
-                return self._identify_customer(message)
-        
-        # Stage 2: Identification  
-        elif self.conversation_stage == "identification":
+        # O(1) dispatch on the current stage; stages without rules (completed) return None
+        handler = RULE_HANDLERS.get(self.fsm.stage)
+        if handler is None:
+            return None
+        return handler(self, message, msg)
+    
+    def _rules_greeting(self, message, msg):
+        """Greeting & Identification"""
+        if stage_intents.classify("greeting", tokenize(message)) == "greet":
+            return self._greet_customer()
+        elif find_customer_name(msg):
             return self._identify_customer(message)
-        
-        # Stage 2.3: KYC Verification for existing customers
-        elif self.conversation_stage == "kyc_verification":
-            if any(word in msg for word in ["yes", "complete", "verify", "proceed", "ok"]):
-                # Simulate KYC completion for demo
-                customers[self.context["name"]]["kyc"] = True
-                customers[self.context["name"]]["last_verified"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                self.conversation_stage = "sales_pitch"
-                
-                return f"""✅ **KYC Verification Completed Successfully!** ✅
+        else:
+            # Accept any name input
+            return self._identify_customer(message)
+    
+    def _rules_identification(self, message, msg):
+        """Identification"""
+        return self._identify_customer(message)
+    
+    def _rules_kyc_verification(self, message, msg):
+        """KYC Verification for existing customers"""
+        intent = stage_intents.classify("kyc_verification", tokenize(message))
+        if intent == "yes":
+            # Simulate KYC completion for demo
+            crm.update(self.context["name"], kyc=True, last_verified=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            self.conversation_stage = "sales_pitch"
+            
+            return f"""✅ **KYC Verification Completed Successfully!** ✅
 
 🎉 **{self.context["name"]}, your profile is now fully verified!**
 
@@ -802,9 +1099,9 @@ Only return fields that have NEW information. If nothing new, return "NO_NEW_INF
 
 🚀 **Now you're eligible for instant loan approval!**
 Ready to explore your exclusive pre-approved offers? 💰"""
-            
-            elif any(word in msg for word in ["no", "later", "skip"]):
-                return """⚠️ **KYC verification is mandatory** for loan processing as per RBI guidelines.
+        
+        elif intent == "no":
+            return """⚠️ **KYC verification is mandatory** for loan processing as per RBI guidelines.
 
 📋 **What you can do:**
 - ✅ Complete KYC now (takes 5 minutes)
@@ -814,9 +1111,9 @@ Ready to explore your exclusive pre-approved offers? 💰"""
 
 **Without KYC, I cannot proceed with your loan application.**
 Would you like to complete it now? Just say "Yes"! 👇"""
-            
-            else:
-                return """🔍 **KYC Verification Required**
+        
+        else:
+            return """🔍 **KYC Verification Required**
 
 As per **RBI guidelines**, all loan applications need verified KYC.
 
@@ -827,15 +1124,16 @@ As per **RBI guidelines**, all loan applications need verified KYC.
 - No branch visit needed
 
 **Ready to complete your KYC?** Just say **"Yes"**! 🚀"""
-        
-        # Stage 2.5: New Customer Pitch
-        elif self.conversation_stage == "new_customer_pitch":
-            if any(word in msg for word in ["yes", "interested", "sure", "okay", "ok", "tell me", "check"]):
-                return self._handle_new_customer_interest()
-            elif any(word in msg for word in ["no", "not interested", "maybe later"]):
-                return self._handle_new_customer_objection()
-            else:
-                return f"""💭 **{self.context['name']}, I understand you might have questions!**
+    
+    def _rules_new_customer_pitch(self, message, msg):
+        """New Customer Pitch"""
+        intent = stage_intents.classify("new_customer_pitch", tokenize(message))
+        if intent == "yes":
+            return self._handle_new_customer_interest()
+        elif intent == "no":
+            return self._handle_new_customer_objection()
+        else:
+            return f"""💭 **{self.context['name']}, I understand you might have questions!**
 
 Here's what makes us **India's most trusted NBFC**:
 
@@ -846,19 +1144,20 @@ Here's what makes us **India's most trusted NBFC**:
 
 **Just say "Yes" to check your instant eligibility!** 
 No obligation, no charges - just see what you qualify for! 😊"""
-        
-        # Stage 2.7: New Customer Information Collection
-        elif self.conversation_stage == "new_customer_info":
-            return self._collect_new_customer_info(message)
-        
-        # Stage 3: Sales Pitch
-        elif self.conversation_stage == "sales_pitch":
-            if any(word in msg for word in ["yes", "interested", "sure", "okay", "ok", "tell me"]):
-                return self._show_loan_pitch()
-            elif any(word in msg for word in ["no", "not interested", "maybe later"]):
-                return self._handle_objection()
-            else:
-                return """🤔 Let me ask again - are you interested in exploring **exclusive pre-approved loan offers** tailored just for you?
+    
+    def _rules_new_customer_info(self, message, msg):
+        """New Customer Information Collection"""
+        return self._collect_new_customer_info(message)
+    
+    def _rules_sales_pitch(self, message, msg):
+        """Sales Pitch"""
+        intent = stage_intents.classify("sales_pitch", tokenize(message))
+        if intent == "yes":
+            return self._show_loan_pitch()
+        elif intent == "no":
+            return self._handle_objection()
+        else:
+            return """🤔 Let me ask again - are you interested in exploring **exclusive pre-approved loan offers** tailored just for you?
 
 ✨ **Special benefits waiting:**
 - **Instant approval** for pre-approved amounts
@@ -867,16 +1166,16 @@ No obligation, no charges - just see what you qualify for! 😊"""
 - **Quick disbursement** in 24 hours
 
 Just say **"Yes"** to see your personalized offer! 💰"""
-        
-        # Stage 4: Loan Type Selection
-        elif self.conversation_stage == "loan_type_selection":
-            loan_type = self._extract_loan_type(msg)
-            if loan_type:
-                self.context["loan_type"] = loan_type
-                # For new customers, collect info first
-                if not self.context.get("is_existing", True):
-                    self.conversation_stage = "new_customer_info"
-                    return self._show_loan_type_benefits(loan_type) + f"""
+    
+    def _rules_loan_type_selection(self, message, msg):
+        """Loan Type Selection"""
+        loan_type = self._extract_loan_type(msg)
+        if loan_type:
+            self.context["loan_type"] = loan_type
+            # For new customers, collect info first (once)
+            if not self.context.get("is_existing", True) and "age" not in self.context:
+                self.conversation_stage = "new_customer_info"
+                return self._show_loan_type_benefits(loan_type) + f"""
 
 📋 **Now let's get your personalized offer!**
 
@@ -885,11 +1184,11 @@ What's your **monthly salary**?
 
 **Use quick buttons or type like:**
 - "My salary is 50000" or "50k" or "Rs.50,000" 💰"""
-                else:
-                    self.conversation_stage = "loan_requirement"
-                    return self._show_loan_type_benefits(loan_type)
             else:
-                return """💼 **What type of loan do you need?**
+                self.conversation_stage = "loan_requirement"
+                return self._show_loan_type_benefits(loan_type)
+        else:
+            return """💼 **What type of loan do you need?**
 
 🎯 **Choose your loan purpose:**
 
@@ -903,18 +1202,19 @@ What's your **monthly salary**?
 - **"Education Loan"** - For studies/courses
 
 Each loan type has special benefits! 🎉"""
-        
-        # Stage 5: Loan Requirement  
-        elif self.conversation_stage == "loan_requirement":
-            amount = self._extract_amount(msg)
-            if amount:
-                self.context["amount"] = amount
-                self.context["tenure"] = 24  # default
-                self.conversation_stage = "terms_confirmation"
-                return self.sales_agent.negotiate_terms(amount, loan_type=self.context.get("loan_type"))
-            else:
-                loan_type = self.context.get("loan_type", "Personal")
-                return f"""💰 **How much {loan_type} do you need?**
+    
+    def _rules_loan_requirement(self, message, msg):
+        """Loan Requirement"""
+        amount = self._extract_amount(msg)
+        if amount:
+            self.context["amount"] = amount
+            self.context["tenure"] = 24 if amount <= 200000 else 36  # default
+            self.conversation_stage = "terms_confirmation"
+            return self.sales_agent.negotiate_terms(amount, self.context["tenure"], self._quote_rate(),
+                                                    loan_type=self.context.get("loan_type"))
+        else:
+            loan_type = self.context.get("loan_type", "Personal")
+            return f"""💰 **How much {loan_type} do you need?**
 
 **Click an option or type your amount:**
 - Type amount like: **250000** or **2.5 lakh** or **Rs.300000**
@@ -924,18 +1224,19 @@ Each loan type has special benefits! 🎉"""
 - Rs.2,00,000 - Small needs
 - Rs.5,00,000 - Medium requirements  
 - Rs.10,00,000 - Large projects"""
-        
-        # Stage 5: Terms Acceptance
-        elif self.conversation_stage == "terms_confirmation":
-            if any(word in msg for word in ["yes", "proceed", "ok", "agree", "accept", "looks good"]):
-                return self._start_verification()
-            elif any(word in msg for word in ["tenure", "month", "year", "emi", "change"]):
-                return self._handle_tenure_change(msg)
-            elif any(word in msg for word in ["no", "not okay", "change amount"]):
-                self.conversation_stage = "loan_requirement"
-                return "No problem! Let's discuss a different amount. What loan amount would work better for you?"
-            else:
-                return """📋 **Do these loan terms look good to you?**
+    
+    def _rules_terms_confirmation(self, message, msg):
+        """Terms Acceptance"""
+        intent = stage_intents.classify("terms_confirmation", tokenize(message))
+        if intent == "yes":
+            return self._start_verification()
+        elif intent == "tenure":
+            return self._handle_tenure_change(msg)
+        elif intent == "no":
+            self.conversation_stage = "loan_requirement"
+            return "No problem! Let's discuss a different amount. What loan amount would work better for you?"
+        else:
+            return """📋 **Do these loan terms look good to you?**
 
 Please respond with:
 - **"Yes"** - to proceed with verification
@@ -943,13 +1244,13 @@ Please respond with:
 - **"Different amount"** - to change loan amount
 
 💡 Ready to get **instant approval**? Just say **"Yes"**! ✅"""
-        
-        # Stage 5.5: KYC Upload for New Customers
-        elif self.conversation_stage == "kyc_upload":
-            if any(word in msg for word in ["yes", "proceed", "upload", "digital", "sure"]):
-                # Simulate successful KYC
-                self.conversation_stage = "underwriting"
-                return """✅ **Digital KYC Completed Successfully!**
+    
+    def _rules_kyc_upload(self, message, msg):
+        """KYC Upload for New Customers"""
+        if stage_intents.classify("kyc_upload", tokenize(message)) == "yes":
+            # Simulate successful KYC
+            self.conversation_stage = "underwriting"
+            return """✅ **Digital KYC Completed Successfully!**
 
 📋 **Documents Verified:**
 - ✅ Aadhaar Card - Verified
@@ -960,44 +1261,44 @@ Please respond with:
 🎉 **Great! Your profile is now complete.**
 
 ⏳ **Running credit assessment...**"""
-            else:
-                self.conversation_stage = "completed"
-                return """📋 **No problem!** You can complete KYC later.
+        else:
+            self.conversation_stage = "completed"
+            return """📋 **No problem!** You can complete KYC later.
 
 **Your loan application will be saved as DRAFT.**
 
 Visit any Tata Capital branch or complete digital KYC anytime at www.tatacapital.com
 
 Thank you for your interest! 🙏"""
+    
+    def _rules_underwriting(self, message, msg):
+        """AI-Enhanced Integrated Loan Processing"""
+        print("� AI LOAN PROCESSING: Starting integrated assessment with credit analysis...")
         
-        # Stage 6: AI-Enhanced Integrated Loan Processing
-        elif self.conversation_stage == "underwriting":
-            print("� AI LOAN PROCESSING: Starting integrated assessment with credit analysis...")
-            
-            # Perform comprehensive loan processing
-            result = self._perform_integrated_loan_processing()
-            
-            # Save to CSV
-            self._save_application(result)
-            
-            if result["status"] == "Approved":
-                self.conversation_stage = "sanction"
-                return result["response"] + "\n\n" + self._offer_sanction_letter()
-            if result["status"] == "Conditional":
-                self.conversation_stage = "conditional_docs"
-                self.context["pending_documents"] = True
-                return result["response"] + "\n\n📤 Please upload your salary slip so we can finish the approval."
-
-            self.conversation_stage = "completed"
-            return result["response"] + "\n\n" + self._end_conversation()
+        # Perform comprehensive loan processing
+        result = self._perform_integrated_loan_processing()
         
-        # Stage 7: Conditional Documentation
-        elif self.conversation_stage == "conditional_docs":
-            if any(word in msg for word in ["yes", "upload", "sure", "okay"]):
-                # Simulate document verification success
-                self.conversation_stage = "sanction"
-                self.context.pop("pending_documents", None)
-                return """✅ **Documents Verified Successfully!**
+        # Save to CSV
+        self._save_application(result)
+        
+        if result["status"] == "Approved":
+            self.conversation_stage = "sanction"
+            return result["response"] + "\n\n" + self._offer_sanction_letter()
+        if result["status"] == "Conditional":
+            self.conversation_stage = "conditional_docs"
+            self.context["pending_documents"] = True
+            return result["response"] + "\n\n📤 Please upload your salary slip so we can finish the approval."
+
+        self.conversation_stage = "completed"
+        return result["response"] + "\n\n" + self._end_conversation()
+    
+    def _rules_conditional_docs(self, message, msg):
+        """Conditional Documentation"""
+        if stage_intents.classify("conditional_docs", tokenize(message)) == "yes":
+            # Simulate document verification success
+            self.conversation_stage = "sanction"
+            self.context.pop("pending_documents", None)
+            return """✅ **Documents Verified Successfully!**
 
 🎉 **FINAL APPROVAL CONFIRMED!**
 ━━━━━━━━━━━━━━━━━━━━
@@ -1006,25 +1307,41 @@ Your loan application has been **APPROVED** after document verification!
 All requirements met. Congratulations! 🎊
 
 """ + self._offer_sanction_letter()
-            else:
-                self.conversation_stage = "completed"
-                self.context.pop("pending_documents", None)
-                return "No problem! You can upload documents later. Your conditional approval is valid for 30 days.\n\n" + self._end_conversation()
-        
-        # Stage 8: Sanction Letter Generation
-        elif self.conversation_stage == "sanction":
-            if any(word in msg for word in ["generate", "yes", "send", "create", "download"]):
-                return self._generate_sanction()
-            else:
-                return (
-                    "🎯 **Sanction Letter Ready!**\n\n"
-                    "Would you like me to generate your personalized sanction letter now? "
-                    "Just say 'Generate' or 'Send it over' whenever you're ready."
-                )
+        else:
+            self.conversation_stage = "completed"
+            self.context.pop("pending_documents", None)
+            return "No problem! You can upload documents later. Your conditional approval is valid for 30 days.\n\n" + self._end_conversation()
+    
+    def _rules_sanction(self, message, msg):
+        """Sanction Letter Generation"""
+        if stage_intents.classify("sanction", tokenize(message)) == "yes":
+            return self._generate_sanction()
+        else:
+            return (
+                "🎯 **Sanction Letter Ready!**\n\n"
+                "Would you like me to generate your personalized sanction letter now? "
+                "Just say 'Generate' or 'Send it over' whenever you're ready."
+            )
+    
+    def _local_intent_response(self, message):
+        """Stock answer for a question the offline classifier is confident about, or None"""
+        classifier = get_intent_classifier()
+        if classifier is None:
+            return None
+        intent, confidence = classifier.predict(message)
+        topic = LOCAL_INTENT_TOPICS.get(intent)
+        if topic is None or confidence < INTENT_CONFIDENCE:
+            return None
+        print(f"🎯 INTENT: {intent} ({confidence:.0%}) answered locally")
+        return self._topic_response(topic)
+    
     def _get_ai_intent_response(self, message):
-        """AI-powered intent detection and appropriate response"""
+        """Intent detection and appropriate response: the local classifier first, the AI only when it is unsure"""
+        local_response = self._local_intent_response(message)
+        if local_response:
+            return local_response
         try:
-            if api_key:
+            if llm.available:
                 print("🎯 AI INTENT DETECTION: Analyzing customer intent...")
                 
                 intent_prompt = f"""
@@ -1085,7 +1402,7 @@ Make the response feel like a natural conversation between friends, not a busine
         Keep it under 150 words, use emojis, and be engaging.
         """
         
-        ai_greeting = self._get_ai_response(ai_prompt, "")
+        ai_greeting = self._get_cached_ai_response("greeting", {"entry_scenario": self.entry_scenario}, ai_prompt)
         scenario_line = f"📢 We spotted that you dropped in after {self.entry_scenario}, so I've already lined up offers tailored to that journey!\n\n"
         
         base_greeting = scenario_line + """🎉 **🎉 WELCOME TO TATA CAPITAL'S AI LOAN PLATFORM! 🎉** 🎉
@@ -1134,31 +1451,38 @@ Make the response feel like a natural conversation between friends, not a busine
 Please share your name so I can personalize your experience. 
 Just type something like: **"My name is John"** or **"I'm Sarah"** 👇"""
         
-        # Check if existing customer
-        for existing_name in customers.keys():
-            if existing_name.lower() == name.lower():
-                self.context["name"] = existing_name
-                customer_data = customers[existing_name]
-                self.context["customer_data"] = customer_data
-                self.context["is_existing"] = True
-                self.conversation_stage = "kyc_verification" if not customer_data["kyc"] else "sales_pitch"
+        # Check if existing customer (one index lookup on the normalized name)
+        customer_data = crm.get(name)
+        if customer_data is not None:
+            existing_name = customer_data["name"]
+            self.context["name"] = existing_name
+            self.context["customer_data"] = customer_data
+            self.context["is_existing"] = True
+            self.conversation_stage = "kyc_verification" if not customer_data["kyc"] else "sales_pitch"
                 
-                # Show KYC status and customer profile
-                kyc_status = "✅ **VERIFIED**" if customer_data["kyc"] else "⚠️ **PENDING**"
-                credit_rating = "EXCELLENT" if customer_data["credit_score"] >= 750 else "GOOD" if customer_data["credit_score"] >= 700 else "FAIR"
+            # Show KYC status and customer profile
+            kyc_status = "✅ **VERIFIED**" if customer_data["kyc"] else "⚠️ **PENDING**"
+            credit_rating = "EXCELLENT" if customer_data["credit_score"] >= 750 else "GOOD" if customer_data["credit_score"] >= 700 else "FAIR"
                 
-                # AI-enhanced customer welcome message
-                print(f"🎯 AI ENHANCEMENT: Creating personalized welcome for {existing_name}")
-                ai_prompt = f"""
-                Create a personalized welcome message for returning customer {existing_name} from {customer_data['city']}.
-                Customer details: Credit score {customer_data['credit_score']}, Pre-approved limit Rs.{customer_data["pre_approved_limit"]:,}, KYC: {customer_data['kyc']}.
+            # AI-enhanced customer welcome message
+            print(f"🎯 AI ENHANCEMENT: Creating personalized welcome for {existing_name}")
+            welcome_fields = {
+                "city": customer_data["city"],
+                "credit_band": credit_band(customer_data["credit_score"]),
+                "limit": amount_bucket(customer_data["pre_approved_limit"]),
+                "kyc": customer_data["kyc"]
+            }
+            ai_prompt = f"""
+                Create a personalized welcome message for returning customer {CUSTOMER_PLACEHOLDER} from {welcome_fields['city']}.
+                Customer details: Credit score band {welcome_fields['credit_band']}, Pre-approved limit in the range {welcome_fields['limit']}, KYC: {welcome_fields['kyc']}.
+                Write {CUSTOMER_PLACEHOLDER} exactly where the customer's name belongs.
                 Make it warm, professional, and highlight their VIP status. Include relevant emojis.
                 Keep under 100 words. Focus on exclusive benefits and next steps.
                 """
                 
-                ai_welcome = self._get_ai_response(ai_prompt, "")
+            ai_welcome = self._get_cached_ai_response("welcome", welcome_fields, ai_prompt)
                 
-                base_response = f"""� **🎊 WELCOME BACK VIP CUSTOMER {existing_name.upper()}! 🎊** �
+            base_response = f"""� **🎊 WELCOME BACK VIP CUSTOMER {existing_name.upper()}! 🎊** �
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 🏆 **🏆 PREMIUM CUSTOMER PROFILE ACTIVATED 🏆**
@@ -1184,10 +1508,10 @@ Just type something like: **"My name is John"** or **"I'm Sarah"** 👇"""
 
 """
                 
-                if customer_data["kyc"]:
-                    return base_response + "🚀 **Ready to explore your exclusive pre-approved offers?**"
-                else:
-                    return base_response + """
+            if customer_data["kyc"]:
+                return base_response + "🚀 **Ready to explore your exclusive pre-approved offers?**"
+            else:
+                return base_response + """
 ⚠️ **ACTION REQUIRED:** KYC verification pending
 We need to complete your KYC before loan processing.
 
@@ -1235,10 +1559,16 @@ We need to complete your KYC before loan processing.
         print("💼 AI PITCH: Creating personalized loan sales pitch...")
         customer_data = self.context["customer_data"]
         name = self.context["name"]
+        pitch_fields = {
+            "city": customer_data["city"],
+            "credit_band": credit_band(customer_data["credit_score"]),
+            "limit": amount_bucket(customer_data["pre_approved_limit"])
+        }
         
         ai_prompt = f"""
-        Create a compelling, personalized loan sales pitch for {name}.
-        Customer profile: Credit score {customer_data['credit_score']}, Pre-approved Rs.{customer_data["pre_approved_limit"]:,}, City: {customer_data['city']}.
+        Create a compelling, personalized loan sales pitch for {CUSTOMER_PLACEHOLDER}.
+        Customer profile: Credit score band {pitch_fields['credit_band']}, Pre-approved limit in the range {pitch_fields['limit']}, City: {pitch_fields['city']}.
+        Write {CUSTOMER_PLACEHOLDER} exactly where the customer's name belongs.
         
         Make it persuasive, professional, and exciting. Highlight:
         - Instant approval benefits
@@ -1249,9 +1579,10 @@ We need to complete your KYC before loan processing.
         Keep under 150 words, use emojis, create urgency and excitement. End with asking about loan type preference.
         """
         
-        ai_pitch = self._get_ai_response(ai_prompt, "")
+        ai_pitch = self._get_cached_ai_response("pitch", pitch_fields, ai_prompt)
         
-        base_pitch = self.sales_agent.pitch_loan(self.context["name"], self.context["customer_data"])
+        offer = offer_book.get(name, customer_data) if crm.get(name) is not None else None
+        base_pitch = self.sales_agent.pitch_loan(name, customer_data, offer)
         
         if ai_pitch:
             return f"🤖 **AI-Personalized Offer for {name}:**\n\n{ai_pitch}\n\n{base_pitch}\n\n" + self._show_loan_types()
@@ -1296,12 +1627,14 @@ What have you got to lose? 🤔"""
         
         # AI-powered objection handling
         print("🛡️ AI OBJECTION HANDLING: Creating persuasive response...")
-        name = self.context["name"]
         customer_data = self.context.get("customer_data", {})
         
+        band = credit_band(customer_data.get("credit_score"))
+        limit_range = amount_bucket(customer_data.get("pre_approved_limit"))
         ai_prompt = f"""
-        Customer {name} just showed objection to a loan offer. They might be hesitant, skeptical, or not interested.
-        Customer profile: Credit score {customer_data.get('credit_score', 'unknown')}, Pre-approved limit {customer_data.get('pre_approved_limit', 'unknown')}.
+        Customer {CUSTOMER_PLACEHOLDER} just showed objection to a loan offer. They might be hesitant, skeptical, or not interested.
+        Customer profile: Credit score band {band}, Pre-approved limit in the range {limit_range}.
+        Write {CUSTOMER_PLACEHOLDER} exactly where the customer's name belongs.
         
         Create a persuasive, empathetic response that:
         - Acknowledges their concern with understanding
@@ -1313,7 +1646,9 @@ What have you got to lose? 🤔"""
         Be warm, professional, persuasive. Keep under 120 words with emojis.
         """
         
-        ai_objection_response = self._get_ai_response(ai_prompt, "")
+        ai_objection_response = self._get_cached_ai_response(
+            "objection", {"credit_band": band, "limit": limit_range}, ai_prompt
+        )
         
         base_response = """I completely understand! 😊 
 
@@ -1333,19 +1668,11 @@ Even if you don't need money right now, wouldn't you like to know your **FREE pr
     
     def _handle_tenure_change(self, msg):
         """Handle tenure modification requests"""
-        tenure_map = {
-            "12": 12, "1 year": 12, "one year": 12,
-            "24": 24, "2 year": 24, "two year": 24,  
-            "36": 36, "3 year": 36, "three year": 36,
-            "48": 48, "4 year": 48, "four year": 48,
-            "60": 60, "5 year": 60, "five year": 60
-        }
-        
-        for key, value in tenure_map.items():
-            if key in msg:
-                self.context["tenure"] = value
-                amount = self.context["amount"]
-                return self.sales_agent.negotiate_terms(amount, value) + "\n\n✅ Updated! Do these new terms work for you?"
+        value = tenure_choice(tokenize(msg))
+        if value:
+            self.context["tenure"] = value
+            amount = self.context["amount"]
+            return self.sales_agent.negotiate_terms(amount, value, self._quote_rate(), loan_type=self.context.get("loan_type")) + "\n\n✅ Updated! Do these new terms work for you?"
         
         return """⏱️ **Choose your preferred tenure:**
 
@@ -1359,8 +1686,6 @@ Even if you don't need money right now, wouldn't you like to know your **FREE pr
     
     def _collect_new_customer_info(self, message):
         """AI-enhanced information collection from new customers"""
-        name = self.context["name"]
-        
         # Step 1: Collect salary with AI encouragement
         if "salary" not in self.context:
             salary = self._extract_salary(message)
@@ -1369,8 +1694,10 @@ Even if you don't need money right now, wouldn't you like to know your **FREE pr
                 
                 # AI-enhanced salary confirmation
                 print("💰 AI SALARY ANALYSIS: Creating personalized eligibility preview...")
+                salary_range = amount_bucket(salary)
                 ai_prompt = f"""
-                Customer {name} just shared salary of Rs.{salary:,}/month.
+                Customer {CUSTOMER_PLACEHOLDER} just shared a monthly salary in the range {salary_range}.
+                Write {CUSTOMER_PLACEHOLDER} exactly where the customer's name belongs, and don't quote an exact salary.
                 Create an encouraging message that:
                 - Congratulates them on good salary
                 - Hints at loan eligibility (3-5x salary typically)
@@ -1380,7 +1707,7 @@ Even if you don't need money right now, wouldn't you like to know your **FREE pr
                 Keep under 80 words, professional, use emojis.
                 """
                 
-                ai_salary_response = self._get_ai_response(ai_prompt, "")
+                ai_salary_response = self._get_cached_ai_response("salary_preview", {"salary": salary_range}, ai_prompt)
                 
                 base_response = f"""💰 **Great! Monthly salary: Rs.{salary:,}**
 
@@ -1455,77 +1782,15 @@ Just type your city name:
     
     def _extract_salary(self, message):
         """Extract salary from message"""
-        import re
-        msg = message.lower()
-        
-        # Find numbers in the message
-        numbers = re.findall(r'\d+', msg)
-        if numbers:
-            salary = int(numbers[0])
-            
-            # Handle different formats
-            if "k" in msg and salary < 1000:
-                salary *= 1000
-            elif "lakh" in msg or "lac" in msg:
-                salary *= 100000
-            elif salary < 10000:  # Assume thousands if very small
-                salary *= 1000
-                
-            # Reasonable salary range check
-            if 15000 <= salary <= 500000:
-                return salary
-        return None
+        return extract_entities(message).salary
     
     def _extract_city(self, message):
-        """Extract city from message"""
-        msg = message.lower()
-        
-        # Major Indian cities
-        cities = {
-            "mumbai": "Mumbai", "bombay": "Mumbai",
-            "delhi": "Delhi", "new delhi": "Delhi", "ncr": "Delhi NCR",
-            "bangalore": "Bangalore", "bengaluru": "Bangalore",  
-            "chennai": "Chennai", "madras": "Chennai",
-            "kolkata": "Kolkata", "calcutta": "Kolkata",
-            "hyderabad": "Hyderabad",
-            "pune": "Pune", "poona": "Pune",
-            "ahmedabad": "Ahmedabad",
-            "jaipur": "Jaipur",
-            "surat": "Surat",
-            "lucknow": "Lucknow",
-            "kanpur": "Kanpur",
-            "nagpur": "Nagpur",
-            "indore": "Indore",
-            "thane": "Thane",
-            "bhopal": "Bhopal",
-            "vadodara": "Vadodara",
-            "ghaziabad": "Ghaziabad",
-            "ludhiana": "Ludhiana",
-            "agra": "Agra",
-            "nashik": "Nashik"
-        }
-        
-        for key, city in cities.items():
-            if key in msg:
-                return city
-                
-        # If not found in predefined list, extract any word that looks like a city
-        words = msg.split()
-        for word in words:
-            if word.isalpha() and len(word) > 3:
-                return word.title()
-                
-        return None
+        """Extract city from message (known cities and their other names only)"""
+        return gazetteer.find(message, "city")
     
     def _extract_age(self, message):
         """Extract age from message"""
-        import re
-        numbers = re.findall(r'\d+', message)
-        if numbers:
-            age = int(numbers[0])
-            if 18 <= age <= 65:  # Reasonable age range for loans
-                return age
-        return None
+        return extract_entities(message).age
     
     def _create_new_customer_profile(self):
         """Create a synthetic profile for new customer"""
@@ -1568,6 +1833,8 @@ Just type your city name:
         limit = data["pre_approved_limit"]
         score = data["credit_score"]
         salary = data["salary"]
+        loan_type = self.context.get("loan_type")
+        rate = pricing.price_one(loan_type, score, limit)
         
         offer = f"""🎉 **CONGRATULATIONS {name.upper()}!** 
 
@@ -1575,7 +1842,7 @@ Just type your city name:
 ━━━━━━━━━━━━━━━━━━━━━━━━━━
 💰 **Eligible Amount**: Up to **Rs.{limit:,}**
 📊 **Estimated Credit Score**: {score}/900
-⭐ **Interest Rate**: Starting from **10.99% p.a.**
+⭐ **Interest Rate**: Starting from **{pricing.starting_rate(loan_type):g}% p.a.**
 💳 **Flexible Tenure**: 12 to 60 months
 ⚡ **Processing Time**: 30 seconds to 2 hours
 
@@ -1587,8 +1854,8 @@ Just type your city name:
             offer += "✅ **EXCELLENT PROFILE** - High approval chances!\n\n"
         
         offer += f"""💡 **Based on your Rs.{salary:,} salary, you can easily afford:**
-- Rs.{int(limit/2):,} loan = Rs.{self._calculate_emi(int(limit/2), 24):,}/month EMI
-- Rs.{int(limit*0.75):,} loan = Rs.{self._calculate_emi(int(limit*0.75), 36):,}/month EMI
+- Rs.{int(limit/2):,} loan = Rs.{int(self._calculate_emi(int(limit/2), rate, 24)):,}/month EMI
+- Rs.{int(limit*0.75):,} loan = Rs.{int(self._calculate_emi(int(limit*0.75), rate, 36)):,}/month EMI
 
 🎯 **Ready to apply? How much do you need today?**
 Just tell me like: **"I need 3 lakh"** or **"Rs.500000"** 💰"""
@@ -1611,37 +1878,9 @@ Just tell me like: **"I need 3 lakh"** or **"Rs.500000"** 💰"""
 
 Each loan type has **special benefits and rates**! 🎉"""
     
-    def _calculate_emi(self, amount, tenure):
-        """Calculate EMI for given amount and tenure"""
-        rate = 11.5  # Annual rate
-        monthly_rate = rate / 100 / 12
-        emi = (amount * monthly_rate * (1 + monthly_rate)**tenure) / ((1 + monthly_rate)**tenure - 1)
-        return int(emi)
-    
     def _extract_loan_type(self, message):
         """Extract loan type from message"""
-        msg = message.lower()
-        
-        loan_types = {
-            "personal": "Personal Loan",
-            "business": "Business Loan", 
-            "home": "Home Renovation Loan",
-            "renovation": "Home Renovation Loan",
-            "wedding": "Wedding Loan",
-            "marriage": "Wedding Loan",
-            "travel": "Travel Loan",
-            "vacation": "Travel Loan",
-            "medical": "Medical Loan",
-            "health": "Medical Loan",
-            "education": "Education Loan",
-            "study": "Education Loan"
-        }
-        
-        for key, loan_type in loan_types.items():
-            if key in msg:
-                return loan_type
-                
-        return None
+        return gazetteer.find(message, "loan_type")
     
     def _show_loan_type_benefits(self, loan_type):
         """Show specific benefits for selected loan type"""
@@ -1729,46 +1968,11 @@ Each loan type has **special benefits and rates**! 🎉"""
     
     def _extract_name(self, message):
         """Extract name from user message"""
-        import re
-        msg = message.strip()
-        
-        # Common patterns for name input
-        patterns = [
-            r"my name is (\w+)",
-            r"i'm (\w+)",
-            r"i am (\w+)",
-            r"call me (\w+)",
-            r"this is (\w+)",
-            r"^(\w+)$",  # Just a single word
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, msg, re.IGNORECASE)
-            if match:
-                name = match.group(1)
-                # Filter out common non-name words
-                if name.lower() not in ["hello", "hi", "hey", "yes", "no", "ok", "loan", "money"]:
-                    return name
-        
-        # If message contains only alphabetic characters (likely a name)
-        if msg.isalpha() and len(msg) > 1:
-            return msg
-            
-        return None
+        return extract_entities(message).name
     
     def _extract_amount(self, msg):
-        import re
-        # Extract numbers
-        numbers = re.findall(r'\d+', msg)
-        if numbers:
-            amount = int(numbers[0])
-            # Handle lakh notation
-            if "lakh" in msg or "lac" in msg:
-                amount *= 100000
-            elif amount < 10000:  # assume lakhs if small number
-                amount *= 100000
-            return amount
-        return None
+        """Extract the loan amount (2.5 lakh, Rs.3,00,000, 50k, 1.2 crore) from a message"""
+        return extract_entities(msg).amount
     
     def _start_verification(self):
         self.conversation_stage = "underwriting"
@@ -1833,37 +2037,58 @@ Each loan type has **special benefits and rates**! 🎉"""
 
 **⚡ Your digital sanction letter will be ready in 3 seconds! ⚡**"""
     
-    def _generate_sanction(self):
-        self.conversation_stage = "completed"
+    def _submit_sanction_letter(self):
+        """Queue this customer's letter for rendering; returns (job ID, file name)"""
         name = self.context["name"]
-        amount = self.context["amount"]
-        tenure = self.context.get("tenure", 24)
-        rate = 11.5
-        
-        # Generate the PDF
-        filepath = self.sanction_generator.generate_pdf(
-            name, amount, tenure, rate,
-            self.context["customer_data"]
+        job_id = new_job_id()
+        file_name = SanctionLetterGenerator.filename_for(name, job_id)
+        sanction_letters.submit(
+            name, self.context["amount"], self.context.get("tenure", underwriting_policy.tenure), self._quote_rate(),
+            self.context["customer_data"], file_name, job_id
         )
+        self.context["sanction_job"] = job_id
+        self.context["sanction_attempts"] = self.context.get("sanction_attempts", 0) + 1
+        print(f"📄 SANCTION LETTER: Queued job {job_id} for {name} ({sanction_letters.stats()['depth']} in queue)")
+        return job_id, file_name
+
+    def sanction_letter_update(self):
+        """Poll the queued letter: ("ready", path), ("retrying", None), ("failed", None) or (None, None) while it renders"""
+        job_id = self.context.get("sanction_job")
+        if job_id is None:
+            return None, None
+        status = sanction_letters.status(job_id)
+        if status == "pending":
+            return None, None
+        self.context.pop("sanction_job")
+        if status == "ready":
+            path = sanction_letters.result(job_id)
+            self.context["sanction_letter"] = path
+            return "ready", path
+        print(f"❌ SANCTION LETTER: Job {job_id} failed: {sanction_letters.error(job_id)}")
+        if self.context.get("sanction_attempts", 0) < 2:
+            self._submit_sanction_letter()
+            return "retrying", None
+        return "failed", None
+
+    def _generate_sanction(self):
+        self.conversation_stage = "completed"
+        # Rendering happens in the PDF workers; the UI picks the file up when the job is done
+        job_id, file_name = self._submit_sanction_letter()
         
-        # Create download link
-        import os
-        file_name = os.path.basename(filepath)
-        
-        return f"""🎉 **🎉 SANCTION LETTER GENERATED SUCCESSFULLY! 🎉**
+        return f"""🎉 **🎉 SANCTION LETTER APPROVED FOR ISSUE! 🎉**
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-📄 **📄 YOUR OFFICIAL LOAN DOCUMENTS ARE READY! 📄**
+📄 **📄 YOUR OFFICIAL LOAN DOCUMENTS ARE BEING PREPARED! 📄**
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
 💾 **💾 DOWNLOAD INFORMATION:**
 - 📁 **File Name:** {file_name}
-- 📂 **File Location:** {filepath}
+- ⏳ **Status:** Preparing your letter (job `{job_id}`), it will appear below in a few seconds
 - 📄 **Document Type:** Official PDF Sanction Letter
 - 🔒 **Security:** Password protected with your phone number
 
 🎊 **🎊 IMMEDIATE NEXT STEPS:**
-- **✅ Step 1:** **Download the PDF file above** 📥
+- **✅ Step 1:** **Download the PDF file below once it appears** 📥
 - **🏦 Step 2:** **Visit any Tata Capital branch** with these documents:
   - 🆔 **Original ID proofs** (PAN Card, Aadhaar Card)
   - 🏠 **Address proof** (Utility bill, Rent agreement)  
@@ -1899,11 +2124,8 @@ Each loan type has **special benefits and rates**! 🎉"""
             requested_amount = self.context["amount"]
             customer_data = self.context.get("customer_data")
             
-            if name in customers:
-                data = customers[name]
-            elif customer_data:
-                data = customer_data
-            else:
+            data = crm.get(name) or customer_data
+            if not data:
                 return {
                     "status": "Error",
                     "response": "❌ Customer data not available for processing."
@@ -1915,7 +2137,7 @@ Each loan type has **special benefits and rates**! 🎉"""
             pre_approved_limit = data["pre_approved_limit"]
             
             # Step 2: Generate personalized loan offerings
-            offerings = self._generate_personalized_offerings(credit_score, salary, pre_approved_limit)
+            offerings = self._generate_personalized_offerings(credit_score, salary, pre_approved_limit, name)
             
             # Step 3: Process the specific request
             decision_result = self._make_loan_decision(requested_amount, credit_score, salary, pre_approved_limit, name)
@@ -1944,123 +2166,46 @@ Each loan type has **special benefits and rates**! 🎉"""
                 "response": "❌ Unable to process your loan application. Please try again."
             }
     
-    def _generate_personalized_offerings(self, credit_score, salary, pre_approved_limit):
+    def _generate_personalized_offerings(self, credit_score, salary, pre_approved_limit, name=None):
         """Generate personalized loan offerings based on customer profile"""
-        offerings = []
-        
-        # Calculate different loan amounts with their terms
-        amounts = [
-            min(pre_approved_limit, int(salary * 3)),      # Conservative
-            min(pre_approved_limit, int(salary * 4)),      # Standard  
-            pre_approved_limit                             # Maximum
-        ]
-        
-        for amount in amounts:
-            if amount >= 50000:  # Minimum loan amount
-                rate = self._calculate_interest_rate(credit_score, amount)
-                emi_24 = self._calculate_emi(amount, rate, 24)
-                emi_36 = self._calculate_emi(amount, rate, 36)
-                
-                offerings.append({
-                    "amount": amount,
-                    "rate": rate,
-                    "emi_24": emi_24,
-                    "emi_36": emi_36
-                })
-        
-        return offerings
+        # CRM customers read their precomputed sheet (priced as the grid's default loan type);
+        # new customers and other loan types get tiers solved live
+        loan_type = self.context.get("loan_type")
+        record = crm.get(name)
+        if record is not None and loan_type in (None, pricing.grid.default_loan_type):
+            return offer_book.get(name, record)["tiers"]
+        return offer_tiers(salary, credit_score, pre_approved_limit, loan_type=loan_type)
     
     def _calculate_interest_rate(self, credit_score, amount):
-        """Calculate personalized interest rate - returns single market rate"""
-        # Current market rate for personal loans in India (November 2024)
-        market_rate = 12.5  # Single market rate instead of range
-        
-        # Minor adjustments based on credit score for personalization
-        if credit_score >= 800:
-            return 11.5  # Premium rate for excellent credit
-        elif credit_score >= 750:
-            return 12.0  # Good rate for very good credit
-        elif credit_score >= 700:
-            return 12.5  # Standard market rate
-        else:
-            return 13.0  # Slightly higher for fair credit
-        
-        # Always return a single, definitive rate
+        """Calculate personalized interest rate for the session's loan type"""
+        return pricing.price_one(self.context.get("loan_type"), credit_score, amount)
+    
+    def _quote_rate(self):
+        """Rate for the current application, priced once and cached on the session; the terms,
+        the decision, the stored record and the sanction letter all read this one value"""
+        data = self.context.get("customer_data") or crm.get(self.context.get("name")) or {}
+        key = [self.context.get("loan_type"), data.get("credit_score"), self.context.get("amount") or 0]
+        if self.context.get("rate_key") != key:
+            self.context["rate"] = pricing.price_one(*key)
+            self.context["rate_key"] = key
+        return self.context["rate"]
     
     def _calculate_emi(self, amount, rate, tenure):
         """Calculate EMI"""
-        monthly_rate = rate / 100 / 12
-        emi = (amount * monthly_rate * (1 + monthly_rate)**tenure) / ((1 + monthly_rate)**tenure - 1)
-        return emi
+        return finance.emi(amount, rate, tenure)
     
     def _make_loan_decision(self, requested_amount, credit_score, salary, pre_approved_limit, name):
         """Apply Challenge-II underwriting policy for Tata Capital"""
         confidence = random.randint(85, 98)
 
-        # Calculate EMI for requested amount using default tenure of 24 months
-        rate = self._calculate_interest_rate(credit_score, requested_amount)
-        emi = self._calculate_emi(requested_amount, rate, 24)
-        emi_to_salary_ratio = (emi / salary) * 100 if salary else 100
-        two_x_limit = pre_approved_limit * 2
-
-        if credit_score < 700:
-            return {
-                "status": "Rejected",
-                "reason": "credit_score_below_threshold",
-                "confidence": confidence,
-                "rate": rate,
-                "emi": emi,
-                "emi_ratio": emi_to_salary_ratio,
-                "required_credit_score": 700
-            }
-
-        if requested_amount <= pre_approved_limit:
-            return {
-                "status": "Approved",
-                "reason": "within_limit",
-                "confidence": confidence,
-                "rate": rate,
-                "emi": emi,
-                "emi_ratio": emi_to_salary_ratio,
-                "approved_amount": requested_amount
-            }
-
-        if requested_amount <= two_x_limit:
-            if emi_to_salary_ratio <= 50:
-                return {
-                    "status": "Conditional",
-                    "reason": "requires_salary_slip",
-                    "confidence": confidence,
-                    "rate": rate,
-                    "emi": emi,
-                    "emi_ratio": emi_to_salary_ratio,
-                    "approved_amount": requested_amount,
-                    "documents": ["Latest salary slip", "Bank statement - last 6 months"]
-                }
-
-            max_affordable_amount = int(requested_amount * (50 / emi_to_salary_ratio)) if emi_to_salary_ratio else requested_amount
-            max_affordable_amount = max(0, max_affordable_amount)
-            max_affordable_amount = min(max_affordable_amount, two_x_limit)
-
-            return {
-                "status": "Rejected",
-                "reason": "emi_ratio_too_high",
-                "confidence": confidence,
-                "rate": rate,
-                "emi": emi,
-                "emi_ratio": emi_to_salary_ratio,
-                "max_affordable_amount": max_affordable_amount
-            }
-
-        return {
-            "status": "Rejected",
-            "reason": "exceeds_two_x_limit",
-            "confidence": confidence,
-            "rate": rate,
-            "emi": emi,
-            "emi_ratio": emi_to_salary_ratio,
-            "max_eligible_amount": two_x_limit
-        }
+        # EMI for the requested amount at the quoted rate over the tenure on the terms screen (or the
+        # customer's change of it); the approval text, stored record and letter all show this tenure
+        tenure = self.context.get("tenure", underwriting_policy.tenure)
+        decision = underwriting_policy.decide_one(requested_amount, credit_score, salary, pre_approved_limit,
+                                                  tenure=tenure, rate=self._quote_rate())
+        decision["tenure"] = tenure
+        decision["confidence"] = confidence
+        return decision
     
     def _create_integrated_response(self, name, credit_score, salary, requested_amount, 
                                   pre_approved_limit, offerings, decision):
@@ -2090,7 +2235,7 @@ Each loan type has **special benefits and rates**! 🎉"""
                 
                 response += f"""{emoji} **{label} PACKAGE:**
 - **Loan Amount:** Rs.{offer['amount']:,}
-- **Interest Rate:** {offer['rate']:.1f}% p.a.
+- **Interest Rate:** {offer['rate']:g}% p.a.
 - **24 Month EMI:** Rs.{offer['emi_24']:,.0f}
 - **36 Month EMI:** Rs.{offer['emi_36']:,.0f}
 
@@ -2119,9 +2264,9 @@ Each loan type has **special benefits and rates**! 🎉"""
 📋 **📋 OFFICIAL LOAN APPROVAL DETAILS:**
 - 🆔 **Loan Reference:** {loan_ref_no}
 - 💰 **Sanctioned Amount:** Rs.{approved_amount:,}
-- 📈 **Interest Rate:** {decision['rate']:.1f}% p.a. (Current Market Rate)
+- 📈 **Interest Rate:** {decision['rate']:g}% p.a. (Current Market Rate)
 - 💳 **Monthly EMI:** Rs.{decision['emi']:,.0f}
-- ⏰ **Loan Tenure:** 24 months
+- ⏰ **Loan Tenure:** {decision['tenure']} months
 - 🤖 **AI Confidence Score:** {decision['confidence']}%
 - 📅 **Sanction Date:** {sanction_date}
 - 💸 **Expected Disbursal:** {disbursal_date}
@@ -2129,8 +2274,8 @@ Each loan type has **special benefits and rates**! 🎉"""
 💰 **💰 FINANCIAL BREAKDOWN:**
 - 💵 **Principal Amount:** Rs.{approved_amount:,}
 - 🏦 **Processing Fee:** Rs.{processing_fee:,} (2.0%)
-- 📊 **Total Interest:** Rs.{int(decision['emi'] * 24 - approved_amount):,}
-- 💸 **Total Payable:** Rs.{int(decision['emi'] * 24):,}
+- 📊 **Total Interest:** Rs.{int(decision['emi'] * decision['tenure'] - approved_amount):,}
+- 💸 **Total Payable:** Rs.{int(decision['emi'] * decision['tenure']):,}
 
 ✅ **✅ WHY YOU'RE INSTANTLY APPROVED:**
 - 🌟 **Excellent Credit Score:** {credit_score}/900
@@ -2156,7 +2301,7 @@ Great news, {name.upper()}! You're just one step away from final approval.
 ✅ **Eligibility Check:**
 - Requested Amount: Rs.{requested_amount:,}
 - Within 2× pre-approved limit: Rs.{pre_approved_limit*2:,}
-- Estimated EMI: Rs.{decision['emi']:,.0f}
+- Estimated EMI: Rs.{decision['emi']:,.0f} over {decision['tenure']} months
 - EMI to Salary Ratio: {decision['emi_ratio']:.1f}% (policy max 50%)
 
 📄 **Action Required:**
@@ -2180,12 +2325,16 @@ We require a minimum credit score of 700. Your current score is {credit_score}/9
 """
 
             elif reason == "emi_ratio_too_high":
-                affordable = decision.get("max_affordable_amount")
+                counter = counter_offer(requested_amount, salary, credit_score, pre_approved_limit,
+                                        tenure=decision["tenure"], loan_type=self.context.get("loan_type"))
                 response += f"""❌ **APPLICATION DECLINED – EMI TOO HIGH**
 
 The EMI for Rs.{requested_amount:,} would be {decision['emi_ratio']:.1f}% of your salary, exceeding the 50% policy cap.
 
-💡 Try a lower amount for instant approval. Suggested safe limit: Rs.{affordable:,}.
+💡 Try a lower amount for instant approval. Suggested safe limit: Rs.{counter['amount']:,} (EMI Rs.{counter['emi']:,.0f} over {counter['tenure']} months).
+"""
+                if counter["full_amount_tenure"]:
+                    response += f"""⏱️ Or keep Rs.{requested_amount:,} over **{counter['full_amount_tenure']} months** (EMI Rs.{counter['full_amount_emi']:,.0f}).
 """
 
             elif reason == "exceeds_two_x_limit":
@@ -2205,45 +2354,32 @@ Please choose an amount within this cap for us to reassess instantly.
         return response
     
     def _save_application(self, result):
-        """Save application to CSV with proper error handling"""
+        """Append application to the configured store with proper error handling"""
         try:
             customer_name = result["name"]
             amount = result["amount"]
-            rate = 10.99 if amount <= 300000 else 11.5
+            rate = self._quote_rate()
             
             # Handle both existing and new customers
-            if customer_name in customers:
-                customer_data = customers[customer_name]
-            else:
-                customer_data = self.context.get("customer_data", {})
+            customer_data = crm.get(customer_name) or self.context.get("customer_data") or {}
             
-            new_row = pd.DataFrame([{
+            new_row = {
                 "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                 "Customer": customer_name,
                 "Age": customer_data.get("age", "N/A"),
                 "City": customer_data.get("city", "N/A"),
                 "Amount": amount,
-                "Tenure": self.context.get("tenure", 24),
+                "Tenure": self.context.get("tenure", underwriting_policy.tenure),
                 "Interest Rate": rate,
                 "Credit Score": result["score"],
                 "Pre-Approved Limit": result["limit"],
                 "Salary": result["salary"],
                 "Decision": result["status"],
                 "Confidence (%)": result["confidence"]
-            }])
-            
-            # Read existing data or create new DataFrame
-            try:
-                df = pd.read_csv(DATA_FILE)
-            except (FileNotFoundError, pd.errors.EmptyDataError):
-                df = pd.DataFrame(columns=[
-                    "Timestamp", "Customer", "Age", "City", "Amount", "Tenure", "Interest Rate",
-                    "Credit Score", "Pre-Approved Limit", "Salary", "Decision", "Confidence (%)"
-                ])
+            }
             
-            # Append new row and save
-            df = pd.concat([df, new_row], ignore_index=True)
-            df.to_csv(DATA_FILE, index=False)
+            # Append-only: constant cost per save regardless of history size
+            application_store.append(new_row)
             
             print(f"✅ Application saved: {customer_name} - {result['status']} - Rs.{amount:,}")
             
@@ -2266,7 +2402,7 @@ Please choose an amount within this cap for us to reassess instantly.
     def _get_conversational_ai_response(self, message):
         """Get natural, conversational AI response with full context"""
         try:
-            if not api_key:
+            if not llm.available:
                 return None
                 
             print("💬 CONVERSATIONAL AI: Creating natural response with full context...")
@@ -2328,8 +2464,11 @@ Be conversational and natural. Don't sound robotic or templated.
         
         print("📋 CONTEXTUAL FALLBACK: Using enhanced rule-based response with context")
         
-        # Enhanced rule-based responses
-        if any(word in msg for word in ["loan", "money", "borrow", "credit", "finance"]):
+        return self._topic_response(stage_intents.classify("fallback", tokenize(msg)))
+    
+    def _topic_response(self, topic):
+        """Stock answer for a fallback topic (loan, rates, emi, documents, help; anything else gets the menu)"""
+        if topic == "loan":
             return """💰 **Perfect! You're in the right place!** 💰
             
 🏆 **Tata Capital - India's #1 NBFC** offers:
@@ -2343,13 +2482,13 @@ Be conversational and natural. Don't sound robotic or templated.
 Just type your name or select an option below!"""
         
         # Rate/interest queries  
-        elif any(word in msg for word in ["rate", "interest", "charges", "cost"]):
-            return """📊 **Our Competitive Interest Rates:** 📊
+        elif topic == "rates":
+            return f"""📊 **Our Competitive Interest Rates:** 📊
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-💰 **Personal Loan:** 10.99% p.a. onwards
-🏢 **Business Loan:** 11.5% p.a. onwards  
-💒 **Wedding Loan:** 10.99% + special discount
-🏥 **Medical Loan:** 9.99% emergency rate
+💰 **Personal Loan:** {pricing.starting_rate("Personal Loan"):g}% p.a. onwards
+🏢 **Business Loan:** {pricing.starting_rate("Business Loan"):g}% p.a. onwards  
+💒 **Wedding Loan:** {pricing.starting_rate("Wedding Loan"):g}% + special discount
+🏥 **Medical Loan:** {pricing.starting_rate("Medical Loan"):g}% emergency rate
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 ✅ **Zero processing fees** for pre-approved customers
 ✅ **No hidden charges** - complete transparency
@@ -2358,7 +2497,7 @@ Just type your name or select an option below!"""
 Want to check your personalized rate? Just share your name! 👇"""
         
         # EMI/payment queries
-        elif any(word in msg for word in ["emi", "payment", "monthly"]):
+        elif topic == "emi":
             return """💳 **EMI Information:**
             
 Our EMI calculator shows:
@@ -2372,7 +2511,7 @@ Our EMI calculator shows:
 Share your loan amount for exact EMI calculation!"""
         
         # Documents/requirements
-        elif any(word in msg for word in ["document", "paper", "require", "need"]):
+        elif topic == "documents":
             return """📄 **Required Documents:**
             
 **For Pre-approved customers:**
@@ -2389,7 +2528,7 @@ Share your loan amount for exact EMI calculation!"""
 💡 Pre-approved customers get **instant approval**! Check if you're pre-approved?"""
         
         # Help/support queries
-        elif any(word in msg for word in ["help", "support", "contact"]):
+        elif topic == "help":
             return """🤝 **I'm here to help!**
             
 I can assist you with:
@@ -2414,31 +2553,43 @@ Are you interested in:
 Or simply say **"Hello"** to start your loan journey! 👋"""
 
 
+# Rule handler per conversation stage (completed has none and falls through to None)
+RULE_HANDLERS = {
+    Stage.GREETING: MasterAgent._rules_greeting,
+    Stage.IDENTIFICATION: MasterAgent._rules_identification,
+    Stage.KYC_VERIFICATION: MasterAgent._rules_kyc_verification,
+    Stage.NEW_CUSTOMER_PITCH: MasterAgent._rules_new_customer_pitch,
+    Stage.NEW_CUSTOMER_INFO: MasterAgent._rules_new_customer_info,
+    Stage.SALES_PITCH: MasterAgent._rules_sales_pitch,
+    Stage.LOAN_TYPE_SELECTION: MasterAgent._rules_loan_type_selection,
+    Stage.LOAN_REQUIREMENT: MasterAgent._rules_loan_requirement,
+    Stage.TERMS_CONFIRMATION: MasterAgent._rules_terms_confirmation,
+    Stage.KYC_UPLOAD: MasterAgent._rules_kyc_upload,
+    Stage.UNDERWRITING: MasterAgent._rules_underwriting,
+    Stage.CONDITIONAL_DOCS: MasterAgent._rules_conditional_docs,
+    Stage.SANCTION: MasterAgent._rules_sanction,
+}
+
+
 # ------------------------------
 # 4️⃣ DASHBOARD
 # ------------------------------
 def dashboard_view():
-    if not os.path.exists(DATA_FILE):
-        return pd.DataFrame([{"Message": "No applications yet"}])
-    
-    df = pd.read_csv(DATA_FILE)
+    df = application_store.recent(DASHBOARD_ROWS)
     return df if not df.empty else pd.DataFrame([{"Message": "No applications yet"}])
 
 def get_statistics():
-    if not os.path.exists(DATA_FILE):
-        return "No data available yet."
-    
-    df = pd.read_csv(DATA_FILE)
-    if df.empty:
+    summary = application_stats.summary()
+    if not summary:
         return "No applications processed yet."
     
-    total = len(df)
-    approved = len(df[df["Decision"] == "Approved"])
-    conditional = len(df[df["Decision"] == "Conditional"])
-    rejected = len(df[df["Decision"] == "Rejected"])
+    total = summary["total"]
+    approved = summary["decisions"].get("Approved", 0)
+    conditional = summary["decisions"].get("Conditional", 0)
+    rejected = summary["decisions"].get("Rejected", 0)
     
-    avg_amount = df["Amount"].mean()
-    avg_score = df["Credit Score"].mean()
+    avg_amount = summary["avg_amount"]
+    avg_score = summary["avg_score"]
     
     return f"""📊 **Application Statistics**
 ━━━━━━━━━━━━━━━━━━━━
@@ -2452,27 +2603,139 @@ Total Applications: {total}
 ━━━━━━━━━━━━━━━━━━━━"""
 
 
+# History loaded once for what-if replays; reloaded only after new applications are saved
+policy_replay = {"total": None, "replay": None}
+policy_replay_lock = threading.Lock()
+
+def run_policy_whatif(min_credit_score, max_emi_ratio, max_limit_multiple):
+    """Replay the underwriting policy over the application history with overridden thresholds"""
+    summary = application_stats.summary()
+    total = summary["total"] if summary else 0
+    with policy_replay_lock:
+        if policy_replay["replay"] is None or policy_replay["total"] != total:
+            policy_replay["replay"] = PolicyReplay.from_store(application_store)
+            policy_replay["total"] = total
+        replay = policy_replay["replay"]
+    report = replay.run(min_credit_score=min_credit_score, max_emi_ratio=max_emi_ratio,
+                        max_limit_multiple=max_limit_multiple)
+    return report["overall"], report["city"], report["credit_band"]
+
+
 # ------------------------------
 # 5️⃣ GRADIO INTERFACE
 # ------------------------------
 
-# Create master agent instance
-master = MasterAgent()
+# One master agent per browser session, bounded by LRU size and idle TTL
+# (a session dropped by either, or reset, still gets its conversation logged)
+sessions = SessionStore(
+    MasterAgent,
+    max_sessions=int(os.getenv("MAX_SESSIONS", "1000")),
+    idle_ttl=int(os.getenv("SESSION_IDLE_TTL", "1800")),
+    on_evict=lambda session_id, agent: log_conversation(agent)
+)
+
+def _session_id(request):
+    """Gradio session hash for the current event (shared fallback outside Gradio)"""
+    return getattr(request, "session_hash", None) or "default"
 
-def chat_handler(message, history):
+def get_master(request=None):
+    """Get the master agent that belongs to the caller's session"""
+    return sessions.get(_session_id(request))
+
+def chat_handler(message, history, request: gr.Request = None):
     """Handle chat messages and return proper format for Gradio"""
-    bot_response = master.process_message(message, history)
+    bot_response = get_master(request).process_message(message, history)
     return bot_response
 
-def reset_master():
+def reset_master(request=None):
     """Reset the master agent for new conversation"""
-    global master
-    master = MasterAgent()
+    sessions.reset(_session_id(request))
     return "🔄 **New session started!** Say **'Hello'** to begin your loan application journey!"
 
-def get_conversation_options():
+# Chat turns still waiting on the AI, per session, so a disconnect can cancel them
+inflight_turns = {}
+
+async def stream_turn(master, message, history, request=None):
+    """Stream one chat turn's reply, tracked so it is cancelled if the client disconnects"""
+    session_id = _session_id(request)
+    task = asyncio.current_task()
+    inflight_turns.setdefault(session_id, set()).add(task)
+    try:
+        async for partial in master.process_message_stream(message, history):
+            yield partial
+    finally:
+        pending = inflight_turns.get(session_id)
+        if pending is not None:
+            pending.discard(task)
+            if not pending:
+                inflight_turns.pop(session_id, None)
+
+async def close_session(request: gr.Request):
+    """Cancel in-flight turns and release the agent when the browser tab is closed"""
+    session_id = _session_id(request)
+    for task in inflight_turns.pop(session_id, set()):
+        task.cancel()
+    agent = sessions.discard(session_id)
+    if agent is not None:
+        await asyncio.to_thread(log_conversation, agent)
+
+def log_conversation(agent):
+    """Append a finished session's turns to the conversation log, one JSON line, if it had any
+    (python intent_classifier.py export-logs turns them into training data)"""
+    if not agent.turn_routes:
+        return
+    entry = {
+        "ended_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "final_stage": agent.conversation_stage,
+        "turns": [{"stage": stage, "route": route, "confidence": confidence, "message": message}
+                  for stage, route, confidence, message in agent.turn_routes],
+    }
+    conversation_log.append(entry)
+
+def get_session_statistics():
+    stats = sessions.stats()
+    llm_stats = llm.stats()
+    cache_stats = ai_reply_cache.stats()
+    book_stats = offer_book.stats()
+    pdf_stats = sanction_letters.stats()
+    crm_stats = crm.stats()
+    gazetteer_phrases = gazetteer.stats()["phrases"]
+    crm_cache = f" | LRU {crm_stats['hit_rate']:.0%} hits ({crm_stats['cached']:,} cached)" if "hit_rate" in crm_stats else ""
+    pricing_stats = pricing.stats()
+    route_stats = turn_router.stats()
+    fsm_stats = transition_stats.snapshot()
+    warmup = llm_stats.get("warmup", {"status": "n/a"})
+    if warmup["status"] == "ok":
+        warmup_text = f"client {warmup['client_ms']:.0f} ms, first call {warmup['first_call_ms']:.0f} ms"
+    else:
+        warmup_text = warmup["status"]
+    return f"""👥 **Session Statistics**
+━━━━━━━━━━━━━━━━━━━━
+Live Sessions: {stats['live']}
+Session Hits: {stats['hits']}
+New Sessions: {stats['misses']}
+Evicted (LRU): {stats['evicted_lru']}
+Evicted (Idle): {stats['evicted_idle']}
+━━━━━━━━━━━━━━━━━━━━
+🤖 LLM Provider: {llm.label}
+📦 Models Cached: {llm_stats.get('models', 0)}
+🔌 Circuit: {llm_stats['circuit']} (opened {llm_stats['circuit_opens']}x) | p95 {llm_stats['p95_seconds']:.2f}s
+⏳ In Flight: {llm_stats['in_flight']} | Timeouts: {llm_stats['timeouts']} | Failures: {llm_stats['failures']}
+⚡ Bypassed: {llm_stats['rejected_open']} (circuit open), {llm_stats['rejected_saturated']} (saturated)
+🧭 Turn Routes: {route_stats.get('rules', 0)} rules | {route_stats.get('intent', 0)} local intent | {route_stats.get('llm', 0)} AI | {route_stats.get('fallback', 0)} AI fallback
+🗺️ Stage Transitions: {sum(fsm_stats['transitions'].values())} | Rejected: {sum(fsm_stats['rejected'].values())} | Off-table: {sum(fsm_stats['unlisted'].values())}
+💱 Pricing Grid: {pricing_stats['loan_types']} loan types | {pricing_stats['reloads']} reloads ({pricing_stats['reload_errors']} failed)
+👥 CRM: {crm_stats['customers']:,} customers{crm_cache}
+📚 Gazetteer: {gazetteer_phrases.get('city', 0)} city / {gazetteer_phrases.get('loan_type', 0)} loan type / {gazetteer_phrases.get('customer', 0)} customer phrases
+📒 Offer Book: {book_stats['memory_hits']} memory / {book_stats['disk_hits']} disk hits | {book_stats['rebuilt']} rebuilt ({book_stats['stale']} stale)
+📄 Sanction Letters: {pdf_stats['depth']} in queue (peak {pdf_stats['peak_depth']}) | {pdf_stats['completed']} rendered / {pdf_stats['failed']} failed | render p50 {pdf_stats['render_p50_ms']:.0f} ms, p95 {pdf_stats['render_p95_ms']:.0f} ms | ready p95 {pdf_stats['wait_p95_ms']:.0f} ms ({pdf_stats['workers']} workers)
+🧠 AI Reply Cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%}) | {cache_stats['keys']} keys
+🔥 Warm-up: {warmup_text}
+━━━━━━━━━━━━━━━━━━━━"""
+
+def get_conversation_options(request: gr.Request = None):
     """Get clickable options based on current conversation stage"""
-    stage = master.conversation_stage
+    stage = get_master(request).conversation_stage
     
     if stage == "greeting":
         return [
@@ -2629,15 +2892,15 @@ with gr.Blocks(theme=gr.themes.Soft(), title="Tata Capital Loan Assistant") as d
             file_types=[".pdf", ".png", ".jpg", ".jpeg"],
             visible=False
         )
+
+        # Filled in by the timer once the session's sanction letter has been rendered
+        sanction_file = gr.File(label="📄 Your Sanction Letter", interactive=False, visible=False)
+        sanction_timer = gr.Timer(1.0, active=False)
         
         # Handle all interactions with dynamic button updates
-        def respond(message, history):
+        async def respond(message, history, request: gr.Request):
+            master = get_master(request)
             print(f"💬 TEXT INPUT: '{message}' | Stage: {master.conversation_stage}")
-            bot_response = master.process_message(message, history)
-            
-            # Get current stage response options (after processing)
-            response_options = master._get_response_options()
-            print(f"📋 UPDATED STAGE: {master.conversation_stage} | OPTIONS: {response_options}")
             
             # Convert to proper message format for Gradio 5.x
             if history is None:
@@ -2645,7 +2908,16 @@ with gr.Blocks(theme=gr.themes.Soft(), title="Tata Capital Loan Assistant") as d
             
             # Add user message and bot response in Gradio 5.x format
             history.append({"role": "user", "content": message})
-            history.append({"role": "assistant", "content": bot_response})
+            history.append({"role": "assistant", "content": ""})
+            
+            # Stream the reply as it arrives; buttons are left alone until the turn completes
+            async for partial in stream_turn(master, message, history, request):
+                history[-1]["content"] = partial
+                yield history, "", *[gr.update()] * 4, gr.update()
+            
+            # Get current stage response options (after processing)
+            response_options = master._get_response_options()
+            print(f"📋 UPDATED STAGE: {master.conversation_stage} | OPTIONS: {response_options}")
             
             # Update dynamic buttons with proper visibility
             button_updates = []
@@ -2661,10 +2933,11 @@ with gr.Blocks(theme=gr.themes.Soft(), title="Tata Capital Loan Assistant") as d
 
             upload_visibility = gr.update(visible=(master.conversation_stage == "conditional_docs"))
             
-            return history, "", *button_updates, upload_visibility
+            yield history, "", *button_updates, upload_visibility
         
-        def button_click(message, history):
+        async def button_click(message, history, request: gr.Request):
             """Handle button clicks while preserving chat history"""
+            master = get_master(request)
             print(f"🔘 BUTTON CLICKED: '{message}' | Stage: {master.conversation_stage}")
             
             # Use existing history or initialize empty
@@ -2690,16 +2963,19 @@ with gr.Blocks(theme=gr.themes.Soft(), title="Tata Capital Loan Assistant") as d
                 clean_message = "Check eligibility"
             
             print(f"🔄 PROCESSING: '{clean_message}' | Current history length: {len(history)}")
-            bot_response = master.process_message(clean_message, history)
-            
-            # Get NEW stage response options (after processing the message)
-            response_options = master._get_response_options()
-            print(f"📋 NEW STAGE: {master.conversation_stage} | OPTIONS: {response_options}")
             
             # Add to history in Gradio 5.x format  
             updated_history = history.copy()
             updated_history.append({"role": "user", "content": message})
-            updated_history.append({"role": "assistant", "content": bot_response})
+            updated_history.append({"role": "assistant", "content": ""})
+            
+            async for partial in stream_turn(master, clean_message, history, request):
+                updated_history[-1]["content"] = partial
+                yield updated_history, "", *[gr.update()] * 4, gr.update()
+            
+            # Get NEW stage response options (after processing the message)
+            response_options = master._get_response_options()
+            print(f"📋 NEW STAGE: {master.conversation_stage} | OPTIONS: {response_options}")
             
             # Update dynamic buttons with proper text
             button_updates = []
@@ -2715,35 +2991,46 @@ with gr.Blocks(theme=gr.themes.Soft(), title="Tata Capital Loan Assistant") as d
 
             upload_visibility = gr.update(visible=(master.conversation_stage == "conditional_docs"))
             
-            return updated_history, "", *button_updates, upload_visibility
+            yield updated_history, "", *button_updates, upload_visibility
         
-        def reset_conversation():
-            reset_master()
+        def reset_conversation(request: gr.Request):
+            reset_master(request)
             return []
+
+        def quick_reply(text):
+            """Build a click handler that sends a fixed message for the caller's session"""
+            async def handler(history, request: gr.Request):
+                async for update in button_click(text, history, request):
+                    yield update
+            return handler
         
         # Event handlers with dynamic button updates
         msg.submit(respond, [msg, chatbot], [chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
         
         # Dynamic response buttons - use a simple approach that gets current button text from master agent
-        def option1_click(history):
-            options = master._get_response_options()
+        async def option1_click(history, request: gr.Request):
+            options = get_master(request)._get_response_options()
             btn_text = options[0] if len(options) > 0 and options[0] else "Hello"
-            return button_click(btn_text, history)
+            async for update in button_click(btn_text, history, request):
+                yield update
         
-        def option2_click(history):
-            options = master._get_response_options()
+        async def option2_click(history, request: gr.Request):
+            options = get_master(request)._get_response_options()
             btn_text = options[1] if len(options) > 1 and options[1] else "I'm an existing customer"  
-            return button_click(btn_text, history)
+            async for update in button_click(btn_text, history, request):
+                yield update
         
-        def option3_click(history):
-            options = master._get_response_options()
+        async def option3_click(history, request: gr.Request):
+            options = get_master(request)._get_response_options()
             btn_text = options[2] if len(options) > 2 and options[2] else "I'm new to Tata Capital"
-            return button_click(btn_text, history)
+            async for update in button_click(btn_text, history, request):
+                yield update
         
-        def option4_click(history):
-            options = master._get_response_options()
+        async def option4_click(history, request: gr.Request):
+            options = get_master(request)._get_response_options()
             btn_text = options[3] if len(options) > 3 and options[3] else "Tell me about services"
-            return button_click(btn_text, history)
+            async for update in button_click(btn_text, history, request):
+                yield update
         
         option1_btn.click(option1_click, inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
         option2_btn.click(option2_click, inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
@@ -2751,42 +3038,43 @@ with gr.Blocks(theme=gr.themes.Soft(), title="Tata Capital Loan Assistant") as d
         option4_btn.click(option4_click, inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
         
         # Quick action buttons
-        hello_btn.click(lambda history: button_click("Hello", history), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
-        existing_btn.click(lambda history: button_click("I'm an existing customer", history), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
-        new_btn.click(lambda history: button_click("I'm a new customer", history), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
+        hello_btn.click(quick_reply("Hello"), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
+        existing_btn.click(quick_reply("I'm an existing customer"), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
+        new_btn.click(quick_reply("I'm a new customer"), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
         
-        def reset_with_buttons():
-            reset_master()
+        def reset_with_buttons(request: gr.Request):
+            reset_master(request)
             return [], "", gr.Button("👋 Hello, I'm ready to start", visible=True), gr.Button("🆔 I'm an existing customer", visible=True), gr.Button("🆕 I'm new to Tata Capital", visible=True), gr.Button("❓ Tell me about your services", visible=True), gr.update(visible=False)
         
         reset_btn.click(reset_with_buttons, outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
         
         # Loan type buttons
-        personal_btn.click(lambda history: button_click("Personal Loan", history), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
-        business_btn.click(lambda history: button_click("Business Loan", history), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
-        wedding_btn.click(lambda history: button_click("Wedding Loan", history), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
-        medical_btn.click(lambda history: button_click("Medical Loan", history), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
+        personal_btn.click(quick_reply("Personal Loan"), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
+        business_btn.click(quick_reply("Business Loan"), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
+        wedding_btn.click(quick_reply("Wedding Loan"), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
+        medical_btn.click(quick_reply("Medical Loan"), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
         
         # Salary buttons
-        salary_30k_btn.click(lambda history: button_click("My salary is 30000", history), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
-        salary_50k_btn.click(lambda history: button_click("My salary is 50000", history), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
-        salary_75k_btn.click(lambda history: button_click("My salary is 75000", history), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
-        salary_1l_btn.click(lambda history: button_click("My salary is 100000", history), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
+        salary_30k_btn.click(quick_reply("My salary is 30000"), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
+        salary_50k_btn.click(quick_reply("My salary is 50000"), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
+        salary_75k_btn.click(quick_reply("My salary is 75000"), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
+        salary_1l_btn.click(quick_reply("My salary is 100000"), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
         
         # Amount buttons
-        amount_2l_btn.click(lambda history: button_click("I need 2 lakh", history), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
-        amount_3l_btn.click(lambda history: button_click("I need 3 lakh", history), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
-        amount_5l_btn.click(lambda history: button_click("I need 5 lakh", history), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
-        amount_10l_btn.click(lambda history: button_click("I need 10 lakh", history), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
+        amount_2l_btn.click(quick_reply("I need 2 lakh"), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
+        amount_3l_btn.click(quick_reply("I need 3 lakh"), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
+        amount_5l_btn.click(quick_reply("I need 5 lakh"), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
+        amount_10l_btn.click(quick_reply("I need 10 lakh"), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
         
         # Response buttons
-        yes_btn.click(lambda history: button_click("Yes, I'm interested", history), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
-        no_btn.click(lambda history: button_click("No, not interested", history), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
-        proceed_btn.click(lambda history: button_click("Yes, proceed", history), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
-        help_btn.click(lambda history: button_click("Help me", history), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
+        yes_btn.click(quick_reply("Yes, I'm interested"), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
+        no_btn.click(quick_reply("No, not interested"), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
+        proceed_btn.click(quick_reply("Yes, proceed"), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
+        help_btn.click(quick_reply("Help me"), inputs=[chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
 
-        def handle_salary_upload(file, history):
+        def handle_salary_upload(file, history, request: gr.Request):
             """Process uploaded salary slips and advance the conversation"""
+            master = get_master(request)
             if history is None:
                 history = []
             updated_history = history.copy()
@@ -2833,25 +3121,62 @@ with gr.Blocks(theme=gr.themes.Soft(), title="Tata Capital Loan Assistant") as d
             return updated_history, "", *button_updates, gr.update(visible=False)
 
         upload_salary.upload(handle_salary_upload, inputs=[upload_salary, chatbot], outputs=[chatbot, msg, option1_btn, option2_btn, option3_btn, option4_btn, upload_salary])
+
+        def arm_sanction_timer(request: gr.Request):
+            """Poll only while this session has a letter in the PDF queue"""
+            master = get_master(request)
+            return (gr.Timer(active="sanction_job" in master.context),
+                    gr.update(visible="sanction_letter" in master.context))
+
+        def poll_sanction_letter(history, request: gr.Request):
+            """Hand the session its sanction letter once the render job is done"""
+            master = get_master(request)
+            status, path = master.sanction_letter_update()
+            if status is None or status == "retrying":
+                return gr.update(), gr.update(), gr.Timer(active="sanction_job" in master.context)
+            updated_history = (history or []).copy()
+            if status == "ready":
+                updated_history.append({"role": "assistant", "content": "📄 **Your sanction letter is ready!** Download it below."})
+                return updated_history, gr.update(value=path, visible=True), gr.Timer(active=False)
+            updated_history.append({"role": "assistant", "content": "⚠️ We couldn't prepare your sanction letter just now. Please call 1800-209-8787 and we'll email it to you."})
+            return updated_history, gr.update(), gr.Timer(active=False)
+
+        chatbot.change(arm_sanction_timer, outputs=[sanction_timer, sanction_file], trigger_mode="always_last")
+        sanction_timer.tick(poll_sanction_letter, inputs=[chatbot], outputs=[chatbot, sanction_file, sanction_timer])
         
 
     
     with gr.Tab("📊 Analytics Dashboard"):
         gr.Markdown("### Loan Application Analytics")
         
-        stats = gr.Textbox(label="Summary Statistics", value=get_statistics(), lines=12)
+        stats = gr.Textbox(label="Summary Statistics", value=get_statistics, lines=12)
         
         gr.Markdown("### Recent Applications")
-        dashboard = gr.DataFrame(value=dashboard_view(), label="Application History")
+        dashboard = gr.DataFrame(value=dashboard_view, label="Application History")
+        
+        session_stats = gr.Textbox(label="Live Sessions", value=get_session_statistics, lines=8)
         
         refresh_btn = gr.Button("🔄 Refresh Dashboard")
         refresh_btn.click(fn=dashboard_view, outputs=dashboard)
         refresh_btn.click(fn=get_statistics, outputs=stats)
+        refresh_btn.click(fn=get_session_statistics, outputs=session_stats)
+        
+        with gr.Accordion("🧪 Policy What-If", open=False):
+            gr.Markdown("Re-run the underwriting policy over every saved application with different thresholds")
+            with gr.Row():
+                whatif_score = gr.Number(value=underwriting_policy.min_credit_score, label="Minimum Credit Score")
+                whatif_emi_ratio = gr.Number(value=underwriting_policy.max_emi_ratio, label="Max EMI / Salary (%)")
+                whatif_limit = gr.Number(value=underwriting_policy.max_limit_multiple, label="Max x Pre-Approved Limit")
+            whatif_btn = gr.Button("▶️ Run What-If")
+            whatif_overall = gr.DataFrame(label="Overall")
+            whatif_city = gr.DataFrame(label="By City")
+            whatif_band = gr.DataFrame(label="By Credit Band")
+            whatif_btn.click(fn=run_policy_whatif, inputs=[whatif_score, whatif_emi_ratio, whatif_limit],
+                             outputs=[whatif_overall, whatif_city, whatif_band])
     
     with gr.Tab("👥 Customer Database"):
         gr.Markdown("### Synthetic Customer Data (CRM Server)")
-        customer_df = pd.DataFrame.from_dict(customers, orient='index')
-        customer_df = customer_df.reset_index().rename(columns={'index': 'Name'})
+        customer_df = crm.frame(limit=DASHBOARD_ROWS)
         gr.DataFrame(value=customer_df, label="Customer Records")
     
     with gr.Tab("ℹ️ System Info"):
@@ -2900,6 +3225,12 @@ with gr.Blocks(theme=gr.themes.Soft(), title="Tata Capital Loan Assistant") as d
         - Pandas for data management
         """)
 
+    demo.unload(close_session)
+
+# Gradio runs each event one request at a time unless told otherwise; let as many chat turns run
+# at once as the LLM guard admits, so slow AI turns of different sessions overlap
+demo.queue(default_concurrency_limit=LLM_MAX_IN_FLIGHT)
+
 # Launch configuration for different environments
 if __name__ == "__main__":
     # Check if running in a containerized environment
@@ -2934,4 +3265,7 @@ if __name__ == "__main__":
     print(f"📱 Access at: http://localhost:{launch_kwargs['server_port']}")
     print(f"🔗 Alternative: http://127.0.0.1:{launch_kwargs['server_port']}")
     
+    sanction_letters.start()
+    print(f"📄 Sanction letters: {sanction_letters.workers or 'no'} worker processes"
+          f"{'' if sanction_letters.workers else ' (rendering in a background thread)'}")
     demo.launch(**launch_kwargs)
\ No newline at end of file
@@ -0,0 +1,524 @@
+# application_store.py
+# Persistence for loan application decisions
+# Pluggable backends: append-only CSV (default) or indexed SQLite in WAL mode
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (multi-threaded CSV parsing for full-history reads)
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
+APPLICATION_COLUMNS = [
+    "Timestamp", "Customer", "Age", "City", "Amount", "Tenure", "Interest Rate",
+    "Credit Score", "Pre-Approved Limit", "Salary", "Decision", "Confidence (%)"
+]
+
+# One lock per file for the whole process, shared by every writer of that file
+_file_locks = {}
+_file_locks_guard = threading.Lock()
+
+
+def _lock_for(path):
+    path = os.path.abspath(path)
+    with _file_locks_guard:
+        return _file_locks.setdefault(path, threading.Lock())
+
+
+class CsvApplicationWriter:
+    """Append-only CSV writer: O(1) per row (each save opens the file in append mode),
+    header written once, optional batched fsync"""
+
+    def __init__(self, path, columns=APPLICATION_COLUMNS, fsync_every=0):
+        self.path = path
+        self.columns = list(columns)
+        self.fsync_every = fsync_every  # 0 = flush to the OS only, N = fsync every N rows
+        self._lock = _lock_for(path)
+        self._unsynced = 0
+
+    def _write(self, row=None):
+        """Append a row (with the header first if the file is new); returns the end offset"""
+        needs_header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=self.columns, extrasaction="ignore", lineterminator="\n")
+            if needs_header:
+                writer.writeheader()
+            if row is not None:
+                writer.writerow(row)
+                if self.fsync_every:
+                    self._unsynced += 1
+                    if self._unsynced >= self.fsync_every:
+                        f.flush()
+                        os.fsync(f.fileno())
+                        self._unsynced = 0
+            return f.tell()
+
+    def ensure_file(self):
+        """Create the file with its header if it doesn't exist yet"""
+        with self._lock:
+            self._write()
+
+    def append(self, row):
+        """Append one application row (a dict keyed by column name); returns the end offset"""
+        with self._lock:
+            return self._write(row)
+
+    def sync(self):
+        """Force any batched rows to disk"""
+        with self._lock:
+            if self._unsynced and os.path.exists(self.path):
+                with open(self.path, "rb") as f:
+                    os.fsync(f.fileno())
+            self._unsynced = 0
+
+    def close(self):
+        self.sync()
+
+
+class JsonLinesWriter(CsvApplicationWriter):
+    """Append-only JSON lines writer (one record per line) for logs without fixed columns, such as
+    the conversation log: the same O(1) append, shared file lock and batched fsync as the CSV writer"""
+
+    def __init__(self, path, fsync_every=0):
+        super().__init__(path, columns=(), fsync_every=fsync_every)
+
+    def _write(self, row=None):
+        with open(self.path, "a", encoding="utf-8") as f:
+            if row is not None:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                if self.fsync_every:
+                    self._unsynced += 1
+                    if self._unsynced >= self.fsync_every:
+                        f.flush()
+                        os.fsync(f.fileno())
+                        self._unsynced = 0
+            return f.tell()
+
+
+# ------------------------------
+# Storage backends
+# ------------------------------
+
+class ApplicationStore:
+    """Interface every application storage backend implements"""
+
+    statistics = None
+
+    def append(self, row):
+        """Persist one row and feed it to the attached RunningStatistics"""
+        with self._append_lock:
+            cursor = self._append(row)
+            if self.statistics is not None:
+                self.statistics.record(row, cursor)
+
+    def _append(self, row):
+        """Backend write; returns a cursor that rows_since() can resume after"""
+        raise NotImplementedError
+
+    def rows_since(self, cursor):
+        """Yield (row, cursor) for every row written after cursor (None = from the start)"""
+        raise NotImplementedError
+
+    def identity(self):
+        """Stable name for checkpoints, so a checkpoint is never replayed against another store"""
+        raise NotImplementedError
+
+    def attach_statistics(self, statistics):
+        """Bring statistics up to date with rows written since its checkpoint, then keep it updated"""
+        with self._append_lock:
+            statistics.catch_up(self)
+            self.statistics = statistics
+
+    def recent(self, limit=500):
+        """Newest applications first, as a DataFrame with APPLICATION_COLUMNS"""
+        raise NotImplementedError
+
+    def summary(self):
+        """{"total", "decisions": {decision: count}, "avg_amount", "avg_score"} or None when empty"""
+        raise NotImplementedError
+
+    def history(self, columns):
+        """Every application, loading only the given APPLICATION_COLUMNS (columnar, for replays)"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def csv_rows_since(path, cursor):
+    """Yield (row, byte offset after it) for every CSV row after cursor (None = from the start)"""
+    # A file shorter than the cursor was replaced, so start over
+    cursor = cursor or 0
+    if cursor > os.path.getsize(path):
+        cursor = 0
+    with open(path, "rb") as f:
+        f.seek(cursor)
+        if cursor == 0:
+            cursor += len(f.readline())  # header
+        for line in f:
+            cursor += len(line)
+            values = next(csv.reader([line.decode("utf-8")]), None)
+            if values:
+                yield dict(zip(APPLICATION_COLUMNS, values)), cursor
+
+
+class CsvApplicationStore(ApplicationStore):
+    """Append-only CSV file; reads still scan the whole file"""
+
+    def __init__(self, path, fsync_every=0):
+        self.path = path
+        self._append_lock = threading.Lock()
+        self.writer = CsvApplicationWriter(path, fsync_every=fsync_every)
+        self.writer.ensure_file()
+
+    def _append(self, row):
+        return self.writer.append(row)
+
+    def identity(self):
+        return "csv:" + os.path.abspath(self.path)
+
+    def rows_since(self, cursor):
+        return csv_rows_since(self.path, cursor)
+
+    def _read(self):
+        try:
+            return pd.read_csv(self.path)
+        except (FileNotFoundError, pd.errors.EmptyDataError):
+            return pd.DataFrame(columns=APPLICATION_COLUMNS)
+
+    def recent(self, limit=500):
+        df = self._read()
+        return df.iloc[::-1].head(limit).reset_index(drop=True)
+
+    def history(self, columns):
+        try:
+            return pd.read_csv(self.path, usecols=list(columns), engine=CSV_ENGINE)
+        except (FileNotFoundError, pd.errors.EmptyDataError):
+            return pd.DataFrame(columns=list(columns))
+
+    def summary(self):
+        df = self._read()
+        if df.empty:
+            return None
+        return {
+            "total": len(df),
+            "decisions": df["Decision"].value_counts().to_dict(),
+            "avg_amount": df["Amount"].mean(),
+            "avg_score": df["Credit Score"].mean()
+        }
+
+    def close(self):
+        self.writer.close()
+
+
+# Display column -> SQLite column
+SQL_COLUMNS = {
+    "Timestamp": "timestamp", "Customer": "customer", "Age": "age", "City": "city",
+    "Amount": "amount", "Tenure": "tenure", "Interest Rate": "interest_rate",
+    "Credit Score": "credit_score", "Pre-Approved Limit": "pre_approved_limit",
+    "Salary": "salary", "Decision": "decision", "Confidence (%)": "confidence"
+}
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS applications (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    customer TEXT,
+    age INTEGER,
+    city TEXT,
+    amount INTEGER,
+    tenure INTEGER,
+    interest_rate REAL,
+    credit_score INTEGER,
+    pre_approved_limit INTEGER,
+    salary INTEGER,
+    decision TEXT,
+    confidence INTEGER
+)"""
+
+CREATE_INDEXES_SQL = [
+    "CREATE INDEX IF NOT EXISTS idx_applications_timestamp ON applications (timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_applications_decision ON applications (decision)",
+    "CREATE INDEX IF NOT EXISTS idx_applications_city ON applications (city)",
+    "CREATE INDEX IF NOT EXISTS idx_applications_customer ON applications (customer)",
+]
+
+# Fixed SQL text so sqlite3's statement cache reuses the prepared statements
+INSERT_SQL = "INSERT INTO applications ({}) VALUES ({})".format(
+    ", ".join(SQL_COLUMNS.values()), ", ".join("?" * len(SQL_COLUMNS))
+)
+RECENT_SQL = "SELECT {} FROM applications ORDER BY timestamp DESC, id DESC LIMIT ?".format(
+    ", ".join(f'{column} AS "{label}"' for label, column in SQL_COLUMNS.items())
+)
+# How far each source file has been imported (byte offset), so a migration can be re-run
+CREATE_IMPORTS_SQL = "CREATE TABLE IF NOT EXISTS imports (source TEXT PRIMARY KEY, cursor INTEGER NOT NULL)"
+ROWS_SINCE_SQL = "SELECT id, {} FROM applications WHERE id > ? ORDER BY id".format(
+    ", ".join(SQL_COLUMNS.values())
+)
+SUMMARY_SQL = """
+SELECT decision, COUNT(*), SUM(amount), SUM(credit_score)
+FROM applications
+GROUP BY decision"""
+
+
+class SqliteApplicationStore(ApplicationStore):
+    """SQLite in WAL mode with indexes on Timestamp, Decision, City and Customer"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._append_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, cached_statements=64)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(CREATE_TABLE_SQL)
+            self._conn.execute(CREATE_IMPORTS_SQL)
+            for statement in CREATE_INDEXES_SQL:
+                self._conn.execute(statement)
+
+    @staticmethod
+    def _values(row):
+        return tuple(row.get(label) for label in SQL_COLUMNS)
+
+    def _append(self, row):
+        with self._lock, self._conn:
+            return self._conn.execute(INSERT_SQL, self._values(row)).lastrowid
+
+    def identity(self):
+        return "sqlite:" + os.path.abspath(self.path)
+
+    def rows_since(self, cursor):
+        with self._lock:
+            rows = self._conn.execute(ROWS_SINCE_SQL, (cursor or 0,)).fetchall()
+        for row in rows:
+            yield dict(zip(APPLICATION_COLUMNS, row[1:])), row[0]
+
+    def append_many(self, rows, source=None, cursor=None):
+        """Insert rows; with a source, record how far it has been imported in the same transaction"""
+        with self._lock, self._conn:
+            self._conn.executemany(INSERT_SQL, (self._values(row) for row in rows))
+            if source is not None:
+                self._conn.execute("INSERT OR REPLACE INTO imports VALUES (?, ?)", (source, cursor))
+
+    def imported_cursor(self, source):
+        """Byte offset a source file was imported up to, or None if it never was"""
+        with self._lock:
+            row = self._conn.execute("SELECT cursor FROM imports WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM applications").fetchone()[0]
+
+    def recent(self, limit=500):
+        with self._lock:
+            cursor = self._conn.execute(RECENT_SQL, (limit,))
+            rows = cursor.fetchall()
+        return pd.DataFrame(rows, columns=APPLICATION_COLUMNS)
+
+    def history(self, columns):
+        sql = "SELECT {} FROM applications".format(
+            ", ".join(f'{SQL_COLUMNS[label]} AS "{label}"' for label in columns))
+        with self._lock:
+            rows = self._conn.execute(sql).fetchall()
+        return pd.DataFrame(rows, columns=list(columns))
+
+    def summary(self):
+        with self._lock:
+            groups = self._conn.execute(SUMMARY_SQL).fetchall()
+        total = sum(count for _, count, _, _ in groups)
+        if not total:
+            return None
+        return {
+            "total": total,
+            "decisions": {decision: count for decision, count, _, _ in groups},
+            "avg_amount": sum(amount or 0 for _, _, amount, _ in groups) / total,
+            "avg_score": sum(score or 0 for _, _, _, score in groups) / total
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# ------------------------------
+# Running statistics
+# ------------------------------
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class RunningStatistics:
+    """Application counts and means kept up to date on every save, so reads are O(1)
+
+    A checkpoint (counts, sums and the store cursor) is written every
+    `checkpoint_every` rows and on close; after a restart only rows written
+    since the checkpoint are replayed.
+    """
+
+    def __init__(self, checkpoint_path, checkpoint_every=100):
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self._lock = threading.Lock()
+        self._store_identity = None
+        self._reset()
+
+    def _reset(self):
+        self.cursor = None
+        self.total = 0
+        self.decisions = {}
+        self.amount_sum = 0.0
+        self.amount_count = 0
+        self.score_sum = 0.0
+        self.score_count = 0
+        self._since_checkpoint = 0
+
+    def _add(self, row):
+        self.total += 1
+        decision = row.get("Decision")
+        self.decisions[decision] = self.decisions.get(decision, 0) + 1
+        amount = _number(row.get("Amount"))
+        if amount is not None:
+            self.amount_sum += amount
+            self.amount_count += 1
+        score = _number(row.get("Credit Score"))
+        if score is not None:
+            self.score_sum += score
+            self.score_count += 1
+
+    def catch_up(self, store):
+        """Load the checkpoint and replay rows the store has written since"""
+        with self._lock:
+            self._store_identity = store.identity()
+            self._load_checkpoint()
+            replayed = 0
+            for row, cursor in store.rows_since(self.cursor):
+                self._add(row)
+                self.cursor = cursor
+                replayed += 1
+            if replayed:
+                print(f"📊 STATS: Replayed {replayed} applications written since the last checkpoint")
+                self._save_checkpoint()
+
+    def record(self, row, cursor):
+        with self._lock:
+            self._add(row)
+            self.cursor = cursor
+            self._since_checkpoint += 1
+            if self._since_checkpoint >= self.checkpoint_every:
+                self._save_checkpoint()
+
+    def summary(self):
+        """Same shape as ApplicationStore.summary(), without touching storage"""
+        with self._lock:
+            if not self.total:
+                return None
+            return {
+                "total": self.total,
+                "decisions": dict(self.decisions),
+                "avg_amount": self.amount_sum / self.amount_count if self.amount_count else 0,
+                "avg_score": self.score_sum / self.score_count if self.score_count else 0
+            }
+
+    def _load_checkpoint(self):
+        self._reset()
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if state.get("store") != self._store_identity:
+            return
+        self.cursor = state["cursor"]
+        self.total = state["total"]
+        self.decisions = state["decisions"]
+        self.amount_sum, self.amount_count = state["amount_sum"], state["amount_count"]
+        self.score_sum, self.score_count = state["score_sum"], state["score_count"]
+
+    def _save_checkpoint(self):
+        state = {
+            "store": self._store_identity, "cursor": self.cursor, "total": self.total,
+            "decisions": self.decisions,
+            "amount_sum": self.amount_sum, "amount_count": self.amount_count,
+            "score_sum": self.score_sum, "score_count": self.score_count
+        }
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.checkpoint_path)
+        self._since_checkpoint = 0
+
+    def checkpoint(self):
+        with self._lock:
+            if self._store_identity is not None:
+                self._save_checkpoint()
+
+
+def migrate_csv_to_sqlite(csv_path, db_path, batch_size=10000):
+    """Import an applications CSV into a SQLite store; returns rows copied.
+    The byte offset reached is stored with each batch, so re-running only copies rows added since"""
+    store = SqliteApplicationStore(db_path)
+    source = "csv:" + os.path.abspath(csv_path)
+    copied = 0
+    try:
+        cursor = store.imported_cursor(source)
+        if cursor is None and store.count():
+            print(f"⚠️ {db_path} already has applications and no import record for {csv_path}; not importing it again")
+            return 0
+        batch = []
+        for row, offset in csv_rows_since(csv_path, cursor):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                store.append_many(batch, source, offset)
+                copied += len(batch)
+                batch = []
+        if batch:
+            store.append_many(batch, source, offset)
+            copied += len(batch)
+    finally:
+        store.close()
+    return copied
+
+
+def open_application_store(backend, csv_path, db_path=None, fsync_every=0):
+    """Build the configured backend ("csv" or "sqlite")"""
+    if backend == "sqlite":
+        db_path = db_path or os.path.splitext(csv_path)[0] + ".db"
+        first_run = not os.path.exists(db_path)
+        store = SqliteApplicationStore(db_path)
+        if first_run and os.path.exists(csv_path):
+            store.close()
+            copied = migrate_csv_to_sqlite(csv_path, db_path)
+            print(f"📦 Migrated {copied} applications from {csv_path} to {db_path}")
+            store = SqliteApplicationStore(db_path)
+        return store
+    if backend == "csv":
+        return CsvApplicationStore(csv_path, fsync_every=fsync_every)
+    raise ValueError(f"Unknown application store backend: {backend}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Application store utilities")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    migrate = subcommands.add_parser("migrate", help="copy an applications CSV into SQLite")
+    migrate.add_argument("--csv", default="loan_applications.csv")
+    migrate.add_argument("--db", default="loan_applications.db")
+    migrate.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        copied = migrate_csv_to_sqlite(args.csv, args.db, args.batch_size)
+        print(f"📦 Migrated {copied} applications from {args.csv} to {args.db}")
@@ -0,0 +1,161 @@
+# batch_underwriting.py
+# Score files of applicants (CSV, Parquet or JSONL) with the chat's underwriting policy
+# Reads and writes in chunks so million-row partner lead files never sit in memory at once
+#
+# Usage: python batch_underwriting.py leads.csv -o decisions.csv [--chunk-size 250000]
+
+import argparse
+import os
+import re
+import time
+from collections import Counter
+
+import pandas as pd
+
+from underwriting_policy import UnderwritingPolicy
+
+REQUIRED_COLUMNS = ["salary", "credit_score", "pre_approved_limit", "amount"]
+# Other spellings accepted for the input columns (after lower-casing and snake-casing),
+# including the headers of loan_applications.csv
+COLUMN_ALIASES = {
+    "customer": "name",
+    "score": "credit_score",
+    "limit": "pre_approved_limit",
+    "loan_amount": "amount",
+    "monthly_salary": "salary",
+}
+DECISION_COLUMNS = ["decision", "reason", "interest_rate", "emi", "emi_ratio", "approved_amount", "max_amount"]
+
+
+def _file_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".csv", ".txt"):
+        return "csv"
+    if extension in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    if extension in (".parquet", ".pq"):
+        return "parquet"
+    raise ValueError(f"Unsupported file type: {path} (use .csv, .jsonl or .parquet)")
+
+
+def _import_parquet():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("Parquet files need pyarrow (pip install pyarrow)") from e
+    return pyarrow, pyarrow.parquet
+
+
+def normalize_columns(frame, required=REQUIRED_COLUMNS):
+    """Rename input columns to the policy's snake_case names"""
+    renamed = {}
+    for column in frame.columns:
+        key = re.sub(r"[^a-z0-9]+", "_", str(column).strip().lower()).strip("_")
+        renamed[column] = COLUMN_ALIASES.get(key, key)
+    frame = frame.rename(columns=renamed)
+    missing = [column for column in required if column not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing applicant columns: {', '.join(missing)}")
+    return frame
+
+
+def read_chunks(path, chunk_size):
+    """Yield DataFrames of at most chunk_size applicants"""
+    file_format = _file_format(path)
+    if file_format == "csv":
+        yield from pd.read_csv(path, chunksize=chunk_size)
+    elif file_format == "jsonl":
+        yield from pd.read_json(path, lines=True, chunksize=chunk_size)
+    else:
+        _, parquet = _import_parquet()
+        for batch in parquet.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+
+
+class ChunkWriter:
+    """Appends decision chunks to a CSV, JSONL or Parquet file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.format = _file_format(path)
+        self._parquet_writer = None
+        self._started = False
+
+    def write(self, frame):
+        if self.format == "csv":
+            frame.to_csv(self.path, mode="a" if self._started else "w", header=not self._started, index=False)
+        elif self.format == "jsonl":
+            with open(self.path, "a" if self._started else "w", encoding="utf-8") as f:
+                frame.to_json(f, orient="records", lines=True)
+        else:
+            pyarrow, parquet = _import_parquet()
+            table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = parquet.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        self._started = True
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+
+def score_frame(frame, policy):
+    """Applicant DataFrame with the policy's decision columns appended"""
+    frame = normalize_columns(frame)
+    tenure = frame["tenure"].fillna(policy.tenure) if "tenure" in frame.columns else None
+    # Priced from the grid by each row's loan type (the grid's default type if there is no column)
+    loan_type = frame["loan_type"].to_numpy(dtype=object) if "loan_type" in frame.columns else None
+    decisions = policy.decide(frame["amount"].to_numpy(), frame["credit_score"].to_numpy(),
+                              frame["salary"].to_numpy(), frame["pre_approved_limit"].to_numpy(),
+                              None if tenure is None else tenure.to_numpy(), loan_type=loan_type)
+    scored = frame.copy()
+    if tenure is not None:
+        scored["tenure"] = tenure.astype("int64")
+    scored["decision"] = decisions["status"]
+    scored["reason"] = decisions["reason"]
+    scored["interest_rate"] = decisions["rate"]
+    scored["emi"] = decisions["emi"].round(2)
+    scored["emi_ratio"] = decisions["emi_ratio"].round(2)
+    scored["approved_amount"] = decisions["approved_amount"].astype("int64")
+    scored["max_amount"] = decisions["max_amount"].astype("int64")
+    return scored
+
+
+def score_file(input_path, output_path, policy=None, chunk_size=250_000):
+    """Score every applicant in input_path into output_path; returns decision counts"""
+    policy = policy or UnderwritingPolicy()
+    counts = Counter()
+    writer = ChunkWriter(output_path)
+    try:
+        for chunk in read_chunks(input_path, chunk_size):
+            scored = score_frame(chunk, policy)
+            counts.update(scored["decision"].value_counts().to_dict())
+            writer.write(scored)
+    finally:
+        writer.close()
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch underwriting over a file of applicants")
+    parser.add_argument("input", help="applicants (.csv, .jsonl or .parquet)")
+    parser.add_argument("-o", "--output", required=True, help="decisions file (.csv, .jsonl or .parquet)")
+    parser.add_argument("--chunk-size", type=int, default=250_000)
+    parser.add_argument("--min-credit-score", type=float, default=700)
+    parser.add_argument("--max-limit-multiple", type=float, default=2.0)
+    parser.add_argument("--max-emi-ratio", type=float, default=50.0, help="EMI as %% of monthly salary")
+    parser.add_argument("--tenure", type=int, default=24, help="months, when the file has no tenure column")
+    args = parser.parse_args()
+
+    policy = UnderwritingPolicy(min_credit_score=args.min_credit_score, max_limit_multiple=args.max_limit_multiple,
+                                max_emi_ratio=args.max_emi_ratio, tenure=args.tenure)
+    start = time.perf_counter()
+    counts = score_file(args.input, args.output, policy, args.chunk_size)
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    print(f"🏦 Scored {total:,} applicants in {elapsed:.2f}s ({total / elapsed if elapsed else 0:,.0f}/s) -> {args.output}")
+    for decision, count in counts.most_common():
+        print(f"   {decision}: {count:,} ({count / total:.1%})")
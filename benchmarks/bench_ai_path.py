@@ -0,0 +1,127 @@
+# bench_ai_path.py
+# Throughput and tail latency of the AI-first chat path against the offline stub LLM
+#
+# Usage: python benchmarks/bench_ai_path.py [--sessions 200] [--turns 8] [--mode async|stream|sync]
+#                                           [--median-ms 400] [--sigma 0.5] [--error-rate 0.02]
+#                                           [--no-guard] [--deadline 2] [--max-in-flight 32]
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCRIPT = [
+    "Hello", "I'm Rahul", "Yes, I'm interested", "Personal Loan",
+    "I need 3 lakh", "Proceed with terms", "What will my EMI be?", "Thanks!",
+]
+
+
+def load_app(args):
+    """Import the app against the stub provider, with its data files in a scratch directory"""
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.chdir(tempfile.mkdtemp(prefix="bench_ai_path_"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        import loan_agent_complete as app
+        from llm_client import StubProvider, GuardedProvider, CircuitBreaker
+    stub = StubProvider(median_ms=args.median_ms, sigma=args.sigma, error_rate=args.error_rate, seed=args.seed)
+    app.llm = stub
+    app.LLM_TIMEOUT_SECONDS = args.deadline
+    if args.guard:
+        app.llm = GuardedProvider(stub, max_in_flight=args.max_in_flight, deadline=args.deadline,
+                                  breaker=CircuitBreaker(p95_threshold=args.breaker_p95))
+    app.STREAM_RESPONSES = args.mode == "stream"
+    return app
+
+
+async def run_session(master, turns, latencies, first_chunks, stream):
+    for i in range(turns):
+        message = SCRIPT[i % len(SCRIPT)]
+        start = time.perf_counter()
+        if stream:
+            first = None
+            async for _ in master.process_message_stream(message, []):
+                if first is None:
+                    first = time.perf_counter() - start
+            first_chunks.append(first)
+        else:
+            await master.process_message_async(message, [])
+        latencies.append(time.perf_counter() - start)
+
+
+def run_session_sync(master, turns, latencies):
+    for i in range(turns):
+        start = time.perf_counter()
+        master.process_message(SCRIPT[i % len(SCRIPT)], [])
+        latencies.append(time.perf_counter() - start)
+
+
+def percentiles(samples):
+    return np.percentile(np.asarray(samples) * 1000, [50, 95, 99])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and tail latency of the AI-first chat path (stub LLM)")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--mode", choices=["async", "stream", "sync"], default="async")
+    parser.add_argument("--threads", type=int, default=40, help="worker threads for --mode sync (Gradio's default)")
+    parser.add_argument("--median-ms", type=float, default=400)
+    parser.add_argument("--sigma", type=float, default=0.5, help="log-normal spread of the stub latency")
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--no-guard", dest="guard", action="store_false", help="call the stub directly")
+    parser.add_argument("--deadline", type=float, default=2.0, help="per-call deadline in seconds")
+    parser.add_argument("--max-in-flight", type=int, default=32)
+    parser.add_argument("--breaker-p95", type=float, default=8.0, help="p95 seconds that opens the circuit")
+    args = parser.parse_args()
+
+    app = load_app(args)
+    masters = [app.MasterAgent() for _ in range(args.sessions)]
+    latencies, first_chunks = [], []
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if args.mode == "sync":
+            with ThreadPoolExecutor(max_workers=args.threads) as pool:
+                for master in masters:
+                    pool.submit(run_session_sync, master, args.turns, latencies)
+        else:
+            async def run_all():
+                await asyncio.gather(*[
+                    run_session(master, args.turns, latencies, first_chunks, args.mode == "stream")
+                    for master in masters
+                ])
+            asyncio.run(run_all())
+    elapsed = time.perf_counter() - start
+
+    stats = app.llm.stats()
+    p50, p95, p99 = percentiles(latencies)
+    print(f"mode={args.mode} sessions={args.sessions} turns/session={args.turns} "
+          f"stub median={args.median_ms:.0f} ms sigma={args.sigma} error rate={args.error_rate:.1%}")
+    print("-" * 60)
+    print(f"turns completed : {len(latencies):,} in {elapsed:.2f} s")
+    print(f"throughput      : {len(latencies) / elapsed:,.1f} turns/s")
+    print(f"turn latency    : p50 {p50:,.0f} ms | p95 {p95:,.0f} ms | p99 {p99:,.0f} ms")
+    if first_chunks:
+        f50, f95, f99 = percentiles(first_chunks)
+        print(f"first chunk     : p50 {f50:,.0f} ms | p95 {f95:,.0f} ms | p99 {f99:,.0f} ms")
+    print(f"LLM calls       : {stats['calls']:,} ({stats['errors']:,} injected errors -> rule-based fallback)")
+    routes = app.turn_router.stats()
+    print(f"routes          : {routes.get('rules', 0):,} rules | {routes.get('llm', 0):,} AI | {routes.get('fallback', 0):,} AI fallback")
+    if args.guard:
+        print(f"guard           : {stats['rejected_saturated']:,} shed (saturated) | {stats['rejected_open']:,} shed (circuit open) | "
+              f"{stats['timeouts']:,} deadline hits | circuit {stats['circuit']} (opened {stats['circuit_opens']}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# bench_application_writer.py
+# Save latency of the append-only application writer at growing history sizes
+#
+# Usage: python benchmarks/bench_application_writer.py [--sizes 10000 100000 1000000] [--saves 500] [--legacy]
+
+import argparse
+import csv
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from application_store import APPLICATION_COLUMNS, CsvApplicationWriter
+
+SAMPLE_ROW = {
+    "Timestamp": "2024-11-01 10:00:00", "Customer": "Rahul", "Age": 32, "City": "Mumbai",
+    "Amount": 200000, "Tenure": 24, "Interest Rate": 10.99, "Credit Score": 780,
+    "Pre-Approved Limit": 300000, "Salary": 60000, "Decision": "Approved", "Confidence (%)": 92
+}
+
+
+def build_history(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=APPLICATION_COLUMNS)
+        writer.writeheader()
+        writer.writerows(SAMPLE_ROW for _ in range(rows))
+
+
+def time_appends(path, saves, fsync_every):
+    writer = CsvApplicationWriter(path, fsync_every=fsync_every)
+    samples = []
+    for _ in range(saves):
+        start = time.perf_counter()
+        writer.append(SAMPLE_ROW)
+        samples.append(time.perf_counter() - start)
+    writer.close()
+    return samples
+
+
+def time_legacy_saves(path, saves):
+    """The old read_csv + concat + to_csv save, for comparison"""
+    import pandas as pd
+
+    new_row = pd.DataFrame([SAMPLE_ROW])
+    samples = []
+    for _ in range(saves):
+        start = time.perf_counter()
+        df = pd.read_csv(path)
+        df = pd.concat([df, new_row], ignore_index=True)
+        df.to_csv(path, index=False)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    p95 = ordered[int(len(ordered) * 0.95) - 1] if len(ordered) > 1 else ordered[0]
+    return statistics.mean(samples) * 1e6, p95 * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Save latency of the append-only application writer")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--saves", type=int, default=500)
+    parser.add_argument("--fsync-every", type=int, default=0)
+    parser.add_argument("--legacy", action="store_true", help="also time the read-concat-rewrite save (slow)")
+    parser.add_argument("--legacy-saves", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'history rows':>14} | {'append mean':>12} | {'append p95':>11} | {'legacy mean':>12}")
+    print("-" * 60)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f"history_{size}.csv")
+            build_history(path, size)
+            mean_us, p95_us = summarize(time_appends(path, args.saves, args.fsync_every))
+            legacy = "-"
+            if args.legacy:
+                legacy_mean, _ = summarize(time_legacy_saves(path, args.legacy_saves))
+                legacy = f"{legacy_mean / 1000:,.1f} ms"
+            print(f"{size:>14,} | {mean_us:>9,.1f} us | {p95_us:>8,.1f} us | {legacy:>12}")
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# bench_batch_underwriting.py
+# Batch underwriting throughput: per-row decide_one loop vs the vectorized policy, and file round trips
+#
+# Usage: python benchmarks/bench_batch_underwriting.py [--rows 1000000] [--chunk-size 250000]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from batch_underwriting import score_file
+from underwriting_policy import UnderwritingPolicy
+
+
+def synthetic_applicants(rows, seed=7):
+    rng = np.random.default_rng(seed)
+    limit = rng.integers(50, 800, rows) * 1000
+    return pd.DataFrame({
+        "name": np.char.add("Lead", np.arange(rows).astype(str)),
+        "salary": rng.integers(15, 250, rows) * 1000,
+        "credit_score": rng.integers(550, 900, rows),
+        "pre_approved_limit": limit,
+        "amount": (limit * rng.uniform(0.3, 2.6, rows)).astype(int),
+        "tenure": rng.choice([12, 24, 36, 48, 60], rows),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch underwriting throughput")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--loop-rows", type=int, default=100_000, help="rows for the per-row baseline")
+    parser.add_argument("--chunk-size", type=int, default=250_000)
+    args = parser.parse_args()
+
+    policy = UnderwritingPolicy()
+    frame = synthetic_applicants(args.rows)
+    columns = [frame[c].to_numpy() for c in ("amount", "credit_score", "salary", "pre_approved_limit", "tenure")]
+
+    sample = frame.head(args.loop_rows)
+    start = time.perf_counter()
+    for row in sample.itertuples(index=False):
+        policy.decide_one(row.amount, row.credit_score, row.salary, row.pre_approved_limit, row.tenure)
+    loop_rate = len(sample) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    policy.decide(*columns)
+    vector_rate = args.rows / (time.perf_counter() - start)
+
+    print(f"Policy only ({args.rows:,} rows)")
+    print(f"  decide_one loop: {loop_rate:12,.0f} rows/s")
+    print(f"  decide (NumPy):  {vector_rate:12,.0f} rows/s ({vector_rate / loop_rate:.0f}x)")
+
+    workdir = tempfile.mkdtemp(prefix="bench_batch_")
+    source = os.path.join(workdir, "leads.csv")
+    frame.to_csv(source, index=False)
+    for output in ("decisions.csv", "decisions.jsonl"):
+        target = os.path.join(workdir, output)
+        start = time.perf_counter()
+        counts = score_file(source, target, policy, args.chunk_size)
+        elapsed = time.perf_counter() - start
+        print(f"CSV -> {output:<16} {elapsed:6.2f}s ({args.rows / elapsed:,.0f} rows/s) {dict(counts)}")
+
+
+if __name__ == "__main__":
+    main()
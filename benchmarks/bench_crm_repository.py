@@ -0,0 +1,84 @@
+# bench_crm_repository.py
+# CRM identification cost: indexed repository lookups vs scanning every customer name
+#
+# Usage: python benchmarks/bench_crm_repository.py [--customers 1000000] [--lookups 20000]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from crm_repository import InMemoryCustomerRepository, SqliteCustomerRepository
+from turn_router import tokenize
+
+
+def synthetic_customers(count, seed=7):
+    rng = np.random.default_rng(seed)
+    scores = rng.integers(600, 900, count)
+    limits = rng.integers(50, 800, count) * 1000
+    salaries = rng.integers(15, 250, count) * 1000
+    for i in range(count):
+        yield {
+            "name": f"Customer {i:07d}", "age": 30, "city": "Pune", "phone": f"9{i:09d}",
+            "address": "Pune", "pan": f"ABCDE{i % 10000:04d}{chr(65 + i // 10000 % 26)}", "kyc": bool(i % 3),
+            "credit_score": int(scores[i]), "pre_approved_limit": int(limits[i]), "salary": int(salaries[i]),
+            "current_loans": {},
+        }
+
+
+def per_lookup(function, values):
+    start = time.perf_counter()
+    for value in values:
+        function(value)
+    return (time.perf_counter() - start) / len(values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CRM lookups: indexes vs linear scans")
+    parser.add_argument("--customers", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--scan-lookups", type=int, default=20, help="messages for the linear-scan baseline")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_crm_"), "crm.db")
+    sqlite_crm = SqliteCustomerRepository(path, cache_size=args.lookups)
+    start = time.perf_counter()
+    batch = []
+    for record in synthetic_customers(args.customers):
+        batch.append(record)
+        if len(batch) >= 50_000:
+            sqlite_crm.upsert_many(batch)
+            batch = []
+    sqlite_crm.upsert_many(batch)
+    print(f"Load {args.customers:,} customers into SQLite: {time.perf_counter() - start:.1f}s")
+    memory_crm = InMemoryCustomerRepository(synthetic_customers(args.customers))
+    names = [record["name"] for record in memory_crm._by_name.values()]
+
+    rng = np.random.default_rng(11)
+    picks = rng.choice(args.customers, args.lookups, replace=False)
+    sample = [names[i].upper() for i in picks]
+    phones = [f"+91 9{i:09d}" for i in picks]
+    messages = [f"hi this is {names[i].lower()} calling about my loan" for i in picks]
+
+    print(f"Lookup, {args.lookups:,} random customers of {args.customers:,}:")
+    print(f"  in-memory get(name):          {per_lookup(memory_crm.get, sample) * 1e6:8.2f} us")
+    print(f"  SQLite get(name), cold:       {per_lookup(sqlite_crm.get, sample) * 1e6:8.2f} us")
+    print(f"  SQLite get(name), LRU hit:    {per_lookup(sqlite_crm.get, sample) * 1e6:8.2f} us")
+    print(f"  SQLite find_by_phone:         {per_lookup(sqlite_crm.find_by_phone, phones) * 1e6:8.2f} us")
+    print(f"  in-memory find_name(message): {per_lookup(lambda m: memory_crm.find_name(tokenize(m)), messages) * 1e6:8.2f} us")
+    print(f"  SQLite find_name(message):    {per_lookup(lambda m: sqlite_crm.find_name(tokenize(m)), messages) * 1e6:8.2f} us")
+
+    lowered = messages[:args.scan_lookups]
+    scan = per_lookup(lambda m: any(name.lower() in m for name in names), lowered)
+    print(f"  any(name.lower() in msg) scan: {scan * 1e6:8.0f} us (the old greeting check)")
+    sqlite_crm.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# bench_entity_extractor.py
+# Entity extraction: one precompiled pass vs the per-field extractors it replaced
+# Reports per-message latency and misparses on a labelled set of Indian number formats
+#
+# Usage: python benchmarks/bench_entity_extractor.py [--runs 20000]
+
+import argparse
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from entity_extractor import Entities, extract
+
+# (message, field, expected value)
+CASES = [
+    ("I need 2.5 lakh", "amount", 250_000),
+    ("Rs.3,00,000", "amount", 300_000),
+    ("I need Rs 4,50,000 for 36 months", "amount", 450_000),
+    ("2 lakh", "amount", 200_000),
+    ("I need 3 lac", "amount", 300_000),
+    ("1.2 crore", "amount", 12_000_000),
+    ("75k", "amount", 75_000),
+    ("500000", "amount", 500_000),
+    ("need 2 lakh over 24 months", "amount", 200_000),
+    ("My salary is 90000", "salary", 90_000),
+    ("50k", "salary", 50_000),
+    ("I earn Rs.60,000 per month", "salary", 60_000),
+    ("salary 1.2 lakh", "salary", 120_000),
+    ("around 85,500.50 a month", "salary", 85_500),
+    ("I am 29 years old", "age", 29),
+    ("32", "age", 32),
+    ("Age: 35", "age", 35),
+    ("I have a 5 year old loan and I am 41 years old", "age", 41),
+    ("My name is Zoya", "name", "Zoya"),
+    ("Rahul", "name", "Rahul"),
+]
+
+
+def legacy_amount(msg):
+    numbers = re.findall(r'\d+', msg)
+    if numbers:
+        amount = int(numbers[0])
+        if "lakh" in msg or "lac" in msg:
+            amount *= 100000
+        elif amount < 10000:
+            amount *= 100000
+        return amount
+    return None
+
+
+def legacy_salary(message):
+    msg = message.lower()
+    numbers = re.findall(r'\d+', msg)
+    if numbers:
+        salary = int(numbers[0])
+        if "k" in msg and salary < 1000:
+            salary *= 1000
+        elif "lakh" in msg or "lac" in msg:
+            salary *= 100000
+        elif salary < 10000:
+            salary *= 1000
+        if 15000 <= salary <= 500000:
+            return salary
+    return None
+
+
+def legacy_age(message):
+    numbers = re.findall(r'\d+', message)
+    if numbers:
+        age = int(numbers[0])
+        if 18 <= age <= 65:
+            return age
+    return None
+
+
+def legacy_name(message):
+    msg = message.strip()
+    patterns = [r"my name is (\w+)", r"i'm (\w+)", r"i am (\w+)", r"call me (\w+)", r"this is (\w+)", r"^(\w+)$"]
+    for pattern in patterns:
+        match = re.search(pattern, msg, re.IGNORECASE)
+        if match:
+            name = match.group(1)
+            if name.lower() not in ["hello", "hi", "hey", "yes", "no", "ok", "loan", "money"]:
+                return name
+    if msg.isalpha() and len(msg) > 1:
+        return msg
+    return None
+
+
+LEGACY = {"amount": lambda m: legacy_amount(m.lower()), "salary": legacy_salary, "age": legacy_age, "name": legacy_name}
+
+
+def per_message(function, messages, runs):
+    start = time.perf_counter()
+    for _ in range(runs // len(messages) + 1):
+        for message in messages:
+            function(message)
+    return (time.perf_counter() - start) / ((runs // len(messages) + 1) * len(messages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entity extraction latency and misparses")
+    parser.add_argument("--runs", type=int, default=20_000)
+    args = parser.parse_args()
+    messages = [message for message, _, _ in CASES]
+
+    legacy_wrong = [(m, f, v, LEGACY[f](m)) for m, f, v in CASES if LEGACY[f](m) != v]
+    new_wrong = [(m, f, v, getattr(extract(m), f)) for m, f, v in CASES if getattr(extract(m), f) != v]
+    print(f"Misparses on {len(CASES)} labelled messages: legacy {len(legacy_wrong)}, extractor {len(new_wrong)}")
+    for message, field, expected, got in legacy_wrong:
+        print(f"  legacy    {field:6} {message!r}: {got!r} (expected {expected!r})")
+    for message, field, expected, got in new_wrong:
+        print(f"  extractor {field:6} {message!r}: {got!r} (expected {expected!r})")
+
+    legacy_all = lambda m: (LEGACY["amount"](m), legacy_salary(m), legacy_age(m), legacy_name(m))
+    legacy_one = lambda m: LEGACY["amount"](m)
+
+    def entities_all(message):
+        entities = Entities(message)
+        return entities.amount, entities.salary, entities.age, entities.name
+
+    print("Per message:")
+    print(f"  legacy, all four fields (4 scans):    {per_message(legacy_all, messages, args.runs) * 1e6:6.2f} us")
+    print(f"  Entities, all four fields (uncached): {per_message(entities_all, messages, args.runs) * 1e6:6.2f} us")
+    print(f"  legacy amount only:                   {per_message(legacy_one, messages, args.runs) * 1e6:6.2f} us")
+    print(f"  Entities amount only (uncached):      {per_message(lambda m: Entities(m).amount, messages, args.runs) * 1e6:6.2f} us")
+    print(f"  extract() again (router, then handler): {per_message(lambda m: extract(m).amount, messages, args.runs) * 1e6:6.2f} us")
+
+
+if __name__ == "__main__":
+    main()
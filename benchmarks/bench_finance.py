@@ -0,0 +1,86 @@
+# bench_finance.py
+# EMI / amortization throughput: the old inline formula vs finance.py (scalar and vectorized)
+#
+# Usage: python benchmarks/bench_finance.py [--amounts 200] [--rates 20] [--tenures 49] [--repeat 5]
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import finance
+
+
+def inline_emi(amount, rate, tenure):
+    """The formula as it was copied around the agents"""
+    return (amount * rate/100/12 * (1 + rate/100/12)**tenure) / ((1 + rate/100/12)**tenure - 1)
+
+
+def inline_schedule(amount, rate, tenure):
+    """Month-by-month loop, the usual way to build a schedule one loan at a time"""
+    monthly_rate = rate / 100 / 12
+    payment = inline_emi(amount, rate, tenure)
+    balance = amount
+    rows = []
+    for month in range(1, tenure + 1):
+        interest = balance * monthly_rate
+        balance -= payment - interest
+        rows.append((month, payment, interest, payment - interest, max(balance, 0.0)))
+    return rows
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EMI and amortization throughput")
+    parser.add_argument("--amounts", type=int, default=200)
+    parser.add_argument("--rates", type=int, default=20)
+    parser.add_argument("--tenures", type=int, default=49, help="tenures 12, 13, ... months")
+    parser.add_argument("--schedules", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    amounts = np.linspace(50_000, 2_000_000, args.amounts)
+    rates = np.linspace(9.99, 16.0, args.rates)
+    tenures = np.arange(12, 12 + args.tenures)
+    combos = [(float(a), float(r), int(t)) for a in amounts for r in rates for t in tenures]
+    count = len(combos)
+
+    loop = timed(lambda: [inline_emi(a, r, t) for a, r, t in combos], args.repeat)
+    scalar = timed(lambda: [finance.emi(a, r, t) for a, r, t in combos], args.repeat)
+    grid = timed(lambda: finance.emi_grid(amounts, rates, tenures), args.repeat)
+    expected = np.array([inline_emi(a, r, t) for a, r, t in combos]).reshape(len(amounts), len(rates), len(tenures))
+    assert np.allclose(finance.emi_grid(amounts, rates, tenures), expected)
+
+    print(f"EMI grid: {count:,} amount x rate x tenure combinations")
+    print(f"  inline formula loop: {loop * 1000:8.1f} ms  ({count / loop:,.0f} /s)")
+    print(f"  finance.emi scalar:  {scalar * 1000:8.1f} ms  ({count / scalar:,.0f} /s)")
+    print(f"  finance.emi_grid:    {grid * 1000:8.1f} ms  ({count / grid:,.0f} /s, {loop / grid:.0f}x)")
+
+    rng = np.random.default_rng(7)
+    loans = list(zip(rng.uniform(50_000, 2_000_000, args.schedules),
+                     rng.uniform(9.99, 16.0, args.schedules),
+                     rng.integers(12, 61, args.schedules)))
+    loop = timed(lambda: [inline_schedule(a, r, int(t)) for a, r, t in loans], args.repeat)
+    batch_amounts, batch_rates, batch_tenures = (np.array(column) for column in zip(*loans))
+    batch = timed(lambda: finance.amortization_schedule(batch_amounts, batch_rates, batch_tenures), args.repeat)
+
+    print(f"Amortization: {args.schedules:,} schedules (12-60 months)")
+    print(f"  month-by-month loop:            {loop * 1000:8.1f} ms")
+    print(f"  finance.amortization_schedule:  {batch * 1000:8.1f} ms  ({loop / batch:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
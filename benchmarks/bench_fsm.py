@@ -0,0 +1,85 @@
+# bench_fsm.py
+# Throughput of the conversation state machine and of rule-engine turns dispatched through it
+#
+# Usage: python benchmarks/bench_fsm.py [--transitions 1000000] [--sessions 300]
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from conversation_fsm import ConversationFSM, Stage, TransitionStats
+
+# Happy paths the rule handlers walk, as stage sequences
+PATHS = [
+    [Stage.IDENTIFICATION, Stage.SALES_PITCH, Stage.LOAN_TYPE_SELECTION, Stage.LOAN_REQUIREMENT,
+     Stage.TERMS_CONFIRMATION, Stage.UNDERWRITING, Stage.SANCTION, Stage.COMPLETED],
+    [Stage.IDENTIFICATION, Stage.KYC_VERIFICATION, Stage.SALES_PITCH, Stage.LOAN_TYPE_SELECTION,
+     Stage.LOAN_REQUIREMENT, Stage.TERMS_CONFIRMATION, Stage.UNDERWRITING, Stage.CONDITIONAL_DOCS,
+     Stage.SANCTION, Stage.COMPLETED],
+    [Stage.IDENTIFICATION, Stage.NEW_CUSTOMER_PITCH, Stage.LOAN_TYPE_SELECTION, Stage.NEW_CUSTOMER_INFO,
+     Stage.LOAN_REQUIREMENT, Stage.TERMS_CONFIRMATION, Stage.UNDERWRITING, Stage.KYC_UPLOAD, Stage.COMPLETED],
+]
+
+# Existing-customer chat that ends at the sanction step (the PDF itself isn't part of this benchmark)
+SCRIPT = ["Hello", "Rahul", "yes", "Personal Loan", "I need 2 lakh", "yes proceed"]
+
+
+def bench_transitions(count):
+    stats = TransitionStats()
+    done = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        while done < count:
+            for path in PATHS:
+                fsm = ConversationFSM(stats=stats)
+                for stage in path:
+                    fsm.transition(stage, source="llm")
+                done += len(path)
+    return done / (time.perf_counter() - start)
+
+
+def load_app():
+    """Import the app with the LLM unavailable, with its data files in a scratch directory"""
+    os.environ["LLM_PROVIDER"] = "gemini"
+    os.environ["GEMINI_API_KEY"] = ""
+    os.chdir(tempfile.mkdtemp(prefix="bench_fsm_"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        import loan_agent_complete as app
+    return app
+
+
+def bench_rule_turns(app, sessions):
+    turns = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(sessions):
+            master = app.MasterAgent()
+            for message in SCRIPT:
+                master.process_message(message, [])
+                turns += 1
+    elapsed = time.perf_counter() - start
+    return turns / elapsed, master.conversation_stage
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversation FSM and rule-engine turn throughput")
+    parser.add_argument("--transitions", type=int, default=1_000_000)
+    parser.add_argument("--sessions", type=int, default=300)
+    args = parser.parse_args()
+
+    print(f"FSM transitions:   {bench_transitions(args.transitions):,.0f} /s")
+    app = load_app()
+    rate, final_stage = bench_rule_turns(app, args.sessions)
+    print(f"Rule-engine turns: {rate:,.0f} /s ({args.sessions} sessions x {len(SCRIPT)} turns, ends at {final_stage})")
+    print(f"Transition stats:  {app.transition_stats.snapshot()}")
+
+
+if __name__ == "__main__":
+    main()
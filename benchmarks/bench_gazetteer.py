@@ -0,0 +1,123 @@
+# bench_gazetteer.py
+# City / loan type / customer name matching: one automaton scan vs the old substring loops,
+# and how the scan cost moves as the gazetteer grows
+#
+# Usage: python benchmarks/bench_gazetteer.py [--sizes 1000 10000 100000] [--messages 5000]
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from gazetteer import load_gazetteer
+
+# The lookups the agent used before the gazetteer
+LEGACY_CITIES = {
+    "mumbai": "Mumbai", "bombay": "Mumbai", "delhi": "Delhi", "new delhi": "Delhi", "ncr": "Delhi NCR",
+    "bangalore": "Bangalore", "bengaluru": "Bangalore", "chennai": "Chennai", "madras": "Chennai",
+    "kolkata": "Kolkata", "calcutta": "Kolkata", "hyderabad": "Hyderabad", "pune": "Pune", "poona": "Pune",
+    "ahmedabad": "Ahmedabad", "jaipur": "Jaipur", "surat": "Surat", "lucknow": "Lucknow", "kanpur": "Kanpur",
+    "nagpur": "Nagpur", "indore": "Indore", "thane": "Thane", "bhopal": "Bhopal", "vadodara": "Vadodara",
+    "ghaziabad": "Ghaziabad", "ludhiana": "Ludhiana", "agra": "Agra", "nashik": "Nashik",
+}
+LEGACY_LOAN_TYPES = {
+    "personal": "Personal Loan", "business": "Business Loan", "home": "Home Renovation Loan",
+    "renovation": "Home Renovation Loan", "wedding": "Wedding Loan", "marriage": "Wedding Loan",
+    "travel": "Travel Loan", "vacation": "Travel Loan", "medical": "Medical Loan", "health": "Medical Loan",
+    "education": "Education Loan", "study": "Education Loan",
+}
+
+
+def legacy_city(message):
+    msg = message.lower()
+    for key, city in LEGACY_CITIES.items():
+        if key in msg:
+            return city
+    for word in message.split():
+        if word.isalpha() and len(word) > 3:
+            return word.title()
+    return None
+
+
+def legacy_loan_type(message):
+    msg = message.lower()
+    for key, loan_type in LEGACY_LOAN_TYPES.items():
+        if key in msg:
+            return loan_type
+    return None
+
+
+# message, what the stage asks for, expected value
+CASES = [
+    ("Mumbai", "city", "Mumbai"),
+    ("I stay in Bengaluru", "city", "Bangalore"),
+    ("moving to new delhi next month", "city", "Delhi"),
+    ("Trivandrum", "city", "Thiruvananthapuram"),
+    ("from Gurgaon", "city", "Gurugram"),
+    ("Coimbatore", "city", "Coimbatore"),
+    ("Vizag", "city", "Visakhapatnam"),
+    ("I don't want to say", "city", None),
+    ("Navi Mumbai", "city", "Navi Mumbai"),
+    ("need money for my sister's shaadi", "loan_type", "Wedding Loan"),
+    ("knee surgery at the hospital", "loan_type", "Medical Loan"),
+    ("tuition for my MBA", "loan_type", "Education Loan"),
+    ("my homework is due", "loan_type", None),
+    ("studies abroad", "loan_type", "Education Loan"),
+    ("Personal", "loan_type", "Personal Loan"),
+    ("a honeymoon trip", "loan_type", "Travel Loan"),
+]
+
+
+def per_call(function, messages, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for message in messages:
+            function(message)
+        best = min(best, (time.perf_counter() - start) / len(messages))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gazetteer matching: automaton vs substring loops")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--messages", type=int, default=5_000)
+    args = parser.parse_args()
+
+    gazetteer = load_gazetteer()
+    legacy = {"city": legacy_city, "loan_type": legacy_loan_type}
+    wrong = {"legacy": 0, "gazetteer": 0}
+    for message, kind, expected in CASES:
+        for label, found in (("legacy", legacy[kind](message)), ("gazetteer", gazetteer.find(message, kind))):
+            if found != expected:
+                wrong[label] += 1
+                print(f"  {label:<9} {kind:<9} {message!r}: {found!r} (expected {expected!r})")
+    print(f"Wrong on {len(CASES)} labelled messages: legacy {wrong['legacy']}, gazetteer {wrong['gazetteer']}")
+
+    messages = [message for message, _, _ in CASES] * (args.messages // len(CASES))
+    print(f"Per message ({gazetteer.stats()['phrases']} phrases):")
+    print(f"  legacy city + loan type loops:    {per_call(lambda m: (legacy_city(m), legacy_loan_type(m)), messages) * 1e6:7.2f} us")
+    print(f"  gazetteer, one scan (all kinds):  {per_call(gazetteer.find_all, messages) * 1e6:7.2f} us")
+
+    rng = np.random.default_rng(5)
+    print("Customer names in the gazetteer (one scan per message) vs any(name in msg):")
+    for size in args.sizes:
+        names = [f"Customer{i} Surname{i % 997}" for i in range(size)]
+        start = time.perf_counter()
+        grown = load_gazetteer(customer_names=names)
+        build = time.perf_counter() - start
+        picks = rng.integers(0, size, 500)
+        name_messages = [f"hi this is {names[i].lower()} calling about my loan" for i in picks]
+        scan = per_call(lambda m, grown=grown: grown.find(m, "customer"), name_messages)
+        lowered = [name.lower() for name in names]
+        linear = per_call(lambda m, lowered=lowered: any(name in m for name in lowered), name_messages[:20], repeat=1)
+        print(f"  {size:>9,} names: build {build:6.2f}s | scan {scan * 1e6:6.2f} us | linear {linear * 1e6:9.0f} us")
+
+
+if __name__ == "__main__":
+    main()
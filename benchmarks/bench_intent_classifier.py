@@ -0,0 +1,67 @@
+# bench_intent_classifier.py
+# Offline intent classifier: held-out accuracy, accuracy/coverage per confidence threshold, latency
+#
+# Usage: python benchmarks/bench_intent_classifier.py [--folds 5] [--data data/intents.jsonl]
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from intent_classifier import INTENT_DATA, IntentClassifier, read_examples
+
+THRESHOLDS = (0.0, 0.4, 0.5, 0.6, 0.7, 0.8)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intent classifier accuracy and latency")
+    parser.add_argument("--data", nargs="+", default=[INTENT_DATA])
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--predictions", type=int, default=20_000)
+    args = parser.parse_args()
+
+    texts, intents = read_examples(args.data)
+    rng = np.random.default_rng(3)
+    folds = np.array_split(rng.permutation(len(texts)), args.folds)
+    predicted, confidence, train_seconds = [None] * len(texts), np.zeros(len(texts)), 0.0
+    for fold in folds:
+        held_out = set(fold.tolist())
+        train = [i for i in range(len(texts)) if i not in held_out]
+        start = time.perf_counter()
+        model = IntentClassifier.train([texts[i] for i in train], [intents[i] for i in train])
+        train_seconds += time.perf_counter() - start
+        labels, probabilities = model.predict_many([texts[i] for i in fold])
+        for i, label, probability in zip(fold, labels, probabilities):
+            predicted[i], confidence[i] = label, probability
+    correct = np.array([p == t for p, t in zip(predicted, intents)])
+
+    print(f"{len(texts)} utterances, {len(set(intents))} intents, {args.folds}-fold cross-validation "
+          f"(training {train_seconds / args.folds:.1f}s per fold)")
+    print(f"  held-out accuracy: {correct.mean():.1%}")
+    print("  threshold | answered locally | accuracy of local answers")
+    for threshold in THRESHOLDS:
+        local = confidence >= threshold
+        accuracy = correct[local].mean() if local.any() else float("nan")
+        print(f"  {threshold:9.1f} | {local.mean():16.1%} | {accuracy:.1%}")
+
+    model = IntentClassifier.train(texts, intents)
+    messages = [texts[i % len(texts)] for i in range(args.predictions)]
+    start = time.perf_counter()
+    for message in messages:
+        model.predict(message)
+    single = (time.perf_counter() - start) / len(messages)
+    start = time.perf_counter()
+    model.predict_many(messages)
+    batched = (time.perf_counter() - start) / len(messages)
+    print("Latency per message:")
+    print(f"  predict():      {single * 1e6:7.1f} us")
+    print(f"  predict_many(): {batched * 1e6:7.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# bench_intent_matcher.py
+# Stage replies: compiled per-stage intent matcher vs the old any(word in msg) substring chains
+#
+# Usage: python benchmarks/bench_intent_matcher.py [--messages 20000]
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from turn_router import stage_intents, tokenize
+
+# The handlers' old keyword lists, in the order they were checked
+LEGACY_CHAINS = {
+    "kyc_verification": [("yes", ["yes", "complete", "verify", "proceed", "ok"]), ("no", ["no", "later", "skip"])],
+    "sales_pitch": [("yes", ["yes", "interested", "sure", "okay", "ok", "tell me"]),
+                    ("no", ["no", "not interested", "maybe later"])],
+    "terms_confirmation": [("yes", ["yes", "proceed", "ok", "agree", "accept", "looks good"]),
+                           ("tenure", ["tenure", "month", "year", "emi", "change"]),
+                           ("no", ["no", "not okay", "change amount"])],
+    "sanction": [("yes", ["generate", "yes", "send", "create", "download"])],
+}
+
+
+def legacy_classify(stage, message):
+    msg = message.strip().lower()
+    for intent, words in LEGACY_CHAINS[stage]:
+        if any(word in msg for word in words):
+            return intent
+    return None
+
+
+# stage, reply, what the customer meant
+CASES = [
+    ("kyc_verification", "Yes", "yes"),
+    ("kyc_verification", "I don't know", None),
+    ("kyc_verification", "let me book an appointment", None),
+    ("kyc_verification", "not ok", None),
+    ("kyc_verification", "skip for now", "no"),
+    ("sales_pitch", "✅ Yes, I'm interested!", "yes"),
+    ("sales_pitch", "not interested", "no"),
+    ("sales_pitch", "no", "no"),
+    ("sales_pitch", "nothing right now", None),
+    ("sales_pitch", "sure, tell me more", "yes"),
+    ("sales_pitch", "I know about it already", None),
+    ("terms_confirmation", "✅ Proceed with terms", "yes"),
+    ("terms_confirmation", "36 months", "tenure"),
+    ("terms_confirmation", "change amount", "no"),
+    ("terms_confirmation", "Different amount", "no"),
+    ("terms_confirmation", "not okay", "no"),
+    ("terms_confirmation", "the token amount looks good", "yes"),
+    ("sanction", "📄 Generate sanction letter", "yes"),
+    ("sanction", "yesterday you said something else", None),
+    ("sanction", "no, don't send it yet", None),
+]
+
+
+def per_message(function, cases, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for stage, message, _ in cases:
+            function(stage, message)
+        best = min(best, (time.perf_counter() - start) / len(cases))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stage reply matching: intent matcher vs substring chains")
+    parser.add_argument("--messages", type=int, default=20_000)
+    args = parser.parse_args()
+
+    wrong = {"legacy": 0, "matcher": 0}
+    for stage, message, expected in CASES:
+        for label, found in (("legacy", legacy_classify(stage, message)),
+                             ("matcher", stage_intents.classify(stage, tokenize(message)))):
+            if found != expected:
+                wrong[label] += 1
+                print(f"  {label:<7} {stage:<18} {message!r}: {found!r} (expected {expected!r})")
+    print(f"Misread replies of {len(CASES)}: legacy {wrong['legacy']}, matcher {wrong['matcher']}")
+
+    cases = CASES * (args.messages // len(CASES))
+    # Distinct strings so tokenize's cache only helps the router -> handler repeat, not the loop
+    fresh = [(stage, f"{message} #{i}", expected) for i, (stage, message, expected) in enumerate(cases)]
+    print("Per message:")
+    print(f"  legacy any(word in msg) chain:          {per_message(legacy_classify, cases) * 1e6:6.2f} us")
+    print(f"  matcher, tokenize + classify (uncached): "
+          f"{per_message(lambda stage, m: stage_intents.classify(stage, tokenize.__wrapped__(m)), fresh) * 1e6:6.2f} us")
+    print(f"  matcher, tokens already cached:          "
+          f"{per_message(lambda stage, m: stage_intents.classify(stage, tokenize(m)), cases) * 1e6:6.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# bench_offer_book.py
+# Offer book: nightly build throughput and lookup latency (memory hit, disk hit) vs solving tiers live
+#
+# Usage: python benchmarks/bench_offer_book.py [--customers 200000] [--lookups 20000]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from offer_book import OfferBook
+from offer_engine import offer_tiers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offer book build and lookup latency")
+    parser.add_argument("--customers", type=int, default=200_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    names = [f"Customer{i}" for i in range(args.customers)]
+    salary = rng.integers(15, 250, args.customers) * 1000
+    score = rng.integers(650, 900, args.customers)
+    limit = rng.integers(50, 800, args.customers) * 1000
+    records = {name: {"credit_score": int(score[i]), "salary": int(salary[i]), "pre_approved_limit": int(limit[i])}
+               for i, name in enumerate(names)}
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_offer_book_"), "offer_book.db")
+    book = OfferBook(path, capacity=args.lookups)
+    start = time.perf_counter()
+    for begin in range(0, args.customers, args.batch_size):
+        end = begin + args.batch_size
+        book.build(names[begin:end], salary[begin:end], score[begin:end], limit[begin:end])
+    build = time.perf_counter() - start
+    # Sheets sit in the WAL until a checkpoint; fold them in so the size counts every row
+    book.checkpoint()
+    size = os.path.getsize(path) + (os.path.getsize(path + "-wal") if os.path.exists(path + "-wal") else 0)
+    print(f"Build {args.customers:,} sheets: {build:.2f}s ({args.customers / build:,.0f}/s, "
+          f"{size / args.customers:,.0f} bytes/customer)")
+
+    sample = [names[i] for i in rng.choice(args.customers, args.lookups, replace=False)]
+
+    def timed(lookup):
+        start = time.perf_counter()
+        for name in sample:
+            lookup(name)
+        return (time.perf_counter() - start) / len(sample)
+
+    disk = timed(lambda name: book.get(name, records[name]))
+    memory = timed(lambda name: book.get(name, records[name]))
+    live = timed(lambda name: offer_tiers(records[name]["salary"], records[name]["credit_score"],
+                                          records[name]["pre_approved_limit"]))
+    print(f"Lookup over {args.lookups:,} customers:")
+    print(f"  memory hit (LRU):        {memory * 1e6:7.1f} us")
+    print(f"  disk hit (SQLite):       {disk * 1e6:7.1f} us")
+    print(f"  live offer_tiers solve:  {live * 1e6:7.1f} us (tiers only; no frontier or EMI table)")
+    print(book.stats())
+    book.close()
+
+
+if __name__ == "__main__":
+    main()
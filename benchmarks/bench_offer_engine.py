@@ -0,0 +1,68 @@
+# bench_offer_engine.py
+# Offer frontier cost: closed-form inverse annuity vs stepping the amount down until the EMI fits
+#
+# Usage: python benchmarks/bench_offer_engine.py [--customers 2000] [--step 1000]
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import finance
+from offer_engine import TENURES, counter_offer, offer_frontier
+from underwriting_policy import default_policy as policy
+
+
+def trial_and_error_frontier(salary, credit_score, limit, step):
+    """Per tenure, step down from the 2x cap until the EMI is within the cap (the pre-solver way)"""
+    frontier = []
+    for tenure in TENURES:
+        amount = limit * policy.max_limit_multiple
+        while amount > limit and (finance.emi(amount, policy.rate_for(credit_score, amount), int(tenure))
+                                  / salary * 100 > policy.max_emi_ratio):
+            amount -= step
+        frontier.append(max(amount, limit))
+    return frontier
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offer frontier: closed form vs trial and error")
+    parser.add_argument("--customers", type=int, default=2000)
+    parser.add_argument("--step", type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    salary = rng.integers(15, 250, args.customers) * 1000
+    score = rng.integers(700, 900, args.customers)
+    limit = rng.integers(50, 800, args.customers) * 1000
+    cells = args.customers * len(TENURES)
+
+    start = time.perf_counter()
+    for i in range(args.customers):
+        trial_and_error_frontier(float(salary[i]), int(score[i]), float(limit[i]), args.step)
+    loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    offer_frontier(salary, score, limit, step=args.step)
+    vector = time.perf_counter() - start
+
+    runs = 2000
+    start = time.perf_counter()
+    for i in range(runs):
+        counter_offer(float(limit[i % args.customers]) * 1.8, float(salary[i % args.customers]),
+                      int(score[i % args.customers]), float(limit[i % args.customers]))
+    counter = (time.perf_counter() - start) / runs
+
+    print(f"Frontier: {args.customers:,} customers x {len(TENURES)} tenures ({cells:,} cells)")
+    print(f"  trial and error (Rs.{args.step:,} steps): {loop * 1000:9.1f} ms ({loop / args.customers * 1e6:,.0f} us/customer)")
+    print(f"  offer_frontier (closed form):      {vector * 1000:9.1f} ms ({vector / args.customers * 1e6:,.1f} us/customer, {loop / vector:,.0f}x)")
+    print(f"counter_offer (one customer, all tenures): {counter * 1e6:,.0f} us")
+
+
+if __name__ == "__main__":
+    main()
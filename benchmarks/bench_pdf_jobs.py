@@ -0,0 +1,93 @@
+# bench_pdf_jobs.py
+# Sanction letters: how long a chat turn is held (rendering inline vs queueing a job), and
+# burst throughput of the PDF job queue at 1, 4 and 8 worker processes (0 = one background thread)
+#
+# Usage: python benchmarks/bench_pdf_jobs.py [--letters 200] [--workers 0 1 4 8]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from entity_extractor import extract as extract_entities
+from sanction_letter import PdfJobQueue, SanctionLetterGenerator
+from turn_router import stage_intents, tokenize
+
+CUSTOMER = {"address": "Andheri West, Mumbai", "phone": "9876543210"}
+CHAT_MESSAGES = ["yes proceed", "I need 2.5 lakh", "change tenure to 36 months", "my salary is 75k"]
+
+
+def chat_work(i):
+    """A rule-handled chat turn's parsing, for timing the main thread while letters render"""
+    message = f"{CHAT_MESSAGES[i % len(CHAT_MESSAGES)]} #{i}"
+    stage_intents.classify("terms_confirmation", tokenize.__wrapped__(message))
+    extract_entities(message)
+
+
+def burst(workers, letters, folder):
+    """Queue a burst of letters; (seconds until all are on disk, queue stats, chat turn us while it ran)"""
+    queue = PdfJobQueue(workers=workers).start()
+    start = time.perf_counter()
+    jobs = [queue.submit(f"Customer{i}", 200_000 + i, 24, 11.5, CUSTOMER,
+                         os.path.join(folder, f"w{workers}_{i}.pdf")) for i in range(letters)]
+    # Keep "chatting" on this thread until the burst is done
+    turns, chat_seconds = 0, 0.0
+    while queue.status(jobs[-1]) == "pending" or queue.stats()["depth"]:
+        turn_start = time.perf_counter()
+        chat_work(turns)
+        chat_seconds += time.perf_counter() - turn_start
+        turns += 1
+    for job_id in jobs:
+        queue.result(job_id)
+    elapsed = time.perf_counter() - start
+    stats = queue.stats()
+    queue.close()
+    return elapsed, stats, chat_seconds / max(turns, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF job queue: turn latency and burst throughput")
+    parser.add_argument("--letters", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        for i in range(2_000):
+            chat_work(i)  # warm up
+        start = time.perf_counter()
+        for i in range(2_000):
+            chat_work(i)
+        idle_turn = (time.perf_counter() - start) / 2_000
+
+        count = min(args.letters, 50)
+        start = time.perf_counter()
+        for i in range(count):
+            SanctionLetterGenerator.generate_pdf(f"Inline{i}", 200_000, 24, 11.5, CUSTOMER,
+                                                 os.path.join(folder, f"inline_{i}.pdf"))
+        inline = (time.perf_counter() - start) / count
+        queue = PdfJobQueue(workers=1).start()
+        start = time.perf_counter()
+        for i in range(count):
+            queue.submit(f"Queued{i}", 200_000, 24, 11.5, CUSTOMER, os.path.join(folder, f"queued_{i}.pdf"))
+        queued = (time.perf_counter() - start) / count
+        queue.close()
+        print(f"Chat turn held per letter ({os.cpu_count()} CPUs):")
+        print(f"  render inline (old _generate_sanction): {inline * 1e3:8.2f} ms")
+        print(f"  submit to the job queue:                {queued * 1e3:8.2f} ms")
+
+        print(f"Burst of {args.letters} letters (chat turn on the main thread: {idle_turn * 1e6:.0f} us when idle):")
+        print("  workers | letters/s | render p50 | render p95 | ready p95 | peak queue | chat turn")
+        for workers in args.workers:
+            elapsed, stats, chat_turn = burst(workers, args.letters, folder)
+            label = f"{workers}" if workers else "thread"
+            print(f"  {label:>7} | {args.letters / elapsed:9.1f} | {stats['render_p50_ms']:7.1f} ms | "
+                  f"{stats['render_p95_ms']:7.1f} ms | {stats['wait_p95_ms']:6.0f} ms | "
+                  f"{stats['peak_depth']:10} | {chat_turn * 1e6:6.0f} us")
+
+
+if __name__ == "__main__":
+    main()
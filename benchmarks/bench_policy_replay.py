@@ -0,0 +1,72 @@
+# bench_policy_replay.py
+# What-if replay latency over a synthetic application history
+#
+# Usage: python benchmarks/bench_policy_replay.py [--rows 2000000] [--runs 5]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from application_store import APPLICATION_COLUMNS, CsvApplicationStore
+from policy_replay import PolicyReplay
+from underwriting_policy import UnderwritingPolicy
+
+CITIES = ["Mumbai", "Delhi", "Bangalore", "Chennai", "Hyderabad", "Pune", "Kolkata", "Ahmedabad"]
+
+
+def synthetic_history(rows, seed=7):
+    rng = np.random.default_rng(seed)
+    limit = rng.integers(50, 800, rows) * 1000
+    return pd.DataFrame({
+        "Timestamp": "2026-01-01 10:00:00", "Customer": "Lead", "Age": rng.integers(21, 60, rows),
+        "City": rng.choice(CITIES, rows), "Amount": (limit * rng.uniform(0.3, 2.6, rows)).astype(int),
+        "Tenure": 24, "Interest Rate": 12.0, "Credit Score": rng.integers(550, 900, rows),
+        "Pre-Approved Limit": limit, "Salary": rng.integers(15, 250, rows) * 1000,
+        "Decision": rng.choice(["Approved", "Conditional", "Rejected"], rows), "Confidence (%)": 90,
+    })[APPLICATION_COLUMNS]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Policy what-if replay latency")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--loop-rows", type=int, default=100_000, help="rows for the per-row baseline")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_replay_"), "loan_applications.csv")
+    history = synthetic_history(args.rows)
+    history.to_csv(path, index=False)
+    store = CsvApplicationStore(path)
+
+    start = time.perf_counter()
+    replay = PolicyReplay.from_store(store)
+    print(f"Load {args.rows:,} applications (columnar CSV read): {time.perf_counter() - start:.2f}s")
+
+    timings = []
+    for run in range(args.runs):
+        start = time.perf_counter()
+        replay.run(min_credit_score=680 + run * 5, max_emi_ratio=45)
+        timings.append(time.perf_counter() - start)
+    print(f"What-if replay (score, EMI ratio, per-city and per-band deltas): "
+          f"median {np.median(timings) * 1000:.0f} ms, best {min(timings) * 1000:.0f} ms")
+
+    policy = UnderwritingPolicy(min_credit_score=680, max_emi_ratio=45)
+    sample = history.head(args.loop_rows)
+    start = time.perf_counter()
+    for row in sample.itertuples(index=False):
+        policy.decide_one(row[4], row[7], row[9], row[8])
+    per_row = (time.perf_counter() - start) / len(sample)
+    print(f"Per-row decide_one loop, extrapolated to {args.rows:,} rows: {per_row * args.rows:.1f}s (decisions only)")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# bench_pricing.py
+# Pricing cost: one vectorized grid lookup vs the per-application if/elif rate rules
+#
+# Usage: python benchmarks/bench_pricing.py [--profiles 1000000]
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pricing import default_pricing as pricing
+
+
+def if_elif_rate(loan_type, credit_score, amount):
+    """SalesAgent.negotiate_terms' per-loan-type branches (the pre-grid way; no credit adjustment)"""
+    if loan_type == "Medical Loan":
+        return 9.99 if amount <= 300000 else 10.5
+    if loan_type == "Home Renovation Loan":
+        return 10.5 if amount <= 300000 else 11.0
+    if loan_type == "Education Loan":
+        return 10.25 if amount <= 300000 else 10.75
+    return 10.99 if amount <= 300000 else 11.5
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized pricing grid vs per-row rules")
+    parser.add_argument("--profiles", type=int, default=1_000_000)
+    parser.add_argument("--loop-profiles", type=int, default=200_000, help="profiles for the per-row baselines")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    profiles = pd.DataFrame({
+        "loan_type": rng.choice(pricing.grid.loan_types, args.profiles),
+        "credit_score": rng.integers(600, 900, args.profiles),
+        "amount": rng.integers(50, 2000, args.profiles) * 1000,
+    })
+
+    start = time.perf_counter()
+    rates = pricing.price(profiles)
+    vector = time.perf_counter() - start
+
+    sample = profiles.head(args.loop_profiles)
+    rows = list(sample.itertuples(index=False))
+    start = time.perf_counter()
+    looped = [if_elif_rate(*row) for row in rows]
+    loop = (time.perf_counter() - start) / len(rows)
+    start = time.perf_counter()
+    for row in rows:
+        pricing.price_one(*row)
+    one = (time.perf_counter() - start) / len(rows)
+
+    mismatches = int(np.count_nonzero(np.abs(rates[:len(rows)] - np.array(looped)) > 1e-9))
+    print(f"Price {args.profiles:,} profiles:")
+    print(f"  price() grid lookup:        {vector * 1000:8.1f} ms ({args.profiles / vector:,.0f}/s)")
+    print(f"  if/elif per row (extrap.):  {loop * args.profiles * 1000:8.1f} ms ({loop * 1e6:.2f} us/row)")
+    print(f"  price_one per row (extrap.):{one * args.profiles * 1000:8.1f} ms ({one * 1e6:.2f} us/row)")
+    print(f"  grid vs negotiate_terms rules, mismatches on {len(rows):,} rows: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
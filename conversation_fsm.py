@@ -0,0 +1,121 @@
+# conversation_fsm.py
+# Conversation state machine for the loan assistant
+# Stage enum, the table of allowed transitions, and per-transition counters
+
+import threading
+from collections import Counter
+from enum import Enum
+
+
+class Stage(str, Enum):
+    GREETING = "greeting"
+    IDENTIFICATION = "identification"
+    KYC_VERIFICATION = "kyc_verification"
+    NEW_CUSTOMER_PITCH = "new_customer_pitch"
+    NEW_CUSTOMER_INFO = "new_customer_info"
+    SALES_PITCH = "sales_pitch"
+    LOAN_TYPE_SELECTION = "loan_type_selection"
+    LOAN_REQUIREMENT = "loan_requirement"
+    TERMS_CONFIRMATION = "terms_confirmation"
+    KYC_UPLOAD = "kyc_upload"
+    UNDERWRITING = "underwriting"
+    CONDITIONAL_DOCS = "conditional_docs"
+    SANCTION = "sanction"
+    COMPLETED = "completed"
+
+
+STAGE_NAMES = [stage.value for stage in Stage]
+_STAGES_BY_NAME = {stage.value: stage for stage in Stage}
+
+# Where each stage may go next (staying put is always allowed).
+# Covers every move the rule handlers make plus the backward moves the AI may take
+# when a customer changes their mind (e.g. picking another loan type at the terms step).
+TRANSITIONS = {
+    Stage.GREETING: {Stage.IDENTIFICATION, Stage.KYC_VERIFICATION, Stage.SALES_PITCH,
+                     Stage.NEW_CUSTOMER_PITCH, Stage.LOAN_TYPE_SELECTION},
+    Stage.IDENTIFICATION: {Stage.KYC_VERIFICATION, Stage.SALES_PITCH, Stage.NEW_CUSTOMER_PITCH,
+                           Stage.LOAN_TYPE_SELECTION},
+    Stage.KYC_VERIFICATION: {Stage.SALES_PITCH, Stage.LOAN_TYPE_SELECTION},
+    Stage.NEW_CUSTOMER_PITCH: {Stage.NEW_CUSTOMER_INFO, Stage.LOAN_TYPE_SELECTION},
+    Stage.NEW_CUSTOMER_INFO: {Stage.SALES_PITCH, Stage.LOAN_TYPE_SELECTION, Stage.LOAN_REQUIREMENT},
+    Stage.SALES_PITCH: {Stage.LOAN_TYPE_SELECTION, Stage.LOAN_REQUIREMENT},
+    Stage.LOAN_TYPE_SELECTION: {Stage.NEW_CUSTOMER_INFO, Stage.LOAN_REQUIREMENT},
+    Stage.LOAN_REQUIREMENT: {Stage.LOAN_TYPE_SELECTION, Stage.TERMS_CONFIRMATION, Stage.UNDERWRITING},
+    Stage.TERMS_CONFIRMATION: {Stage.LOAN_TYPE_SELECTION, Stage.LOAN_REQUIREMENT, Stage.UNDERWRITING},
+    Stage.UNDERWRITING: {Stage.KYC_UPLOAD, Stage.CONDITIONAL_DOCS, Stage.SANCTION, Stage.COMPLETED},
+    Stage.KYC_UPLOAD: {Stage.UNDERWRITING, Stage.COMPLETED},
+    Stage.CONDITIONAL_DOCS: {Stage.SANCTION, Stage.COMPLETED},
+    Stage.SANCTION: {Stage.COMPLETED},
+    Stage.COMPLETED: {Stage.LOAN_TYPE_SELECTION, Stage.LOAN_REQUIREMENT},
+}
+
+
+def parse_stage(name):
+    """Stage for a stage name, or None if it isn't one of ours"""
+    if isinstance(name, Stage):
+        return name
+    if not isinstance(name, str):
+        return None
+    return _STAGES_BY_NAME.get(name.strip().lower())
+
+
+class TransitionStats:
+    """Process-wide counts of (from, to) transitions, plus rejected and off-table ones"""
+
+    def __init__(self):
+        self.transitions = Counter()
+        self.rejected = Counter()
+        self.unlisted = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, counter, from_stage, to_name):
+        with self._lock:
+            counter[(from_stage.value, to_name)] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "transitions": dict(self.transitions),
+                "rejected": dict(self.rejected),
+                "unlisted": dict(self.unlisted),
+            }
+
+
+transition_stats = TransitionStats()
+
+
+class ConversationFSM:
+    """Current stage of one conversation, moved only through validated transitions"""
+
+    def __init__(self, stage=Stage.GREETING, stats=transition_stats):
+        self.stage = parse_stage(stage)
+        self.stats = stats
+
+    def can_transition(self, to_stage):
+        target = parse_stage(to_stage)
+        return target is not None and (target == self.stage or target in TRANSITIONS[self.stage])
+
+    def transition(self, to_stage, source="rules"):
+        """Move to to_stage; returns False (and stays put) if the move is rejected.
+
+        Unknown stage names are always rejected. Moves missing from TRANSITIONS are
+        rejected when they come from the AI, but only counted when the rule handlers
+        make them, so the table can be tightened without breaking a flow.
+        """
+        target = parse_stage(to_stage)
+        if target is None:
+            self.stats.record(self.stats.rejected, self.stage, str(to_stage))
+            print(f"⚠️ STAGE REJECTED ({source}): Unknown stage '{to_stage}'")
+            return False
+        if target == self.stage:
+            return True
+        if target not in TRANSITIONS[self.stage]:
+            if source != "rules":
+                self.stats.record(self.stats.rejected, self.stage, target.value)
+                print(f"⚠️ STAGE REJECTED ({source}): {self.stage.value} -> {target.value} is not an allowed transition")
+                return False
+            self.stats.record(self.stats.unlisted, self.stage, target.value)
+            print(f"⚠️ STAGE TRANSITION NOT IN TABLE: {self.stage.value} -> {target.value}")
+        self.stats.record(self.stats.transitions, self.stage, target.value)
+        self.stage = target
+        return True
@@ -0,0 +1,373 @@
+# crm_repository.py
+# Customer records (the CRM) behind one interface
+# Lookups by normalized name, phone or PAN are a dict probe (in-memory) or an index seek
+# (SQLite), so identification and KYC stay fast when the CRM holds millions of customers
+#
+# Usage: python crm_repository.py load customers.csv [--db crm.db] [--batch-size 50000]
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from batch_underwriting import normalize_columns, read_chunks
+
+# Record fields besides the name; current_loans is a {loan type: outstanding} dict
+CUSTOMER_FIELDS = ["age", "city", "phone", "address", "pan", "kyc", "credit_score",
+                   "pre_approved_limit", "salary", "current_loans", "last_verified"]
+REQUIRED_FIELDS = ["name", "credit_score", "pre_approved_limit", "salary"]
+# Longest customer name, in words, that find_name() looks for in a message
+MAX_NAME_TOKENS = 3
+
+
+def normalize_name(name):
+    """Case- and whitespace-insensitive name key"""
+    return " ".join(str(name).casefold().split()) if name else ""
+
+
+def normalize_phone(phone):
+    """Last 10 digits (drops +91, spaces and dashes); '' when there aren't 10"""
+    digits = re.sub(r"\D", "", str(phone or ""))
+    return digits[-10:] if len(digits) >= 10 else ""
+
+
+def normalize_pan(pan):
+    return str(pan or "").strip().upper()
+
+
+def _record(name, fields):
+    """A customer record in the shape the agents use (missing fields filled in)"""
+    record = {"name": name}
+    for field in CUSTOMER_FIELDS:
+        record[field] = fields.get(field)
+    record["kyc"] = bool(record["kyc"])
+    record["current_loans"] = record["current_loans"] or {}
+    return record
+
+
+class CustomerRepository:
+    """Interface every CRM backend implements"""
+
+    def get(self, name):
+        """Record for a name (any case/spacing), or None"""
+        raise NotImplementedError
+
+    def find_by_phone(self, phone):
+        raise NotImplementedError
+
+    def find_by_pan(self, pan):
+        raise NotImplementedError
+
+    def update(self, name, **fields):
+        """Change fields of an existing record (e.g. kyc, last_verified); returns the record"""
+        raise NotImplementedError
+
+    def upsert_many(self, records):
+        """Insert or replace records (dicts with a name and CUSTOMER_FIELDS); returns how many"""
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def frame(self, limit=500):
+        """Up to `limit` records as a DataFrame (Name first), for the admin tab"""
+        raise NotImplementedError
+
+    def names(self, limit=None):
+        """Canonical customer names (up to `limit`), e.g. to build a name gazetteer"""
+        raise NotImplementedError
+
+    def find_name(self, tokens):
+        """Canonical name of a customer mentioned in a tokenized message, or None.
+        Probes 1- to MAX_NAME_TOKENS-word windows, so the cost is per message, not per customer."""
+        for size in range(min(MAX_NAME_TOKENS, len(tokens)), 0, -1):
+            for start in range(len(tokens) - size + 1):
+                record = self.get(" ".join(tokens[start:start + size]))
+                if record is not None:
+                    return record["name"]
+        return None
+
+    def stats(self):
+        return {"customers": self.count()}
+
+    def close(self):
+        pass
+
+
+class InMemoryCustomerRepository(CustomerRepository):
+    """Dicts keyed by normalized name, phone and PAN; records are shared, so updates are seen by every holder"""
+
+    def __init__(self, records=()):
+        self._lock = threading.Lock()
+        self._by_name = {}
+        self._by_phone = {}
+        self._by_pan = {}
+        self.upsert_many(records)
+
+    def get(self, name):
+        return self._by_name.get(normalize_name(name))
+
+    def find_by_phone(self, phone):
+        return self._by_phone.get(normalize_phone(phone))
+
+    def find_by_pan(self, pan):
+        return self._by_pan.get(normalize_pan(pan))
+
+    def update(self, name, **fields):
+        with self._lock:
+            record = self.get(name)
+            if record is None:
+                raise KeyError(name)
+            self._unindex(record)
+            record.update(fields)
+            self._index(record)
+            return record
+
+    def _index(self, record):
+        self._by_name[normalize_name(record["name"])] = record
+        if normalize_phone(record["phone"]):
+            self._by_phone[normalize_phone(record["phone"])] = record
+        if normalize_pan(record["pan"]):
+            self._by_pan[normalize_pan(record["pan"])] = record
+
+    def _unindex(self, record):
+        self._by_phone.pop(normalize_phone(record["phone"]), None)
+        self._by_pan.pop(normalize_pan(record["pan"]), None)
+
+    def upsert_many(self, records):
+        count = 0
+        with self._lock:
+            for fields in records:
+                existing = self._by_name.get(normalize_name(fields["name"]))
+                if existing is not None:
+                    self._unindex(existing)
+                self._index(_record(fields["name"], fields))
+                count += 1
+        return count
+
+    def count(self):
+        return len(self._by_name)
+
+    def frame(self, limit=500):
+        rows = list(self._by_name.values())[:limit]
+        return pd.DataFrame(rows, columns=["name"] + CUSTOMER_FIELDS).rename(columns={"name": "Name"})
+
+    def names(self, limit=None):
+        return [record["name"] for record in list(self._by_name.values())[:limit]]
+
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS customers (
+    name_key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    age INTEGER,
+    city TEXT,
+    phone TEXT,
+    phone_key TEXT,
+    address TEXT,
+    pan TEXT,
+    kyc INTEGER NOT NULL DEFAULT 0,
+    credit_score INTEGER,
+    pre_approved_limit INTEGER,
+    salary INTEGER,
+    current_loans TEXT,
+    last_verified TEXT
+)"""
+
+CREATE_INDEXES_SQL = [
+    "CREATE INDEX IF NOT EXISTS idx_customers_phone ON customers (phone_key)",
+    "CREATE INDEX IF NOT EXISTS idx_customers_pan ON customers (pan)",
+]
+
+SQL_FIELDS = ["name", "age", "city", "phone", "address", "pan", "kyc", "credit_score",
+              "pre_approved_limit", "salary", "current_loans", "last_verified"]
+UPSERT_SQL = "INSERT OR REPLACE INTO customers (name_key, phone_key, {}) VALUES ({})".format(
+    ", ".join(SQL_FIELDS), ", ".join("?" * (len(SQL_FIELDS) + 2)))
+SELECT_SQL = "SELECT {} FROM customers WHERE name_key = ?".format(", ".join(SQL_FIELDS))
+PHONE_SQL = "SELECT name_key FROM customers WHERE phone_key = ? LIMIT 1"
+PAN_SQL = "SELECT name_key FROM customers WHERE pan = ? LIMIT 1"
+
+
+class SqliteCustomerRepository(CustomerRepository):
+    """SQLite in WAL mode (primary key on the normalized name, indexes on phone and PAN)
+    with an LRU of hot records in front"""
+
+    def __init__(self, path, cache_size=10_000):
+        self.path = path
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # name_key -> record
+        self._conn = sqlite3.connect(path, check_same_thread=False, cached_statements=64)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(CREATE_TABLE_SQL)
+            for statement in CREATE_INDEXES_SQL:
+                self._conn.execute(statement)
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @staticmethod
+    def _values(fields):
+        record = _record(fields["name"], fields)
+        values = [record[field] for field in SQL_FIELDS]
+        values[SQL_FIELDS.index("pan")] = normalize_pan(record["pan"]) or None
+        values[SQL_FIELDS.index("kyc")] = int(record["kyc"])
+        values[SQL_FIELDS.index("current_loans")] = json.dumps(record["current_loans"])
+        return (normalize_name(record["name"]), normalize_phone(record["phone"]) or None, *values)
+
+    @staticmethod
+    def _decode(row):
+        record = dict(zip(SQL_FIELDS, row))
+        record["kyc"] = bool(record["kyc"])
+        record["pan"] = record["pan"] or None
+        record["current_loans"] = json.loads(record["current_loans"]) if record["current_loans"] else {}
+        return record
+
+    def _cache_put(self, key, record):
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _get_key(self, key):
+        if not key:
+            return None
+        with self._lock:
+            record = self._cache.get(key)
+            if record is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return record
+            self.cache_misses += 1
+            row = self._conn.execute(SELECT_SQL, (key,)).fetchone()
+            if row is None:
+                return None
+            record = self._decode(row)
+            self._cache_put(key, record)
+            return record
+
+    def get(self, name):
+        return self._get_key(normalize_name(name))
+
+    def _find(self, sql, value):
+        if not value:
+            return None
+        with self._lock:
+            row = self._conn.execute(sql, (value,)).fetchone()
+        return self._get_key(row[0]) if row else None
+
+    def find_by_phone(self, phone):
+        return self._find(PHONE_SQL, normalize_phone(phone))
+
+    def find_by_pan(self, pan):
+        return self._find(PAN_SQL, normalize_pan(pan))
+
+    def update(self, name, **fields):
+        record = self.get(name)
+        if record is None:
+            raise KeyError(name)
+        with self._lock, self._conn:
+            # The cached dict is updated in place, so sessions holding it see the change
+            record.update(fields)
+            self._conn.execute(UPSERT_SQL, self._values(record))
+        return record
+
+    def upsert_many(self, records):
+        rows = [self._values(fields) for fields in records]
+        with self._lock, self._conn:
+            self._conn.executemany(UPSERT_SQL, rows)
+            for row in rows:
+                self._cache.pop(row[0], None)
+        return len(rows)
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM customers").fetchone()[0]
+
+    def frame(self, limit=500):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT {} FROM customers ORDER BY rowid LIMIT ?".format(", ".join(SQL_FIELDS)), (limit,)).fetchall()
+        frame = pd.DataFrame([self._decode(row) for row in rows], columns=SQL_FIELDS)
+        return frame.rename(columns={"name": "Name"})
+
+    def names(self, limit=None):
+        with self._lock:
+            rows = self._conn.execute("SELECT name FROM customers ORDER BY rowid LIMIT ?",
+                                      (-1 if limit is None else limit,)).fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self):
+        with self._lock:
+            hits, misses, cached = self.cache_hits, self.cache_misses, len(self._cache)
+        lookups = hits + misses
+        return {"customers": self.count(), "cached": cached, "cache_hits": hits, "cache_misses": misses,
+                "hit_rate": hits / lookups if lookups else 0.0}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _chunk_records(chunk):
+    """CRM rows from a normalized chunk, with optional columns filled and loans decoded"""
+    for column in CUSTOMER_FIELDS:
+        if column not in chunk.columns:
+            chunk[column] = None
+    chunk = chunk.astype(object).where(chunk.notna(), None)
+    for record in chunk[["name"] + CUSTOMER_FIELDS].to_dict("records"):
+        loans = record["current_loans"]
+        if isinstance(loans, str):
+            record["current_loans"] = json.loads(loans) if loans.strip() else {}
+        kyc = record["kyc"]
+        if isinstance(kyc, str):
+            record["kyc"] = kyc.strip().lower() in ("1", "true", "yes", "y")
+        yield record
+
+
+def load_customers(path, repository, batch_size=50_000):
+    """Bulk-load a CRM export (CSV, JSONL or Parquet) into a repository; returns rows loaded"""
+    loaded = 0
+    for chunk in read_chunks(path, batch_size):
+        chunk = normalize_columns(chunk, required=REQUIRED_FIELDS)
+        loaded += repository.upsert_many(_chunk_records(chunk))
+    return loaded
+
+
+def open_customer_repository(backend, db_path=None, seed=None, cache_size=10_000):
+    """Build the configured backend ("memory" or "sqlite"); seed records fill an empty CRM"""
+    seed = [dict(fields, name=name) for name, fields in (seed or {}).items()]
+    if backend == "memory":
+        return InMemoryCustomerRepository(seed)
+    if backend == "sqlite":
+        repository = SqliteCustomerRepository(db_path or "crm.db", cache_size=cache_size)
+        if seed and not repository.count():
+            repository.upsert_many(seed)
+            print(f"👥 Seeded {len(seed)} customers into {repository.path}")
+        return repository
+    raise ValueError(f"Unknown CRM backend: {backend}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CRM repository utilities")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    load = subcommands.add_parser("load", help="load customers (.csv, .jsonl or .parquet) into SQLite")
+    load.add_argument("path")
+    load.add_argument("--db", default=os.getenv("CRM_DB", "crm.db"))
+    load.add_argument("--batch-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    if args.command == "load":
+        repository = SqliteCustomerRepository(args.db)
+        start = time.perf_counter()
+        loaded = load_customers(args.path, repository, args.batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"👥 Loaded {loaded:,} customers in {elapsed:.2f}s -> {args.db} ({repository.count():,} total)")
+        repository.close()
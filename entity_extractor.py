@@ -0,0 +1,159 @@
+# entity_extractor.py
+# One pass over a chat message for the numbers and name the rule engine needs
+# Patterns are compiled once at import; every number is read in its Indian format
+# (50k, 2.5 lakh, 3 lac, 1.2 crore, Rs.3,00,000, 3,00,000.50) together with what follows it
+# (a unit, "months"/"years", "%"), so the amount, salary, age and tenure rules pick from
+# typed quantities instead of the first run of digits
+
+import re
+from functools import lru_cache
+
+# Unit words -> multiplier
+UNITS = {
+    "k": 1_000, "thousand": 1_000,
+    "l": 100_000, "lakh": 100_000, "lakhs": 100_000, "lac": 100_000, "lacs": 100_000,
+    "cr": 10_000_000, "crore": 10_000_000, "crores": 10_000_000,
+}
+PERIODS = {"month": 1, "months": 1, "mo": 1, "mos": 1, "mth": 1, "mths": 1,
+           "year": 12, "years": 12, "yr": 12, "yrs": 12}
+
+# One scan splits a message into currency marks, numbers (with any glued unit: 50k, 2lakh,
+# 24months), words and "%"; words swallow glued digits, so a PAN's digits are never a number
+TOKEN_PATTERN = re.compile(r"(?:₹|[Rr][Ss]\.?|[Ii][Nn][Rr])(?=\s*\d)|\d[\d,]*(?:\.\d+)?[A-Za-z]*|[^\W\d_][\w']*|%")
+CURRENCY_TOKENS = {"₹", "rs", "rs.", "inr"}
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+# Token sequences that introduce a name ("I am 29" has no name in it: names are letters)
+NAME_TRIGGERS = [("my", "name", "is"), ("i'm",), ("i", "am"), ("call", "me"), ("this", "is")]
+NAME_TRIGGER_STARTS = {trigger[0]: trigger for trigger in NAME_TRIGGERS}
+NOT_NAMES = {"hello", "hi", "hey", "yes", "no", "ok", "loan", "money"}
+
+# Plausible ranges (rupees / years)
+SALARY_RANGE = (15_000, 500_000)
+AGE_RANGE = (18, 65)
+# Bare numbers below these are read in lakhs (amounts: "I need 3") or thousands (salaries: "75")
+BARE_LAKH_BELOW = 100
+BARE_THOUSAND_BELOW = 1_000
+
+
+class Quantity:
+    """A number as written in the message, with its unit, currency and period"""
+
+    __slots__ = ("number", "value", "unit", "currency", "period", "age", "percent", "grouped", "fraction")
+
+    def __init__(self, digits, unit, currency, period, age, percent):
+        self.number = float(digits.replace(",", ""))
+        self.unit = unit
+        self.value = self.number * UNITS[unit] if unit else self.number
+        self.currency = currency
+        self.period = PERIODS[period] if period else None  # months per period
+        self.age = age  # "29 years old"
+        self.percent = percent
+        self.grouped = "," in digits
+        self.fraction = "." in digits
+
+    def __repr__(self):
+        return f"Quantity({self.value:g}, unit={self.unit}, currency={self.currency}, period={self.period})"
+
+
+def _quantities(words):
+    """Quantities from lower-cased tokens, reading each number's unit/period from its suffix or the next tokens"""
+    quantities = []
+    if not any(word[0].isdigit() for word in words):
+        return quantities
+    count = len(words)
+    for i, word in enumerate(words):
+        if not word[0].isdigit():
+            continue
+        digits = word.rstrip(LETTERS)
+        suffix = word[len(digits):]
+        unit = suffix if suffix in UNITS else None
+        period = suffix if suffix in PERIODS else None
+        if suffix and not (unit or period):
+            continue  # "2nd", "10am"
+        j = i + 1
+        if unit is None and period is None and j < count and words[j] in UNITS:
+            unit = words[j]
+            j += 1
+        if period is None and j < count and words[j] in PERIODS:
+            period = words[j]
+            j += 1
+        following = words[j] if j < count else None
+        quantities.append(Quantity(digits, unit, i > 0 and words[i - 1] in CURRENCY_TOKENS, period,
+                                   period is not None and following == "old", following == "%"))
+    return quantities
+
+
+class Entities:
+    """Everything the rule engine reads from one message, from a single tokenization"""
+
+    __slots__ = ("quantities", "amount", "salary", "age", "tenure_months", "name")
+
+    def __init__(self, message):
+        tokens = TOKEN_PATTERN.findall(message)
+        words = [token.lower() for token in tokens]
+        self.quantities = _quantities(words)
+        money = [quantity for quantity in self.quantities if quantity.period is None and not quantity.percent]
+        self.amount = _amount(money)
+        self.salary = _salary(money)
+        self.age = _age(self.quantities)
+        self.tenure_months = next((int(quantity.number * quantity.period) for quantity in self.quantities
+                                   if quantity.period and not quantity.unit and not quantity.age), None)
+        self.name = _name(tokens, words)
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self.__slots__[1:])
+        return f"Entities({fields})"
+
+
+def _amount(money):
+    """Loan amount: the first quantity marked as money (Rs., a unit), else the first number"""
+    if not money:
+        return None
+    quantity = next((quantity for quantity in money if quantity.currency or quantity.unit), money[0])
+    if quantity.unit is None and not quantity.currency and quantity.value < BARE_LAKH_BELOW:
+        return int(quantity.value * UNITS["lakh"])
+    return int(quantity.value)
+
+
+def _salary(money):
+    """Monthly salary in the plausible range"""
+    for quantity in money:
+        value = quantity.value
+        if quantity.unit is None and not quantity.currency and value < BARE_THOUSAND_BELOW:
+            value *= UNITS["k"]
+        if SALARY_RANGE[0] <= value <= SALARY_RANGE[1]:
+            return int(value)
+    return None
+
+
+def _age(quantities):
+    """Age: a plain whole number (optionally "years") in the plausible range, "N years old" first"""
+    for quantity in sorted(quantities, key=lambda quantity: not quantity.age):
+        if (quantity.unit or quantity.currency or quantity.grouped or quantity.fraction or quantity.percent
+                or quantity.period not in (None, 12)):
+            continue
+        if AGE_RANGE[0] <= quantity.number <= AGE_RANGE[1]:
+            return int(quantity.number)
+    return None
+
+
+def _name(tokens, words):
+    """The word after "my name is" / "I'm" / ..., or a one-word message, as typed"""
+    for i, word in enumerate(words):
+        trigger = NAME_TRIGGER_STARTS.get(word)
+        if trigger is None:
+            continue
+        end = i + len(trigger)
+        if end < len(words) and tuple(words[i:end]) == trigger:
+            if tokens[end].isalpha() and words[end] not in NOT_NAMES:
+                return tokens[end]
+    if len(tokens) == 1 and tokens[0].isalpha() and words[0] not in NOT_NAMES:
+        return tokens[0]
+    return None
+
+
+@lru_cache(maxsize=4096)
+def extract(message):
+    """Entities in a message; the router and the rule handler share one parse per message"""
+    return Entities(message)
@@ -0,0 +1,111 @@
+# finance.py
+# Loan maths shared by every agent: EMI, total interest and amortization schedules
+# Scalars take a plain-float fast path; arrays of amounts x rates x tenures broadcast
+# through NumPy in one call (offer grids, batch underwriting)
+
+import numpy as np
+
+_SCALAR_TYPES = (int, float)
+
+
+def _is_scalar(*values):
+    return all(type(value) in _SCALAR_TYPES for value in values)
+
+
+def emi(amount, rate, tenure):
+    """EMI for scalars or broadcastable arrays of amounts, annual rates (%) and tenures (months)"""
+    # Plain-float fast path for the single-loan case (chat turns, letters)
+    if type(amount) in _SCALAR_TYPES and type(rate) in _SCALAR_TYPES and type(tenure) in _SCALAR_TYPES:
+        monthly_rate = rate / 1200
+        if monthly_rate == 0:
+            return amount / tenure
+        growth = (1 + monthly_rate) ** tenure
+        return amount * monthly_rate * growth / (growth - 1)
+    amount = np.asarray(amount, dtype=float)
+    monthly_rate = np.asarray(rate, dtype=float) / 1200
+    tenure = np.asarray(tenure, dtype=float)
+    growth = np.power(1 + monthly_rate, tenure)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = amount * monthly_rate * growth / (growth - 1)
+    return np.where(monthly_rate == 0, amount / tenure, result)
+
+
+def principal_for_emi(emi_amount, rate, tenure):
+    """Largest amount whose EMI is emi_amount (the annuity formula solved for the principal)"""
+    if type(emi_amount) in _SCALAR_TYPES and type(rate) in _SCALAR_TYPES and type(tenure) in _SCALAR_TYPES:
+        monthly_rate = rate / 1200
+        if monthly_rate == 0:
+            return emi_amount * tenure
+        return emi_amount * (1 - (1 + monthly_rate) ** -tenure) / monthly_rate
+    emi_amount = np.asarray(emi_amount, dtype=float)
+    monthly_rate = np.asarray(rate, dtype=float) / 1200
+    tenure = np.asarray(tenure, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = emi_amount * (1 - np.power(1 + monthly_rate, -tenure)) / monthly_rate
+    return np.where(monthly_rate == 0, emi_amount * tenure, result)
+
+
+def emi_grid(amounts, rates, tenures):
+    """EMI for every amount x rate x tenure combination, shaped (amounts, rates, tenures)"""
+    amounts, rates, tenures = np.ix_(np.atleast_1d(amounts), np.atleast_1d(rates), np.atleast_1d(tenures))
+    return emi(amounts, rates, tenures)
+
+
+def total_payable(amount, rate, tenure):
+    """Sum of all EMIs over the tenure"""
+    return emi(amount, rate, tenure) * (tenure if _is_scalar(tenure) else np.asarray(tenure, dtype=float))
+
+
+def total_interest(amount, rate, tenure):
+    """Interest paid over the tenure"""
+    if _is_scalar(amount, rate, tenure):
+        return emi(amount, rate, tenure) * tenure - amount
+    return total_payable(amount, rate, tenure) - np.asarray(amount, dtype=float)
+
+
+def amortization_schedule(amount, rate, tenure):
+    """Month-by-month split of each EMI into interest and principal.
+
+    Returns a dict of arrays shaped broadcast(amount, rate, tenure) + (max tenure,) with keys
+    month, emi, interest, principal and balance (outstanding after the payment). Months
+    past a loan's own tenure are zero.
+    """
+    amount, rate, tenure = np.broadcast_arrays(np.asarray(amount, dtype=float),
+                                               np.asarray(rate, dtype=float),
+                                               np.asarray(tenure, dtype=int))
+    months = np.arange(1, int(tenure.max()) + 1)
+    monthly_rate = (rate / 1200)[..., None]
+    payment = np.asarray(emi(amount, rate, tenure), dtype=float)[..., None]
+    principal_0 = amount[..., None]
+    # Closed-form outstanding balance after k payments, for every k at once
+    growth = np.power(1 + monthly_rate, months)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        balance = np.where(monthly_rate == 0,
+                           principal_0 - payment * months,
+                           principal_0 * growth - payment * (growth - 1) / monthly_rate)
+    balance = np.maximum(balance, 0.0)
+    opening = np.concatenate([principal_0, balance[..., :-1]], axis=-1)
+    interest = opening * monthly_rate
+    active = months <= tenure[..., None]
+    return {
+        "month": months,
+        "emi": np.where(active, payment, 0.0),
+        "interest": np.where(active, interest, 0.0),
+        "principal": np.where(active, payment - interest, 0.0),
+        "balance": np.where(active, balance, 0.0),
+    }
+
+
+def schedule_rows(amount, rate, tenure):
+    """Amortization schedule for one loan as a list of dicts (for tables and letters)"""
+    schedule = amortization_schedule(amount, rate, tenure)
+    return [
+        {
+            "month": int(month),
+            "emi": round(float(schedule["emi"][i]), 2),
+            "interest": round(float(schedule["interest"][i]), 2),
+            "principal": round(float(schedule["principal"][i]), 2),
+            "balance": round(float(schedule["balance"][i]), 2),
+        }
+        for i, month in enumerate(schedule["month"])
+    ]
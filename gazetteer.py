@@ -0,0 +1,154 @@
+# gazetteer.py
+# Cities, loan types and customer names found in a message in one pass
+# Every phrase from the data files (data/cities.txt, data/loan_types.txt) and the CRM is
+# compiled into one Aho-Corasick automaton over words: a message is scanned once, left to
+# right, with one transition per word, so matches always fall on word boundaries and the
+# cost depends on the message, not on how many phrases are loaded
+#
+# Usage: python gazetteer.py "moving from bombay for a wedding loan"
+
+import argparse
+import os
+import re
+import threading
+from collections import Counter, deque, namedtuple
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+# Gazetteer kind -> data file ("Canonical|alias|alias" per line, # comments)
+GAZETTEER_FILES = {
+    "city": os.getenv("CITY_GAZETTEER", os.path.join(DATA_DIR, "cities.txt")),
+    "loan_type": os.getenv("LOAN_TYPE_GAZETTEER", os.path.join(DATA_DIR, "loan_types.txt")),
+}
+
+# Letters and digits in any script; everything else separates words ("Navi-Mumbai's" -> navi mumbai s)
+WORD_PATTERN = re.compile(r"[^\W_]+")
+
+Match = namedtuple("Match", ["start", "end", "kind", "value"])  # word span [start, end)
+
+
+def words(text):
+    return WORD_PATTERN.findall(text.casefold())
+
+
+class Gazetteer:
+    """Aho-Corasick automaton over words; each phrase maps to a (kind, canonical value)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._goto = [{}]     # state -> {word: next state}
+        self._fail = [0]      # state -> longest proper suffix state
+        self._own = [[]]      # state -> [(length, kind, value)] of phrases ending exactly here
+        self._outputs = None  # state -> own outputs plus those of its suffix states (set by compile)
+        self.sizes = Counter()
+
+    def add(self, phrase, kind, value):
+        """Add a phrase (any case/punctuation) that stands for `value` of a kind"""
+        tokens = words(phrase)
+        if not tokens:
+            return
+        with self._lock:
+            state = 0
+            for token in tokens:
+                following = self._goto[state].get(token)
+                if following is None:
+                    following = len(self._goto)
+                    self._goto[state][token] = following
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._own.append([])
+                state = following
+            entry = (len(tokens), kind, value)
+            if entry not in self._own[state]:
+                self._own[state].append(entry)
+                self.sizes[kind] += 1
+            self._outputs = None
+
+    def compile(self):
+        """Build the failure links (breadth first); done once after loading, and again after add()"""
+        with self._lock:
+            if self._outputs is not None:
+                return
+            outputs = [None] * len(self._goto)
+            outputs[0] = []
+            queue = deque()
+            for state in self._goto[0].values():
+                self._fail[state] = 0
+                outputs[state] = self._own[state]
+                queue.append(state)
+            while queue:
+                state = queue.popleft()
+                for token, following in self._goto[state].items():
+                    fail = self._fail[state]
+                    while fail and token not in self._goto[fail]:
+                        fail = self._fail[fail]
+                    self._fail[following] = self._goto[fail].get(token, 0)
+                    suffix_outputs = outputs[self._fail[following]]
+                    own = self._own[following]
+                    outputs[following] = own + suffix_outputs if suffix_outputs else own
+                    queue.append(following)
+            self._outputs = outputs
+
+    def find_all(self, text, kind=None):
+        """Every phrase (of a kind, or of any kind) in the text, in order of where it ends"""
+        if self._outputs is None:
+            self.compile()
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        matches = []
+        state = 0
+        for end, token in enumerate(words(text), start=1):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for length, found_kind, value in outputs[state]:
+                if kind is None or found_kind == kind:
+                    matches.append(Match(end - length, end, found_kind, value))
+        return matches
+
+    def first(self, text, kind):
+        """Leftmost phrase of a kind in the text (the longest, when several start there), or None"""
+        matches = self.find_all(text, kind)
+        if not matches:
+            return None
+        return min(matches, key=lambda match: (match.start, -match.end))
+
+    def find(self, text, kind):
+        """Canonical value of the first phrase of a kind in the text, or None"""
+        match = self.first(text, kind)
+        return match.value if match else None
+
+    def stats(self):
+        return {"phrases": dict(self.sizes), "states": len(self._goto)}
+
+
+def read_entries(path):
+    """(phrase, canonical) pairs from a "Canonical|alias|alias" file"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            names = [name.strip() for name in line.split("|") if name.strip()]
+            for phrase in names:
+                yield phrase, names[0]
+
+
+def load_gazetteer(files=GAZETTEER_FILES, customer_names=()):
+    """A compiled gazetteer of the data files plus customer names (kind "customer")"""
+    gazetteer = Gazetteer()
+    for kind, path in files.items():
+        for phrase, canonical in read_entries(path):
+            gazetteer.add(phrase, kind, canonical)
+    for name in customer_names:
+        gazetteer.add(name, "customer", name)
+    gazetteer.compile()
+    return gazetteer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the gazetteer matches in a message")
+    parser.add_argument("message")
+    args = parser.parse_args()
+    gazetteer = load_gazetteer()
+    print(f"📚 {gazetteer.stats()}")
+    for match in gazetteer.find_all(args.message):
+        print(f"  {match.kind:<10} words {match.start}-{match.end}: {match.value}")
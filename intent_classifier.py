@@ -0,0 +1,255 @@
+# intent_classifier.py
+# Offline intent detection for free-text turns
+# Hashed character n-grams (2-4 bytes, FNV-1a, computed with a few NumPy ops per message)
+# feed a softmax linear model trained on a labelled JSONL of utterances; predict() returns
+# the intent and its probability, and the agent asks the LLM only when that is below a threshold
+#
+# Usage: python intent_classifier.py train [data/intents.jsonl ...] [--model data/intent_model.npz]
+#        python intent_classifier.py export-logs conversation_logs.jsonl -o logged_intents.jsonl
+#        python intent_classifier.py predict "what is the interest rate"
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from entity_extractor import extract as extract_entities
+from gazetteer import load_gazetteer
+from turn_router import stage_intents, tokenize
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+INTENT_DATA = os.getenv("INTENT_DATA", os.path.join(DATA_DIR, "intents.jsonl"))
+INTENT_MODEL = os.getenv("INTENT_MODEL", os.path.join(DATA_DIR, "intent_model.npz"))
+
+HASH_DIM = 2 ** 14
+NGRAM_SIZES = (2, 3, 4)
+FNV_OFFSET = np.uint32(2166136261)
+FNV_PRIME = np.uint32(16777619)
+
+
+def features(message, dim=HASH_DIM):
+    """Hashed n-gram indices of a message and the weight of each (1/sqrt(count), so rows have unit norm)"""
+    text = " " + " ".join(message.lower().split()) + " "
+    data = np.frombuffer(text.encode("utf-8"), dtype=np.uint8).astype(np.uint32)
+    # FNV-1a of every window, grown one byte at a time: hashes[n] covers data[i:i + n]
+    hashes = (FNV_OFFSET ^ data) * FNV_PRIME
+    indices = []
+    for size in range(2, NGRAM_SIZES[-1] + 1):
+        hashes = (hashes[:-1] ^ data[size - 1:]) * FNV_PRIME
+        if size in NGRAM_SIZES:
+            indices.append(hashes % dim)
+    indices = np.concatenate(indices)
+    return indices, 1.0 / np.sqrt(max(len(indices), 1))
+
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=-1, keepdims=True)
+    np.exp(scores, out=scores)
+    scores /= scores.sum(axis=-1, keepdims=True)
+    return scores
+
+
+class IntentClassifier:
+    """Softmax regression over hashed character n-grams"""
+
+    def __init__(self, labels, weights=None, bias=None, dim=HASH_DIM):
+        self.labels = list(labels)
+        self.dim = dim
+        self.weights = np.zeros((dim, len(self.labels)), dtype=np.float32) if weights is None else weights
+        self.bias = np.zeros(len(self.labels), dtype=np.float32) if bias is None else bias
+
+    def _matrix(self, texts):
+        """Dense feature rows for a batch of texts"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            indices, weight = features(text, self.dim)
+            np.add.at(matrix[row], indices, weight)
+        return matrix
+
+    @classmethod
+    def train(cls, texts, intents, dim=HASH_DIM, epochs=60, batch_size=256, learning_rate=0.05, l2=1e-5, seed=0):
+        """Fit with mini-batch Adam on the cross-entropy loss"""
+        labels = sorted(set(intents))
+        model = cls(labels, dim=dim)
+        targets = np.array([labels.index(intent) for intent in intents])
+        rng = np.random.default_rng(seed)
+        moments = [np.zeros_like(model.weights), np.zeros_like(model.bias)]
+        squares = [np.zeros_like(model.weights), np.zeros_like(model.bias)]
+        beta1, beta2, step = 0.9, 0.999, 0
+        for _ in range(epochs):
+            order = rng.permutation(len(texts))
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                matrix = model._matrix([texts[i] for i in batch])
+                errors = _softmax(matrix @ model.weights + model.bias)
+                errors[np.arange(len(batch)), targets[batch]] -= 1.0
+                errors /= len(batch)
+                gradients = [matrix.T @ errors + l2 * model.weights, errors.sum(axis=0)]
+                step += 1
+                for parameter, gradient, moment, square in zip((model.weights, model.bias), gradients, moments, squares):
+                    moment *= beta1
+                    moment += (1 - beta1) * gradient
+                    square *= beta2
+                    square += (1 - beta2) * gradient * gradient
+                    corrected = moment / (1 - beta1 ** step)
+                    parameter -= learning_rate * corrected / (np.sqrt(square / (1 - beta2 ** step)) + 1e-8)
+        return model
+
+    def predict(self, message):
+        """(intent, probability) for one message"""
+        indices, weight = features(message, self.dim)
+        probabilities = _softmax(self.weights[indices].sum(axis=0) * weight + self.bias)
+        best = int(probabilities.argmax())
+        return self.labels[best], float(probabilities[best])
+
+    def predict_many(self, texts):
+        """Intents and probabilities for a batch of messages (one gather and one segmented sum)"""
+        rows = [features(text, self.dim) for text in texts]
+        lengths = np.array([len(indices) for indices, _ in rows])
+        offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        gathered = self.weights[np.concatenate([indices for indices, _ in rows])]
+        scores = np.add.reduceat(gathered, offsets, axis=0) * np.array([weight for _, weight in rows])[:, None]
+        probabilities = _softmax(scores + self.bias)
+        best = probabilities.argmax(axis=1)
+        return [self.labels[i] for i in best], probabilities[np.arange(len(texts)), best]
+
+    def save(self, path):
+        np.savez_compressed(path, weights=self.weights, bias=self.bias, labels=np.array(self.labels), dim=self.dim)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as saved:
+            return cls(saved["labels"].tolist(), saved["weights"], saved["bias"], int(saved["dim"]))
+
+
+def read_examples(paths):
+    """(texts, intents) from JSONL files of {"text": ..., "intent": ...}; rows without an intent are skipped"""
+    texts, intents = [], []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                if row.get("text") and row.get("intent"):
+                    texts.append(row["text"])
+                    intents.append(row["intent"])
+    return texts, intents
+
+
+def load_saved(model_path=INTENT_MODEL, data_paths=(INTENT_DATA,)):
+    """The saved model, or None if none has been trained yet (never trains: see the train command)"""
+    if not os.path.exists(model_path):
+        print(f"⚠️ INTENTS: No model at {model_path}; free text goes to the LLM until "
+              f"`python intent_classifier.py train` is run")
+        return None
+    if any(os.path.getmtime(path) > os.path.getmtime(model_path) for path in data_paths if os.path.exists(path)):
+        print(f"⚠️ INTENTS: {model_path} is older than its training data; retrain with "
+              f"`python intent_classifier.py train`")
+    return IntentClassifier.load(model_path)
+
+
+def load_or_train(model_path=INTENT_MODEL, data_paths=(INTENT_DATA,)):
+    """The saved model, retrained (and saved) when it is missing or older than its training data"""
+    newest_data = max(os.path.getmtime(path) for path in data_paths)
+    if os.path.exists(model_path) and os.path.getmtime(model_path) >= newest_data:
+        return IntentClassifier.load(model_path)
+    start = time.perf_counter()
+    texts, intents = read_examples(data_paths)
+    model = IntentClassifier.train(texts, intents)
+    model.save(model_path)
+    print(f"🎯 INTENTS: Trained on {len(texts):,} utterances ({len(model.labels)} intents) "
+          f"in {time.perf_counter() - start:.1f}s -> {model_path}")
+    return model
+
+
+_gazetteer = None
+
+
+def label_turn(turn):
+    """Intent of a logged turn that the rule engine handled, read from what the rules understood (or None)"""
+    global _gazetteer
+    if turn.get("route") != "rules" or not turn.get("message"):
+        return None
+    stage, message = turn.get("stage"), turn["message"]
+    tokens = tokenize(message)
+    answer = stage_intents.classify(stage, tokens) if stage else None
+    if answer == "greet":
+        return "greeting"
+    if answer == "yes":
+        return "ready_to_proceed"
+    if answer == "no":
+        return "objection"
+    if stage in ("identification", "new_customer_info"):
+        return "personal_info"
+    if stage == "loan_requirement" and extract_entities(message).amount:
+        return "loan_amount"
+    if stage == "loan_type_selection":
+        if _gazetteer is None:
+            _gazetteer = load_gazetteer()
+        if _gazetteer.find(message, "loan_type"):
+            return "loan_type"
+    return {"rates": "rate_inquiry", "loan": "loan_inquiry"}.get(stage_intents.classify("fallback", tokens))
+
+
+def read_conversations(log_path):
+    """Logged conversations: one JSON object per line, or the older single JSON list"""
+    with open(log_path, "r", encoding="utf-8") as f:
+        if f.read(1) == "[":
+            f.seek(0)
+            yield from json.load(f)
+            return
+        f.seek(0)
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def export_logs(log_path, out_path, unlabelled=False):
+    """Write training JSONL from conversation logs; returns (labelled, unlabelled) row counts.
+    Turns the rules handled are labelled from what the rules understood; with unlabelled=True the
+    rest are written with "intent": null, to be labelled by hand"""
+    counts = [0, 0]
+    with open(out_path, "w", encoding="utf-8") as out:
+        for conversation in read_conversations(log_path):
+            for turn in conversation.get("turns", []):
+                intent = label_turn(turn)
+                if intent is None and not (unlabelled and turn.get("message")):
+                    continue
+                counts[intent is None] += 1
+                row = {"text": turn["message"], "intent": intent, "stage": turn.get("stage")}
+                out.write(json.dumps(row, ensure_ascii=False) + "\n")
+    return tuple(counts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline intent classifier")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    train = subcommands.add_parser("train", help="train on labelled JSONL files and save the model")
+    train.add_argument("data", nargs="*", default=[INTENT_DATA])
+    train.add_argument("--model", default=INTENT_MODEL)
+    train.add_argument("--epochs", type=int, default=60)
+    export = subcommands.add_parser("export-logs", help="write training JSONL from conversation logs")
+    export.add_argument("logs")
+    export.add_argument("-o", "--output", default="logged_intents.jsonl")
+    export.add_argument("--unlabelled", action="store_true", help="also write turns the rules did not handle")
+    predict = subcommands.add_parser("predict", help="classify a message with the saved model")
+    predict.add_argument("message")
+    predict.add_argument("--model", default=INTENT_MODEL)
+    args = parser.parse_args()
+
+    if args.command == "train":
+        start = time.perf_counter()
+        texts, intents = read_examples(args.data)
+        model = IntentClassifier.train(texts, intents, epochs=args.epochs)
+        model.save(args.model)
+        print(f"🎯 Trained on {len(texts):,} utterances ({len(model.labels)} intents) "
+              f"in {time.perf_counter() - start:.1f}s -> {args.model}")
+    elif args.command == "export-logs":
+        labelled, unlabelled = export_logs(args.logs, args.output, args.unlabelled)
+        print(f"📝 Wrote {labelled:,} labelled and {unlabelled:,} unlabelled utterances -> {args.output}")
+    else:
+        intent, confidence = load_or_train(args.model).predict(args.message)
+        print(f"🎯 {intent} ({confidence:.0%})")
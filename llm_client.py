@@ -0,0 +1,475 @@
+# llm_client.py
+# LLM access for the loan assistant
+# Provider interface with the Gemini backend (shared model registry + startup warm-up),
+# an offline stub backend with injected latency and errors for load testing,
+# and a guard (in-flight limit, deadlines, circuit breaker) that every call goes through
+
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import google.generativeai as genai
+from google.generativeai import client as genai_client
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+
+class ModelRegistry:
+    """One GenerativeModel per (model name, response schema), shared by every session"""
+
+    def __init__(self, model_name=DEFAULT_MODEL):
+        self.model_name = model_name
+        self._models = {}
+        self._lock = threading.Lock()
+        self.construction_ms = {}
+        self.warmup = {"status": "not started"}
+
+    def get(self, response_schema=None, model_name=None):
+        """Return the cached model for this configuration, building it on first use"""
+        name = model_name or self.model_name
+        key = (name, json.dumps(response_schema, sort_keys=True) if response_schema else None)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                started = time.perf_counter()
+                generation_config = None
+                if response_schema:
+                    # Structured output: the model must answer with JSON matching the schema
+                    generation_config = genai.GenerationConfig(
+                        response_mime_type="application/json",
+                        response_schema=response_schema
+                    )
+                model = genai.GenerativeModel(name, generation_config=generation_config)
+                self._models[key] = model
+                self.construction_ms[key] = (time.perf_counter() - started) * 1000
+        return model
+
+    def warm_up(self, timeout=10):
+        """Open the Gemini channel (TLS + auth) with a count_tokens call so the first user doesn't pay for it"""
+        self.warmup = {"status": "running"}
+        try:
+            started = time.perf_counter()
+            # The transport is a process-wide client inside google.generativeai; build it eagerly
+            genai_client.get_default_generative_client()
+            client_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            model = self.get()
+            model_ms = (time.perf_counter() - started) * 1000
+
+            # count_tokens goes over the same channel as generate_content but uses no generation quota
+            started = time.perf_counter()
+            model.count_tokens("warm-up", request_options={"timeout": timeout})
+            first_call_ms = (time.perf_counter() - started) * 1000
+
+            self.warmup = {
+                "status": "ok",
+                "client_ms": client_ms,
+                "model_ms": model_ms,
+                "first_call_ms": first_call_ms,
+            }
+            print(f"🔥 GEMINI WARM-UP: client {client_ms:.0f} ms | model {model_ms:.1f} ms | first call {first_call_ms:.0f} ms")
+        except Exception as e:
+            self.warmup = {"status": "failed", "error": str(e)}
+            print(f"⚠️ GEMINI WARM-UP FAILED: {e}")
+        return self.warmup
+
+    def warm_up_in_background(self, timeout=10):
+        """Run warm_up on a daemon thread so app startup isn't blocked on the network"""
+        thread = threading.Thread(target=self.warm_up, args=(timeout,), name="gemini-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        """Cached configurations and warm-up timings for monitoring"""
+        return {
+            "models": len(self._models),
+            "construction_ms": sum(self.construction_ms.values()),
+            "warmup": dict(self.warmup),
+        }
+
+
+class LLMProvider:
+    """Interface every LLM backend implements; all methods return plain reply text"""
+
+    name = "none"
+    label = "No LLM"
+    available = False
+
+    def generate(self, prompt, response_schema=None, timeout=None):
+        raise NotImplementedError
+
+    async def generate_async(self, prompt, response_schema=None, timeout=None):
+        raise NotImplementedError
+
+    async def stream_async(self, prompt, timeout=None):
+        """Async generator of text chunks"""
+        raise NotImplementedError
+        yield
+
+    def warm_up_in_background(self, timeout=10):
+        return None
+
+    def stats(self):
+        return {"provider": self.name}
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini through the shared ModelRegistry"""
+
+    name = "gemini"
+    label = "Google Gemini AI"
+
+    def __init__(self, api_key, model_name=DEFAULT_MODEL):
+        self.available = bool(api_key)
+        if api_key:
+            genai.configure(api_key=api_key)
+        self.models = ModelRegistry(model_name)
+
+    def generate(self, prompt, response_schema=None, timeout=None):
+        model = self.models.get(response_schema)
+        return model.generate_content(prompt, request_options={"timeout": timeout}).text
+
+    async def generate_async(self, prompt, response_schema=None, timeout=None):
+        model = self.models.get(response_schema)
+        response = await model.generate_content_async(prompt, request_options={"timeout": timeout})
+        return response.text
+
+    async def stream_async(self, prompt, timeout=None):
+        model = self.models.get()
+        response = await model.generate_content_async(prompt, stream=True, request_options={"timeout": timeout})
+        async for chunk in response:
+            yield chunk.text
+
+    def warm_up_in_background(self, timeout=10):
+        return self.models.warm_up_in_background(timeout)
+
+    def stats(self):
+        return {"provider": self.name, **self.models.stats()}
+
+
+class StubProviderError(RuntimeError):
+    """Injected failure from StubProvider"""
+
+
+class StubProvider(LLMProvider):
+    """Offline backend: canned replies in the app's formats, with log-normal latency and an error rate"""
+
+    name = "stub"
+    label = "Stub LLM (offline)"
+    available = True
+
+    REPLIES = [
+        "Thanks for sharing that! Let me take you to the next step of your loan journey. 😊",
+        "Got it! Based on what you've told me, I can move your application forward right away. 🚀",
+        "Great question! Our personal loans start at competitive rates with instant digital approval. 💰",
+        "I understand. Let's look at an option that fits your budget comfortably. 📊",
+    ]
+
+    def __init__(self, median_ms=400, sigma=0.5, error_rate=0.0, first_token_share=0.3, chunk_chars=24, seed=None):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.first_token_share = first_token_share
+        self.chunk_chars = chunk_chars
+        self._random = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+
+    def _sample(self):
+        """Latency (seconds) for one call, or raise an injected error"""
+        self.calls += 1
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.errors += 1
+            raise StubProviderError("injected stub failure")
+        if self.sigma > 0:
+            return self._random.lognormvariate(0, self.sigma) * self.median_ms / 1000
+        return self.median_ms / 1000
+
+    def _reply(self, prompt, response_schema=None):
+        text = self._random.choice(self.REPLIES)
+        stage_match = re.search(r"Conversation Stage: (\w+)", prompt)
+        # Echo the current stage: a valid STAGE_UPDATE that leaves the flow where it is
+        stage = stage_match.group(1) if stage_match else "none"
+        extracted = {}
+        message_match = re.search(r'CUSTOMER\'S MESSAGE: "(.*)"', prompt)
+        if message_match:
+            name_match = re.search(r"(?:[Ii] am|I'm|[Mm]y name is)\s+([A-Z][a-z]+)", message_match.group(1))
+            if name_match:
+                extracted["name"] = name_match.group(1)
+        if response_schema:
+            return json.dumps({"reply": text, "stage_update": stage, "extracted": extracted})
+        if "STAGE_UPDATE:" in prompt:
+            return f"{text}\nSTAGE_UPDATE: {stage}\nEXTRACTED: {json.dumps(extracted)}"
+        return text
+
+    def generate(self, prompt, response_schema=None, timeout=None):
+        delay = self._sample()
+        time.sleep(min(delay, timeout) if timeout else delay)
+        if timeout and delay > timeout:
+            raise TimeoutError(f"stub call exceeded {timeout}s")
+        return self._reply(prompt, response_schema)
+
+    async def generate_async(self, prompt, response_schema=None, timeout=None):
+        delay = self._sample()
+        await asyncio.sleep(delay)
+        return self._reply(prompt, response_schema)
+
+    async def stream_async(self, prompt, timeout=None):
+        delay = self._sample()
+        text = self._reply(prompt)
+        chunks = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+        await asyncio.sleep(delay * self.first_token_share)
+        gap = delay * (1 - self.first_token_share) / max(len(chunks) - 1, 1)
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(gap)
+            yield chunk
+
+    def stats(self):
+        return {"provider": self.name, "calls": self.calls, "errors": self.errors}
+
+
+class LLMUnavailable(RuntimeError):
+    """The guard refused the call (circuit open or too many calls in flight); use the built-in responses"""
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """The call did not finish within the guard's deadline"""
+
+
+class CircuitBreaker:
+    """Opens after N consecutive failures or a p95 latency breach; lets one probe through after reset_timeout"""
+
+    def __init__(self, failure_threshold=5, p95_threshold=8.0, reset_timeout=30.0, window=50, min_samples=20):
+        self.failure_threshold = failure_threshold
+        self.p95_threshold = p95_threshold
+        self.reset_timeout = reset_timeout
+        self.min_samples = min_samples
+        self.latencies = deque(maxlen=window)
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.last_reason = None
+        self._probe_in_flight = False
+
+    def p95(self):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+
+    def allow(self, now):
+        """Admit a call; in half-open only a single probe is let through"""
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+            print("🟡 LLM CIRCUIT HALF-OPEN: Sending a probe request")
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record(self, ok, latency, now):
+        """Feed back the outcome of an admitted call"""
+        if self.state == "half_open":
+            self._probe_in_flight = False
+            if ok and latency <= self.p95_threshold:
+                self.state = "closed"
+                self.failures = 0
+                self.latencies.clear()
+                print("✅ LLM CIRCUIT CLOSED: Probe succeeded, AI calls resumed")
+            else:
+                self._open("probe failed", now)
+            return
+        if self.state == "open":
+            return
+
+        self.latencies.append(latency)
+        self.failures = 0 if ok else self.failures + 1
+        if self.failures >= self.failure_threshold:
+            self._open(f"{self.failures} consecutive failures", now)
+        elif len(self.latencies) >= self.min_samples and self.p95() > self.p95_threshold:
+            self._open(f"p95 {self.p95():.2f}s > {self.p95_threshold:.2f}s", now)
+
+    def cancel(self):
+        """An admitted call was abandoned without an outcome; free the half-open probe slot"""
+        if self.state == "half_open":
+            self._probe_in_flight = False
+
+    def _open(self, reason, now):
+        self.state = "open"
+        self.opened_at = now
+        self.opens += 1
+        self.last_reason = reason
+        self.latencies.clear()
+        print(f"🔌 LLM CIRCUIT OPEN: {reason} - using built-in responses for {self.reset_timeout:.0f}s")
+
+
+class GuardedProvider(LLMProvider):
+    """Wraps a provider with a max-in-flight limit, per-call deadlines and a circuit breaker"""
+
+    def __init__(self, inner, max_in_flight=32, deadline=20.0, breaker=None):
+        self.inner = inner
+        self.name = inner.name
+        self.label = inner.label
+        self.max_in_flight = max_in_flight
+        self.deadline = deadline
+        self.breaker = breaker or CircuitBreaker()
+        self._lock = threading.Lock()
+        # Sync calls run here so the caller can give up at the deadline while the slot stays taken
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="llm-call")
+        self.in_flight = 0
+        self.calls = 0
+        self.rejected_open = 0
+        self.rejected_saturated = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    @property
+    def available(self):
+        return self.inner.available
+
+    def _admit(self):
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                self.rejected_saturated += 1
+                raise LLMUnavailable(f"{self.in_flight} LLM calls already in flight")
+            if not self.breaker.allow(time.monotonic()):
+                self.rejected_open += 1
+                raise LLMUnavailable("LLM circuit is open")
+            self.in_flight += 1
+            self.calls += 1
+        return time.monotonic()
+
+    def _finish(self, started, ok, timed_out=False):
+        now = time.monotonic()
+        with self._lock:
+            self.in_flight -= 1
+            if timed_out:
+                self.timeouts += 1
+            if not ok:
+                self.failures += 1
+            self.breaker.record(ok, now - started, now)
+
+    def _release(self):
+        """Give the slot back without judging the provider (e.g. the client went away)"""
+        with self._lock:
+            self.in_flight -= 1
+            self.breaker.cancel()
+
+    def generate(self, prompt, response_schema=None, timeout=None):
+        deadline = timeout or self.deadline
+        started = self._admit()
+        future = self._executor.submit(self.inner.generate, prompt, response_schema, deadline)
+
+        def done(f):
+            late = time.monotonic() - started > deadline
+            self._finish(started, f.exception() is None and not late, timed_out=late)
+        future.add_done_callback(done)
+
+        try:
+            return future.result(timeout=deadline)
+        except FutureTimeoutError:
+            raise LLMDeadlineExceeded(f"no LLM reply within {deadline:.1f}s")
+
+    async def generate_async(self, prompt, response_schema=None, timeout=None):
+        deadline = timeout or self.deadline
+        started = self._admit()
+        try:
+            result = await asyncio.wait_for(self.inner.generate_async(prompt, response_schema, deadline), deadline)
+        except asyncio.TimeoutError:
+            self._finish(started, False, timed_out=True)
+            raise LLMDeadlineExceeded(f"no LLM reply within {deadline:.1f}s")
+        except asyncio.CancelledError:
+            self._release()
+            raise
+        except Exception:
+            self._finish(started, False)
+            raise
+        self._finish(started, True)
+        return result
+
+    async def stream_async(self, prompt, timeout=None):
+        deadline = timeout or self.deadline
+        started = self._admit()
+        # The deadline bounds the whole stream, so a trickle of chunks can't outlast it either
+        ends_at = started + deadline
+        chunks = self.inner.stream_async(prompt, deadline).__aiter__()
+        finished = False
+        try:
+            while True:
+                remaining = ends_at - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), remaining)
+                except StopAsyncIteration:
+                    break
+                yield chunk
+        except asyncio.TimeoutError:
+            finished = True
+            self._finish(started, False, timed_out=True)
+            raise LLMDeadlineExceeded(f"LLM stream not finished within {deadline:.1f}s")
+        except (asyncio.CancelledError, GeneratorExit):
+            finished = True
+            self._release()
+            raise
+        except Exception:
+            finished = True
+            self._finish(started, False)
+            raise
+        finally:
+            if not finished:
+                self._finish(started, True)
+            # Stop the provider's stream too (it may still be producing after a deadline or a disconnect)
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def warm_up_in_background(self, timeout=10):
+        return self.inner.warm_up_in_background(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self.inner.stats(),
+                "circuit": self.breaker.state,
+                "circuit_opens": self.breaker.opens,
+                "circuit_reason": self.breaker.last_reason,
+                "p95_seconds": self.breaker.p95(),
+                "in_flight": self.in_flight,
+                "guarded_calls": self.calls,
+                "rejected_open": self.rejected_open,
+                "rejected_saturated": self.rejected_saturated,
+                "timeouts": self.timeouts,
+                "failures": self.failures,
+            }
+
+
+def make_provider(name, api_key=None, model_name=DEFAULT_MODEL):
+    """Build the provider selected by LLM_PROVIDER ("gemini" or "stub")"""
+    name = (name or "gemini").lower()
+    if name == "stub":
+        return StubProvider(
+            median_ms=float(os.getenv("LLM_STUB_LATENCY_MS", "400")),
+            sigma=float(os.getenv("LLM_STUB_LATENCY_SIGMA", "0.5")),
+            error_rate=float(os.getenv("LLM_STUB_ERROR_RATE", "0")),
+        )
+    if name == "gemini":
+        return GeminiProvider(api_key, model_name)
+    raise ValueError(f"Unknown LLM provider: {name}")
@@ -0,0 +1,249 @@
+# offer_book.py
+# Precomputed offer sheets for CRM customers
+# A nightly job builds every customer's tiers, rate, EMIs at every tenure and max eligible
+# amount into a compact SQLite table; chat handlers read it by name through an LRU and
+# rebuild an entry only when the customer's record (or the policy or pricing grid) has changed
+#
+# Usage: python offer_book.py crm_customers.csv [--db offer_book.db] [--batch-size 50000]
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import finance
+from batch_underwriting import normalize_columns, read_chunks
+from offer_engine import TENURES, TIER_EMI_SHARES, offer_frontier, tier_amounts
+from underwriting_policy import default_policy
+
+TENURE_INDEX = {int(tenure): i for i, tenure in enumerate(TENURES)}
+
+# Customer fields an offer depends on; a change to any of them invalidates the sheet
+OFFER_FIELDS = ("credit_score", "salary", "pre_approved_limit")
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS offer_book (
+    name TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    built_at REAL NOT NULL,
+    rate REAL NOT NULL,
+    max_eligible INTEGER NOT NULL,
+    tiers BLOB NOT NULL,
+    max_amounts BLOB NOT NULL,
+    tier_emis BLOB NOT NULL,
+    tier_rates BLOB NOT NULL
+)"""
+UPSERT_SQL = "INSERT OR REPLACE INTO offer_book VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+SELECT_SQL = ("SELECT fingerprint, rate, max_eligible, tiers, max_amounts, tier_emis, tier_rates "
+              "FROM offer_book WHERE name = ?")
+
+
+def policy_version(policy=default_policy):
+    """Short hash of everything in the policy and the pricing grid that shapes an offer"""
+    grid = policy.pricing.grid
+    settings = [policy.min_credit_score, policy.instant_limit_multiple, policy.max_limit_multiple,
+                policy.max_emi_ratio, policy.tenure, grid.default_loan_type, grid.loan_types,
+                grid.credit_floors.tolist(), grid.amount_ceilings.tolist(), grid.rates.tolist(),
+                TENURES.tolist(), list(TIER_EMI_SHARES)]
+    return hashlib.sha1(json.dumps(settings).encode()).hexdigest()[:12]
+
+
+def record_fingerprint(record, version):
+    """Fingerprint of a CRM record's offer fields under a policy version"""
+    values = "|".join(str(record.get(field)) for field in OFFER_FIELDS)
+    return hashlib.sha1(f"{version}|{values}".encode()).hexdigest()[:16]
+
+
+def build_sheets(names, salary, credit_score, limit, version, policy=default_policy):
+    """Offer-book rows for a batch of customers, computed in one vectorized pass"""
+    salary = np.asarray(salary, dtype=float)
+    credit_score = np.asarray(credit_score, dtype=float)
+    limit = np.asarray(limit, dtype=float)
+    frontier = offer_frontier(salary, credit_score, limit, policy=policy)
+    tiers = tier_amounts(salary, credit_score, limit, policy=policy)
+    # Each tier at the grid rate for its own amount; the sheet's headline rate is the limit's
+    tier_rates = policy.rates(credit_score[:, None], tiers)
+    rate = policy.rates(credit_score, limit)
+    tier_emis = finance.emi(tiers[:, :, None], tier_rates[:, :, None], TENURES[None, None, :])
+    built_at = time.time()
+    rows = []
+    for i, name in enumerate(names):
+        record = {"credit_score": credit_score[i], "salary": salary[i], "pre_approved_limit": limit[i]}
+        rows.append((
+            str(name),
+            record_fingerprint(_plain(record), version),
+            built_at,
+            float(rate[i]),
+            int(frontier["max_amount"][i].max()),
+            tiers[i].astype(np.int32).tobytes(),
+            frontier["max_amount"][i].astype(np.int32).tobytes(),
+            tier_emis[i].astype(np.float32).tobytes(),
+            tier_rates[i].astype(np.float32).tobytes(),
+        ))
+    return rows
+
+
+def _plain(record):
+    """Offer fields as plain ints where whole, so CSV floats and CRM ints fingerprint alike"""
+    plain = {}
+    for field in OFFER_FIELDS:
+        value = record.get(field)
+        if isinstance(value, (int, float, np.number)) and float(value).is_integer():
+            value = int(value)
+        plain[field] = value
+    return plain
+
+
+class OfferBook:
+    """On-disk offer sheets with an in-memory LRU in front; stale sheets are rebuilt on read"""
+
+    def __init__(self, path, capacity=10_000, policy=default_policy):
+        self.path = path
+        self.capacity = capacity
+        self.policy = policy
+        self._grid = policy.pricing.grid
+        self.version = policy_version(policy)
+        self._cache = OrderedDict()  # name -> (fingerprint, sheet)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute(CREATE_TABLE_SQL)
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(offer_book)")]
+            if "tier_rates" not in columns:
+                # A book from before per-tier rates; every sheet in it is stale anyway, so start over
+                self._conn.execute("DROP TABLE offer_book")
+                self._conn.execute(CREATE_TABLE_SQL)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.rebuilt = 0
+        self.stale = 0
+
+    def _current_version(self):
+        """Policy version, recomputed once the pricing grid has been reloaded"""
+        grid = self.policy.pricing.grid
+        if grid is not self._grid:
+            self._grid, self.version = grid, policy_version(self.policy)
+        return self.version
+
+    def get(self, name, record):
+        """Offer sheet for a CRM customer, rebuilt if the record changed since it was built"""
+        version = self._current_version()
+        fingerprint = record_fingerprint(_plain(record), version)
+        with self._lock:
+            cached = self._cache.get(name)
+            if cached is not None and cached[0] == fingerprint:
+                self._cache.move_to_end(name)
+                self.memory_hits += 1
+                return cached[1]
+            row = self._conn.execute(SELECT_SQL, (name,)).fetchone()
+        if row is not None and row[0] == fingerprint:
+            self.disk_hits += 1
+            sheet = self._sheet(row)
+        else:
+            if row is not None:
+                self.stale += 1
+            self.rebuilt += 1
+            built = build_sheets([name], [record["salary"]], [record["credit_score"]],
+                                 [record["pre_approved_limit"]], version, self.policy)[0]
+            with self._lock, self._conn:
+                self._conn.execute(UPSERT_SQL, built)
+            sheet = self._sheet((built[1],) + built[3:])
+        with self._lock:
+            self._cache[name] = (fingerprint, sheet)
+            self._cache.move_to_end(name)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+        return sheet
+
+    def invalidate(self, name):
+        """Drop a customer's sheet (e.g. after their CRM record is edited)"""
+        with self._lock:
+            self._cache.pop(name, None)
+            with self._conn:
+                self._conn.execute("DELETE FROM offer_book WHERE name = ?", (name,))
+
+    def build(self, names, salary, credit_score, limit):
+        """Precompute sheets for a batch of customers (the nightly job)"""
+        rows = build_sheets(names, salary, credit_score, limit, self._current_version(), self.policy)
+        with self._lock, self._conn:
+            self._conn.executemany(UPSERT_SQL, rows)
+            for name in names:
+                self._cache.pop(str(name), None)
+        return len(rows)
+
+    @staticmethod
+    def _sheet(row):
+        """Decode a stored row (no finance math: EMIs are read from the precomputed table)"""
+        _, rate, max_eligible, tiers, max_amounts, tier_emis, tier_rates = row
+        tiers = np.frombuffer(tiers, dtype=np.int32)
+        tier_emis = np.frombuffer(tier_emis, dtype=np.float32).reshape(len(tiers), len(TENURES))
+        tier_rates = np.frombuffer(tier_rates, dtype=np.float32)
+        amounts, first = np.unique(tiers, return_index=True)
+        offers = [
+            {"amount": int(amount), "rate": round(float(tier_rates[i]), 4),
+             "emi_24": float(tier_emis[i, TENURE_INDEX[24]]), "emi_36": float(tier_emis[i, TENURE_INDEX[36]])}
+            for amount, i in zip(amounts, first) if amount > 0
+        ]
+        return {
+            "rate": rate,
+            "max_eligible": max_eligible,
+            "tiers": offers,
+            "max_amount": dict(zip(TENURES.tolist(), np.frombuffer(max_amounts, dtype=np.int32).tolist())),
+            "tier_emis": tier_emis,
+        }
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.rebuilt
+            return {
+                "cached": len(self._cache),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "rebuilt": self.rebuilt,
+                "stale": self.stale,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def checkpoint(self):
+        """Fold the WAL into the main file (after a bulk build, so the .db holds every sheet)"""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def build_offer_book(crm_path, db_path, batch_size=50_000):
+    """Nightly job: (re)build the offer book from a CRM export (CSV, JSONL or Parquet with a name column)"""
+    book = OfferBook(db_path)
+    built = 0
+    try:
+        for chunk in read_chunks(crm_path, batch_size):
+            chunk = normalize_columns(chunk, required=["name"] + list(OFFER_FIELDS))
+            built += book.build(chunk["name"].astype(str).tolist(), chunk["salary"].to_numpy(),
+                                chunk["credit_score"].to_numpy(), chunk["pre_approved_limit"].to_numpy())
+        book.checkpoint()
+    finally:
+        book.close()
+    return built
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the offer book from a CRM export")
+    parser.add_argument("crm", help="customers (.csv, .jsonl or .parquet) with name, salary, credit score and limit")
+    parser.add_argument("--db", default=os.getenv("OFFER_BOOK_DB", "offer_book.db"))
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    built = build_offer_book(args.crm, args.db, args.batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"📒 Built {built:,} offer sheets in {elapsed:.2f}s ({built / elapsed if elapsed else 0:,.0f}/s) -> {args.db}")
@@ -0,0 +1,135 @@
+# offer_engine.py
+# Offers solved in closed form instead of by trial and error
+# Inverts the annuity formula for the largest amount within the EMI/salary cap and
+# the limit caps, at every tenure from 12 to 60 months, in one vectorized call.
+# The rate depends on the amount (pricing grid amount bands), so each band is solved
+# at its own rate and the largest amount that fits its band wins
+
+import numpy as np
+
+import finance
+from underwriting_policy import default_policy
+
+TENURES = np.arange(12, 61)
+MIN_LOAN_AMOUNT = 50_000
+# Offer tiers as the share of salary going to EMI (conservative, standard, maximum)
+TIER_EMI_SHARES = (0.30, 0.40, 0.50)
+
+
+def _floor_to(amount, step):
+    return np.floor(np.asarray(amount, dtype=float) / step) * step
+
+
+def _per_customer(loan_type):
+    """loan_type as given (one type for all) or as an (N, 1) column (one per customer)"""
+    return np.asarray(loan_type, dtype=object)[:, None] if np.ndim(loan_type) else loan_type
+
+
+def _band_rates(credit_score, policy, loan_type):
+    """The pricing grid's amount bands and each customer's rate in every one of them:
+    lower bounds (B,) (exclusive), upper bounds (B,) (inclusive) and rates (N, B)"""
+    ceilings = policy.pricing.grid.amount_ceilings
+    lower = np.concatenate([[0.0], ceilings])
+    upper = np.append(ceilings, np.inf)
+    probe = np.append(ceilings, lower[-1] + 1)  # one amount inside each band
+    return lower, upper, policy.rates(credit_score[:, None], probe[None, :], _per_customer(loan_type))
+
+
+def _largest_within(emi_cap, tenure, bands, cap, step):
+    """Largest amount (a multiple of step, up to cap) whose EMI at its own band's rate is within
+    emi_cap, or 0 if none is. emi_cap, tenure and cap broadcast against (N, 1)"""
+    lower, upper, rates = bands
+    best = 0.0
+    for band in range(len(lower)):
+        amount = finance.principal_for_emi(emi_cap, rates[:, band:band + 1], tenure)
+        amount = _floor_to(np.minimum(np.minimum(amount, upper[band]), cap), step)
+        best = np.where(amount > lower[band], np.maximum(best, amount), best)
+    return best
+
+
+def offer_frontier(salary, credit_score, limit, tenures=TENURES, policy=default_policy, step=1000, loan_type=None):
+    """Largest approvable amount at every tenure for one or many customers.
+
+    salary, credit_score and limit are scalars or 1-D arrays (one entry per customer); loan_type
+    is one type for all or one per customer. Returns a dict: tenure (T,), and max_amount (N, T)
+    with the rate and emi (N, T) at that amount. Amounts up to the pre-approved limit are approved
+    outright; above it (up to the 2x cap) only while the EMI, at the grid's rate for that amount,
+    stays within the EMI/salary cap. Customers below the credit score cutoff get 0.
+    """
+    salary = np.atleast_1d(np.asarray(salary, dtype=float))[:, None]
+    credit_score = np.atleast_1d(np.asarray(credit_score, dtype=float))
+    limit = np.atleast_1d(np.asarray(limit, dtype=float))[:, None]
+    tenures = np.asarray(tenures)
+
+    emi_cap = np.maximum(salary, 0) * policy.max_emi_ratio / 100
+    affordable = _largest_within(emi_cap, tenures[None, :], _band_rates(credit_score, policy, loan_type),
+                                 limit * policy.max_limit_multiple, step)
+    instant = _floor_to(limit * policy.instant_limit_multiple, step)
+    max_amount = np.maximum(instant, affordable)
+    max_amount = np.where((credit_score >= policy.min_credit_score)[:, None], max_amount, 0.0)
+    rate = policy.rates(credit_score[:, None], max_amount, _per_customer(loan_type))
+    return {
+        "tenure": tenures,
+        "rate": rate,
+        "max_amount": max_amount,
+        "emi": finance.emi(max_amount, rate, tenures[None, :]),
+    }
+
+
+def counter_offer(amount, salary, credit_score, limit, tenure=None, policy=default_policy, step=1000, loan_type=None):
+    """Exact counter-offer for a declined amount: the most we can lend at the requested tenure,
+    and the shortest tenure (if any, up to 60 months) at which the full amount qualifies"""
+    tenure = policy.tenure if tenure is None else tenure
+    # One call covers the requested tenure (last column) and the 12-60 month frontier
+    frontier = offer_frontier(salary, credit_score, limit, tenures=np.append(TENURES, tenure), policy=policy, step=step,
+                              loan_type=loan_type)
+    max_amounts = frontier["max_amount"][0, :-1]
+    qualifying = np.flatnonzero(max_amounts >= amount)
+    full_tenure = int(TENURES[qualifying[0]]) if qualifying.size else None
+    full_rate = policy.rate_for(credit_score, amount, loan_type)
+    return {
+        "amount": int(frontier["max_amount"][0, -1]),
+        "tenure": tenure,
+        "rate": float(frontier["rate"][0, -1]),
+        "emi": float(frontier["emi"][0, -1]),
+        "full_amount_tenure": full_tenure,
+        "full_amount_emi": finance.emi(amount, full_rate, full_tenure) if full_tenure else None,
+    }
+
+
+def tier_amounts(salary, credit_score, limit, tenure=None, shares=TIER_EMI_SHARES, policy=default_policy, step=1000,
+                 loan_type=None):
+    """Tier amounts for one or many customers, shaped (N, len(shares)): sized so the EMI at the
+    policy tenure (and the amount's own rate) is a given share of salary, clamped to what the
+    policy approves (0 = no offer)"""
+    tenure = policy.tenure if tenure is None else tenure
+    frontier = offer_frontier(salary, credit_score, limit, tenures=[tenure], policy=policy, step=step, loan_type=loan_type)
+    ceiling = frontier["max_amount"][:, :1]
+    salary = np.maximum(np.atleast_1d(np.asarray(salary, dtype=float)), 0)[:, None]
+    credit_score = np.atleast_1d(np.asarray(credit_score, dtype=float))
+    amounts = _largest_within(np.asarray(shares)[None, :] * salary, tenure,
+                              _band_rates(credit_score, policy, loan_type), np.inf, step)
+    amounts = np.minimum(np.maximum(amounts, MIN_LOAN_AMOUNT), ceiling)
+    return np.where(ceiling >= MIN_LOAN_AMOUNT, amounts, 0.0)
+
+
+def tier_offers(amounts, rates):
+    """Offer dicts (amount, rate, 24/36-month EMIs) for one customer's tier amounts, each at its own rate"""
+    amounts = np.asarray(amounts, dtype=float)
+    rates = np.broadcast_to(np.asarray(rates, dtype=float), amounts.shape)
+    amounts, first = np.unique(amounts, return_index=True)
+    rates = rates[first]
+    keep = amounts > 0
+    amounts, rates = amounts[keep], rates[keep]
+    emis = finance.emi(amounts[:, None], rates[:, None], np.array([24, 36]))
+    return [
+        {"amount": int(amount), "rate": float(rate), "emi_24": float(emi_24), "emi_36": float(emi_36)}
+        for amount, rate, (emi_24, emi_36) in zip(amounts, rates, emis)
+    ]
+
+
+def offer_tiers(salary, credit_score, limit, tenure=None, shares=TIER_EMI_SHARES, policy=default_policy, step=1000,
+                loan_type=None):
+    """Offer tiers (conservative to maximum) for one customer, each with its rate and 24/36-month EMIs"""
+    amounts = tier_amounts(salary, credit_score, limit, tenure, shares, policy, step, loan_type)[0]
+    return tier_offers(amounts, policy.rates(credit_score, amounts, loan_type))
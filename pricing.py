@@ -0,0 +1,157 @@
+# pricing.py
+# One rate table for the chat, the stored application and the sanction letter
+# data/pricing.json (loan type x credit band x amount band) is compiled into a NumPy grid;
+# price() looks up a whole array of profiles with two searchsorted calls and one gather,
+# and the file is re-read when it changes on disk (no restart)
+#
+# Usage: python pricing.py "Medical Loan" 760 250000
+
+import argparse
+import bisect
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+PRICING_CONFIG = os.getenv("PRICING_CONFIG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "pricing.json"))
+# How often (seconds) price() checks the config file for changes
+RELOAD_CHECK_SECONDS = float(os.getenv("PRICING_RELOAD_SECONDS", "5"))
+
+
+class PricingGrid:
+    """A compiled pricing config: rates[loan type, credit band, amount band]"""
+
+    def __init__(self, config):
+        credit_bands = sorted(config["credit_bands"], key=lambda band: band["min_score"])
+        amount_bands = config["amount_bands"]
+        self.loan_types = list(config["rates"])
+        self.default_loan_type = config.get("default_loan_type", self.loan_types[0])
+        self.type_index = {loan_type: i for i, loan_type in enumerate(self.loan_types)}
+        self.credit_labels = [band["label"] for band in credit_bands]
+        self.credit_floors = np.array([band["min_score"] for band in credit_bands], dtype=float)
+        self.amount_labels = [band["label"] for band in amount_bands]
+        # Upper bound of every amount band but the last (open-ended) one
+        self.amount_ceilings = np.array([band["max_amount"] for band in amount_bands[:-1]], dtype=float)
+
+        # Config lists credit bands best first; the grid is stored in ascending score order
+        config_order = [band["label"] for band in config["credit_bands"]]
+        order = [config_order.index(label) for label in self.credit_labels]
+        self.rates = np.array([np.asarray(config["rates"][loan_type], dtype=float)[order]
+                               for loan_type in self.loan_types])
+        expected = (len(self.loan_types), len(self.credit_labels), len(self.amount_labels))
+        if self.rates.shape != expected:
+            raise ValueError(f"Pricing grid is {self.rates.shape}, expected {expected} (types x credit x amount bands)")
+        if self.default_loan_type not in self.type_index:
+            raise ValueError(f"Default loan type {self.default_loan_type!r} has no rates")
+        # Plain-Python copies for single quotes (bisect beats NumPy call overhead for one row)
+        self._floors = self.credit_floors.tolist()
+        self._ceilings = self.amount_ceilings.tolist()
+        self._table = self.rates.tolist()
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _type_codes(self, loan_types):
+        """Grid row per loan type (unknown or missing types price as the default type)"""
+        loan_types = np.asarray(loan_types, dtype=object)
+        default = self.type_index[self.default_loan_type]
+        if loan_types.ndim == 0:
+            return self.type_index.get(loan_types.item(), default)  # one type for every profile
+        inverse, distinct = pd.factorize(loan_types.ravel())
+        codes = np.array([self.type_index.get(loan_type, default) for loan_type in distinct] + [default], dtype=int)
+        return codes[inverse].reshape(loan_types.shape)  # -1 (missing type) picks the trailing default
+
+    def lookup(self, loan_types, credit_scores, amounts):
+        """Rates (% p.a.) for arrays of loan types, credit scores and amounts"""
+        credit_scores = np.asarray(credit_scores, dtype=float)
+        amounts = np.asarray(amounts, dtype=float)
+        # A missing score prices in the best band ("starting from" quotes)
+        credit_scores = np.where(np.isnan(credit_scores), np.inf, credit_scores)
+        credit = np.clip(np.searchsorted(self.credit_floors, credit_scores, side="right") - 1, 0, None)
+        amount = np.searchsorted(self.amount_ceilings, amounts, side="left")
+        return self.rates[self._type_codes(loan_types), credit, amount]
+
+    def lookup_one(self, loan_type, credit_score, amount):
+        """Rate (% p.a.) for one application"""
+        row = self.type_index.get(loan_type, self.type_index[self.default_loan_type])
+        if credit_score is None:
+            credit = len(self._floors) - 1
+        else:
+            credit = max(bisect.bisect_right(self._floors, credit_score) - 1, 0)
+        return self._table[row][credit][bisect.bisect_left(self._ceilings, amount)]
+
+    def starting_rate(self, loan_type=None):
+        """Lowest rate on offer, for one loan type or across all of them"""
+        if loan_type is None:
+            return float(self.rates.min())
+        return float(self.rates[self.type_index.get(loan_type, self.type_index[self.default_loan_type])].min())
+
+
+class PricingEngine:
+    """The live pricing grid, recompiled when its config file changes"""
+
+    def __init__(self, path=PRICING_CONFIG, check_seconds=RELOAD_CHECK_SECONDS):
+        self.path = path
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._mtime = os.path.getmtime(path)
+        self._checked = time.monotonic()
+        self.grid = PricingGrid.load(path)
+        self.reloads = 0
+        self.reload_errors = 0
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked < self.check_seconds:
+            return
+        with self._lock:
+            self._checked = now
+            try:
+                mtime = os.path.getmtime(self.path)
+                if mtime == self._mtime:
+                    return
+                grid = PricingGrid.load(self.path)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                # Keep pricing on the last good grid until the file is fixed
+                self.reload_errors += 1
+                print(f"⚠️ PRICING: Reload of {self.path} failed ({e}); keeping the previous grid")
+                return
+            self.grid, self._mtime = grid, mtime
+            self.reloads += 1
+            print(f"💱 PRICING: Reloaded {self.path} ({len(grid.loan_types)} loan types)")
+
+    def price(self, profiles):
+        """Rates for an array of profiles: anything indexable by "loan_type", "credit_score"
+        and "amount" (a DataFrame, a dict of arrays or a NumPy structured array)"""
+        self._maybe_reload()
+        return self.grid.lookup(profiles["loan_type"], profiles["credit_score"], profiles["amount"])
+
+    def price_one(self, loan_type, credit_score, amount):
+        """Rate for one application"""
+        self._maybe_reload()
+        return self.grid.lookup_one(loan_type, credit_score, amount)
+
+    def starting_rate(self, loan_type=None):
+        self._maybe_reload()
+        return self.grid.starting_rate(loan_type)
+
+    def stats(self):
+        return {"loan_types": len(self.grid.loan_types), "reloads": self.reloads, "reload_errors": self.reload_errors}
+
+
+default_pricing = PricingEngine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quote a rate from the pricing grid")
+    parser.add_argument("loan_type")
+    parser.add_argument("credit_score", type=float)
+    parser.add_argument("amount", type=float)
+    args = parser.parse_args()
+    rate = default_pricing.price_one(args.loan_type, args.credit_score, args.amount)
+    print(f"💱 {args.loan_type} | score {args.credit_score:.0f} | Rs.{args.amount:,.0f} -> {rate:g}% p.a.")
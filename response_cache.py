@@ -0,0 +1,108 @@
+# response_cache.py
+# Cache for the decorative AI prompts (greeting, objection, salary preview)
+# Keyed by a normalized fingerprint of the few fields those prompts vary by,
+# keeps several variants per key for variety, with LRU + TTL eviction
+
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import OrderedDict
+
+# Placeholder the model is asked to write where the customer's name goes,
+# so one cached reply can be reused for every customer in the same bucket
+CUSTOMER_PLACEHOLDER = "{customer}"
+
+
+def credit_band(score):
+    """Bucket a credit score into the bands pricing and underwriting use"""
+    if not isinstance(score, (int, float)):
+        return "unknown"
+    if score >= 800:
+        return "800+"
+    if score >= 750:
+        return "750-799"
+    if score >= 700:
+        return "700-749"
+    return "<700"
+
+
+def amount_bucket(amount, edges=(25_000, 50_000, 75_000, 100_000, 200_000, 500_000, 1_000_000)):
+    """Bucket a rupee amount (salary, limit) into a coarse range label"""
+    if not isinstance(amount, (int, float)):
+        return "unknown"
+    lower = 0
+    for edge in edges:
+        if amount < edge:
+            return f"Rs.{lower:,}-{edge:,}"
+        lower = edge
+    return f"Rs.{lower:,}+"
+
+
+def fingerprint(kind, **fields):
+    """Stable key for a prompt kind and its (already bucketed) fields"""
+    normalized = {key: " ".join(str(value).lower().split()) for key, value in fields.items()}
+    payload = json.dumps([kind, normalized], sort_keys=True)
+    return f"{kind}:{hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]}"
+
+
+class ResponseCache:
+    """LRU + TTL cache holding up to `variants` replies per fingerprint"""
+
+    def __init__(self, max_keys=2048, ttl=6 * 3600, variants=3):
+        self.max_keys = max_keys
+        self.ttl = ttl
+        self.variants = variants
+        self._entries = OrderedDict()  # key -> (created_at, [replies])
+        self._lock = threading.Lock()
+        self._random = random.Random()
+        self.hits = 0
+        self.misses = 0
+        self.evicted_lru = 0
+        self.expired = 0
+
+    def get(self, key):
+        """Return a cached reply, or None until the key has collected all its variants"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] > self.ttl:
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None or len(entry[1]) < self.variants:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._random.choice(entry[1])
+
+    def put(self, key, reply):
+        """Add a fresh reply as another variant for the key"""
+        if not reply:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = (time.monotonic(), [])
+                self._entries[key] = entry
+            if len(entry[1]) < self.variants and reply not in entry[1]:
+                entry[1].append(reply)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+                self.evicted_lru += 1
+
+    def stats(self):
+        """Hit/miss counts and size for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "keys": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evicted_lru": self.evicted_lru,
+                "expired": self.expired,
+            }
@@ -0,0 +1,297 @@
+# sanction_letter.py
+# Sanction letter PDFs, rendered off the chat handlers
+# Chat turns submit a letter to a process pool and get a job ID back straight away; the
+# reportlab drawing and the write to disk happen in a worker process, and the UI polls the
+# job until the file is there. A burst of approvals queues up in the pool instead of
+# holding chat threads (and the GIL) while each canvas is built
+#
+# Usage: python sanction_letter.py Rahul 200000 [--tenure 24] [--rate 11.5] [--workers 2]
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import partial
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+
+import finance
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+
+
+class SanctionLetterGenerator:
+    """Generates PDF sanction letter"""
+
+    @staticmethod
+    def filename_for(name, job_id=None):
+        # The timestamp is to the second; the job ID keeps two letters for one name in that second apart
+        suffix = f"_{job_id}" if job_id else ""
+        return f"sanction_letter_{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{suffix}.pdf"
+
+    @staticmethod
+    def generate_pdf(name, amount, tenure, rate, customer_data, filename=None):
+        filename = filename or SanctionLetterGenerator.filename_for(name)
+
+        c = canvas.Canvas(filename, pagesize=letter)
+        width, height = letter
+
+        # Header
+        c.setFillColor(colors.HexColor('#1E3A8A'))
+        c.rect(0, height - 1.5*inch, width, 1.5*inch, fill=True, stroke=False)
+
+        c.setFillColor(colors.white)
+        c.setFont("Helvetica-Bold", 24)
+        c.drawString(1*inch, height - 1*inch, "TATA CAPITAL")
+        c.setFont("Helvetica", 12)
+        c.drawString(1*inch, height - 1.2*inch, "Financial Services Limited")
+
+        # Date and Reference
+        c.setFillColor(colors.black)
+        c.setFont("Helvetica", 10)
+        c.drawString(1*inch, height - 2*inch, f"Date: {datetime.now().strftime('%d %B %Y')}")
+        c.drawString(1*inch, height - 2.2*inch, f"Reference No: TC/PL/{random.randint(100000, 999999)}")
+
+        # Title
+        c.setFont("Helvetica-Bold", 16)
+        c.drawString(1*inch, height - 2.8*inch, "PERSONAL LOAN SANCTION LETTER")
+
+        # Customer Details
+        c.setFont("Helvetica-Bold", 11)
+        c.drawString(1*inch, height - 3.3*inch, "Customer Details:")
+        c.setFont("Helvetica", 10)
+        y_pos = height - 3.5*inch
+        details = [
+            f"Name: {name}",
+            f"Address: {customer_data['address']}",
+            f"Phone: {customer_data['phone']}",
+        ]
+        for detail in details:
+            c.drawString(1.2*inch, y_pos, detail)
+            y_pos -= 0.2*inch
+
+        # Loan Details
+        c.setFont("Helvetica-Bold", 11)
+        c.drawString(1*inch, y_pos - 0.3*inch, "Loan Details:")
+        y_pos -= 0.5*inch
+
+        emi = finance.emi(amount, rate, tenure)
+
+        c.setFont("Helvetica", 10)
+        loan_details = [
+            f"Sanctioned Amount: Rs.{amount:,}",
+            f"Interest Rate: {rate}% per annum",
+            f"Loan Tenure: {tenure} months",
+            f"Monthly EMI: Rs.{emi:,.2f}",
+            f"Processing Fee: Rs.{int(amount * 0.02):,} (2% of loan amount)",
+        ]
+        for detail in loan_details:
+            c.drawString(1.2*inch, y_pos, detail)
+            y_pos -= 0.2*inch
+
+        # Terms
+        c.setFont("Helvetica-Bold", 11)
+        c.drawString(1*inch, y_pos - 0.3*inch, "Terms & Conditions:")
+        y_pos -= 0.5*inch
+        c.setFont("Helvetica", 9)
+        terms = [
+            "- This sanction is valid for 30 days from the date of issue",
+            "- Final disbursement subject to verification of documents",
+            "- Pre-payment charges: 2% on outstanding principal",
+            "- Please visit the nearest branch to complete formalities",
+        ]
+        for term in terms:
+            c.drawString(1*inch, y_pos, term)
+            y_pos -= 0.18*inch
+
+        # Footer
+        c.setFont("Helvetica-Bold", 10)
+        c.drawString(1*inch, 1.5*inch, "For Tata Capital Financial Services Ltd.")
+        c.drawString(1*inch, 1*inch, "Authorized Signatory")
+
+        c.setFont("Helvetica-Oblique", 8)
+        c.drawString(1*inch, 0.5*inch, "This is a computer-generated document and does not require a physical signature.")
+
+        c.save()
+        return os.path.abspath(filename)
+
+
+def render_letter(name, amount, tenure, rate, customer_data, filename=None):
+    """Worker entry point: (path, seconds spent rendering)"""
+    start = time.perf_counter()
+    path = SanctionLetterGenerator.generate_pdf(name, amount, tenure, rate, customer_data, filename)
+    return path, time.perf_counter() - start
+
+
+def fork_context():
+    """The fork start method where it is safe to use (Linux and other POSIX systems), else None.
+    Windows has no fork and macOS system libraries are not fork-safe; spawn or forkserver workers
+    would re-import the caller's __main__, so callers that are not import-safe render in a thread"""
+    if sys.platform == "darwin" or "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    return multiprocessing.get_context("fork")
+
+
+def new_job_id():
+    return uuid.uuid4().hex[:12]
+
+
+def _percentile(values, share):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+
+class PdfJobQueue:
+    """Letters rendered by a pool of worker processes (workers=0: one background thread),
+    tracked by job ID. Workers are started by start() or on the first submit, with
+    mp_context (a multiprocessing context; None = the platform default)"""
+
+    def __init__(self, workers=PDF_WORKERS, max_jobs=1000, window=200, mp_context=None):
+        self.workers = workers
+        self.mp_context = mp_context
+        self.max_jobs = max_jobs  # finished jobs kept for lookup; the oldest are forgotten first
+        self._lock = threading.Lock()
+        self._executor = None
+        self._jobs = OrderedDict()  # job ID -> Future
+        self._render_seconds = deque(maxlen=window)
+        self._wait_seconds = deque(maxlen=window)  # submit -> file on disk
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+        self.peak_depth = 0
+
+    def _pool(self):
+        if self._executor is None:
+            if self.workers > 0:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=self.mp_context)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf")
+        return self._executor
+
+    def start(self):
+        """Start the workers now rather than on the first letter (a forked worker inherits only the
+        calling thread, so it must not need a lock another thread held at the time; render_letter does not)"""
+        with self._lock:
+            pool = self._pool()
+        if self.workers > 0:
+            list(pool.map(abs, range(self.workers)))
+        return self
+
+    def submit(self, name, amount, tenure, rate, customer_data, filename=None, job_id=None):
+        """Queue a letter; returns its job ID (new_job_id() unless given) at once"""
+        job_id = job_id or new_job_id()
+        filename = filename or SanctionLetterGenerator.filename_for(name, job_id)
+        args = (name, amount, tenure, rate, customer_data, filename)
+        submitted_at = time.perf_counter()
+        with self._lock:
+            try:
+                future = self._pool().submit(render_letter, *args)
+            except BrokenProcessPool:
+                # A worker died (OOM, kill); start a fresh pool and queue the letter there
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self.restarts += 1
+                future = self._pool().submit(render_letter, *args)
+            self._jobs[job_id] = future
+            self.submitted += 1
+            self.peak_depth = max(self.peak_depth, self.submitted - self.completed - self.failed)
+            self._forget_finished()
+        future.add_done_callback(partial(self._finished, submitted_at))
+        return job_id
+
+    def _forget_finished(self):
+        while len(self._jobs) > self.max_jobs:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if not oldest.done():
+                break
+            del self._jobs[oldest_id]
+
+    def _finished(self, submitted_at, future):
+        waited = time.perf_counter() - submitted_at
+        with self._lock:
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+                return
+            self.completed += 1
+            self._render_seconds.append(future.result()[1])
+            self._wait_seconds.append(waited)
+
+    def status(self, job_id):
+        """"pending", "ready", "failed" or "unknown" """
+        future = self._jobs.get(job_id)
+        if future is None:
+            return "unknown"
+        if not future.done():
+            return "pending"
+        if future.cancelled() or future.exception() is not None:
+            return "failed"
+        return "ready"
+
+    def result(self, job_id, timeout=None):
+        """Path of a job's letter, waiting up to timeout seconds (raises the render error, if any)"""
+        return self._jobs[job_id].result(timeout)[0]
+
+    def error(self, job_id):
+        future = self._jobs.get(job_id)
+        if future is None or not future.done() or future.cancelled():
+            return None
+        return future.exception()
+
+    def stats(self):
+        with self._lock:
+            render = list(self._render_seconds)
+            waited = list(self._wait_seconds)
+            return {
+                "workers": self.workers,
+                "depth": self.submitted - self.completed - self.failed,  # queued or rendering
+                "peak_depth": self.peak_depth,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "restarts": self.restarts,
+                "render_p50_ms": _percentile(render, 0.5) * 1000,
+                "render_p95_ms": _percentile(render, 0.95) * 1000,
+                "wait_p95_ms": _percentile(waited, 0.95) * 1000,
+            }
+
+    def close(self, wait=True):
+        # Shut down outside the lock: the pool's result thread takes it to record finished jobs
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render a sample sanction letter through the job queue")
+    parser.add_argument("name")
+    parser.add_argument("amount", type=int)
+    parser.add_argument("--tenure", type=int, default=24)
+    parser.add_argument("--rate", type=float, default=11.5)
+    parser.add_argument("--address", default="Andheri West, Mumbai")
+    parser.add_argument("--phone", default="9876543210")
+    parser.add_argument("--workers", type=int, default=PDF_WORKERS)
+    args = parser.parse_args()
+
+    queue = PdfJobQueue(workers=args.workers)
+    job_id = queue.submit(args.name, args.amount, args.tenure, args.rate,
+                          {"address": args.address, "phone": args.phone})
+    path = queue.result(job_id)
+    queue.close()
+    stats = queue.stats()
+    print(f"📄 Job {job_id}: {path} (rendered in {stats['render_p50_ms']:.0f} ms, "
+          f"{stats['wait_p95_ms']:.0f} ms from submit)")
@@ -0,0 +1,111 @@
+# session_store.py
+# Per-session MasterAgent store for the Gradio app
+# Keeps one agent per browser session with LRU + idle-TTL eviction; on_evict sees every agent dropped
+# by eviction or replaced by reset (e.g. to log the conversation), called outside the lock
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class SessionStore:
+    """Holds one agent per session ID, bounded by count (LRU) and idle time (TTL)"""
+
+    def __init__(self, factory, max_sessions=1000, idle_ttl=1800, on_evict=None):
+        self.factory = factory
+        self.on_evict = on_evict  # on_evict(session_id, agent)
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions = OrderedDict()  # session_id -> (agent, last_seen)
+        self._lock = threading.Lock()
+        self._dropped = []  # (session_id, agent) evicted under the lock, handed to on_evict after it
+        self.hits = 0
+        self.misses = 0
+        self.evicted_lru = 0
+        self.evicted_idle = 0
+
+    def get(self, session_id):
+        """Return the agent for a session, creating it on first use"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                self.hits += 1
+                self._insert(session_id, entry[0], now)
+            else:
+                self.misses += 1
+        self._notify_evicted()
+        if entry is not None:
+            return entry[0]
+
+        # Build the agent outside the lock so a slow construction never blocks other sessions
+        agent = self.factory()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                # A concurrent request for the same session got there first; keep its agent
+                agent = entry[0]
+            self._insert(session_id, agent, time.monotonic())
+        self._notify_evicted()
+        return agent
+
+    def reset(self, session_id):
+        """Replace the session's agent with a fresh one"""
+        agent = self.factory()
+        with self._lock:
+            replaced = self._sessions.get(session_id)
+            if replaced is not None:
+                self._dropped.append((session_id, replaced[0]))
+            self._insert(session_id, agent, time.monotonic())
+        self._notify_evicted()
+        return agent
+
+    def discard(self, session_id):
+        """Drop a session (e.g. when the browser tab is closed); returns its agent, if any"""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+        return entry[0] if entry is not None else None
+
+    def _insert(self, session_id, agent, now):
+        # Store as most recently seen, then trim the least recently seen past the cap
+        self._sessions[session_id] = (agent, now)
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            evicted_id, (evicted, _) = self._sessions.popitem(last=False)
+            self._dropped.append((evicted_id, evicted))
+            self.evicted_lru += 1
+
+    def _evict_idle(self, now):
+        # Entries are kept in last-seen order, so expired ones sit at the front
+        while self._sessions:
+            _, last_seen = next(iter(self._sessions.values()))
+            if now - last_seen <= self.idle_ttl:
+                break
+            evicted_id, (evicted, _) = self._sessions.popitem(last=False)
+            self._dropped.append((evicted_id, evicted))
+            self.evicted_idle += 1
+
+    def _notify_evicted(self):
+        if not self._dropped:
+            return
+        with self._lock:
+            dropped, self._dropped = self._dropped, []
+        if self.on_evict is not None:
+            for session_id, agent in dropped:
+                self.on_evict(session_id, agent)
+
+    def stats(self):
+        """Live, evicted and hit counts for monitoring"""
+        with self._lock:
+            self._evict_idle(time.monotonic())
+            stats = {
+                "live": len(self._sessions),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evicted_lru": self.evicted_lru,
+                "evicted_idle": self.evicted_idle,
+                "evicted": self.evicted_lru + self.evicted_idle,
+            }
+        self._notify_evicted()
+        return stats
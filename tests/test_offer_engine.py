@@ -0,0 +1,58 @@
+# test_offer_engine.py
+# Counter-offers and tiers must be amounts the chat's own decision approves at the rate it quotes
+#
+# Usage: python -m pytest tests
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from offer_engine import counter_offer, offer_tiers
+from underwriting_policy import default_policy as policy
+
+
+def test_counter_offer_above_an_amount_band_is_approved():
+    # 3 lakh limit, 6 lakh asked: the safe amount lands above the grid's 3 lakh band edge
+    counter = counter_offer(600_000, 40_000, 750, 300_000)
+    decision = policy.decide_one(counter["amount"], 750, 40_000, 300_000,
+                                 rate=policy.rate_for(750, counter["amount"]))
+    assert decision["status"] != "Rejected"
+    assert counter["rate"] == policy.rate_for(750, counter["amount"])
+    assert counter["emi"] == pytest.approx(decision["emi"])
+
+
+@pytest.mark.parametrize("loan_type", [None, "Medical Loan", "Education Loan"])
+def test_counter_offers_pass_decide_one(loan_type):
+    rng = np.random.default_rng(11)
+    for _ in range(300):
+        salary = float(rng.integers(15, 250) * 1000)
+        score = int(rng.integers(700, 900))
+        limit = float(rng.integers(50, 800) * 1000)
+        tenure = int(rng.integers(12, 61))
+        requested = limit * 1.9
+        counter = counter_offer(requested, salary, score, limit, tenure=tenure, loan_type=loan_type)
+        if counter["amount"]:
+            decision = policy.decide_one(counter["amount"], score, salary, limit, tenure=tenure, loan_type=loan_type)
+            assert decision["status"] != "Rejected"
+            if counter["amount"] + 1000 <= limit * policy.max_limit_multiple:
+                # ...and it is the largest such amount (to the Rs.1,000 step)
+                bigger = policy.decide_one(counter["amount"] + 1000, score, salary, limit, tenure=tenure,
+                                           loan_type=loan_type)
+                assert bigger["status"] == "Rejected"
+        if counter["full_amount_tenure"]:
+            decision = policy.decide_one(requested, score, salary, limit, tenure=counter["full_amount_tenure"],
+                                         loan_type=loan_type)
+            assert decision["status"] != "Rejected"
+            assert counter["full_amount_emi"] == pytest.approx(decision["emi"])
+
+
+def test_tiers_are_priced_at_their_own_amount():
+    for offer in offer_tiers(40_000, 750, 300_000):
+        assert offer["rate"] == policy.rate_for(750, offer["amount"])
+        decision = policy.decide_one(offer["amount"], 750, 40_000, 300_000, rate=offer["rate"])
+        assert decision["status"] != "Rejected"
@@ -0,0 +1,236 @@
+# turn_router.py
+# Rule-first routing for chat turns
+# Scores how confidently the stage's rule handler can take a message; only low-confidence
+# free text is escalated to the LLM. Button clicks and simple answers never touch the network.
+# The same compiled per-stage intent vocabularies tell the stage handlers what a reply meant.
+
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+GREETING_WORDS = {"hello", "hi", "hey", "start", "namaste"}
+NEGATIONS = {"not", "no", "don't", "dont", "never"}
+TENURE_WORDS = {"tenure", "month", "months", "year", "years", "yr", "yrs", "emi", ("change", "tenure")}
+
+# Intent vocabularies per stage, in the order that stage's rule handler checks them, plus the
+# topics of the contextual fallback (phrases are token tuples, matched on word boundaries)
+STAGE_INTENTS = {
+    "greeting": [("greet", GREETING_WORDS)],
+    "kyc_verification": [("yes", {"yes", "complete", "verify", "proceed", "ok"}), ("no", {"no", "later", "skip"})],
+    "new_customer_pitch": [("yes", {"yes", "interested", "sure", "okay", "ok", ("tell", "me"), "check"}),
+                           ("no", {"no", ("not", "interested"), ("maybe", "later")})],
+    "sales_pitch": [("yes", {"yes", "interested", "sure", "okay", "ok", ("tell", "me")}),
+                    ("no", {"no", ("not", "interested"), ("maybe", "later")})],
+    "terms_confirmation": [("yes", {"yes", "proceed", "ok", "agree", "accept", ("looks", "good")}),
+                           ("tenure", TENURE_WORDS),
+                           ("no", {"no", ("not", "okay"), ("change", "amount"), ("different", "amount")})],
+    "kyc_upload": [("yes", {"yes", "proceed", "upload", "digital", "sure"}), ("no", {"no", "later", "skip"})],
+    "conditional_docs": [("yes", {"yes", "upload", "sure", "okay"}), ("no", {"no", "later"})],
+    "sanction": [("yes", {"generate", "yes", "send", "create", "download"})],
+    "fallback": [("loan", {"loan", "loans", "money", "borrow", "credit", "finance"}),
+                 ("rates", {"rate", "rates", "interest", "charges", "cost"}),
+                 ("emi", {"emi", "emis", "payment", "payments", "monthly"}),
+                 ("documents", {"document", "documents", "paper", "papers", "require", "required", "need"}),
+                 ("help", {"help", "support", "contact"})],
+}
+
+# Tenures offered when changing terms: "24", "24 months", "2 years", "two years" -> 24
+TENURE_CHOICES = {}
+for _years, _word in enumerate(["one", "two", "three", "four", "five"], start=1):
+    _months = _years * 12
+    for _phrase in [(str(_months),), (str(_months), "month"), (str(_months), "months")]:
+        TENURE_CHOICES[_phrase] = _months
+    for _unit in ("year", "years", "yr", "yrs"):
+        TENURE_CHOICES[(str(_years), _unit)] = TENURE_CHOICES[(_word, _unit)] = _months
+# Words _extract_name would happily take as a name in "I'm ..." / "I am ..." messages
+NOT_NAMES = {"a", "an", "the", "new", "existing", "customer", "interested", "looking", "here",
+             "ready", "fine", "good", "not", "just", "from", "in", "to"}
+
+# Answers longer than this are treated as free text even if they contain a keyword
+SHORT_REPLY_TOKENS = 6
+
+
+@lru_cache(maxsize=4096)
+def tokenize(message):
+    """Lower-cased word tokens (cached: the router and the stage handler tokenize each message once)"""
+    return tuple(TOKEN_PATTERN.findall(message.lower()))
+
+
+class IntentMatcher:
+    """Phrase tables compiled from intent vocabularies; a message's tokens are walked once,
+    taking the longest phrase at each position, so "not interested" is one "no" and never a "yes"
+    """
+
+    def __init__(self, vocabularies):
+        self._tables = {}
+        for stage, intents in vocabularies.items():
+            words, phrases = {}, {}
+            for intent, vocabulary in intents:
+                for entry in vocabulary:
+                    if isinstance(entry, tuple):
+                        phrases.setdefault(entry, intent)
+                    else:
+                        words.setdefault(entry, intent)
+            self._tables[stage] = (
+                words,
+                phrases,
+                set(words) | {phrase[0] for phrase in phrases},  # tokens that can start a match
+                {phrase[0] for phrase in phrases},               # ... of more than one word
+                max((len(phrase) for phrase in phrases), default=1),
+                [intent for intent, _ in intents],
+            )
+
+    def intents(self, stage, tokens):
+        """Intents found in the tokens under a stage's vocabulary; a loose negation cancels "yes",
+        and a reply that says both yes and no counts as neither"""
+        table = self._tables.get(stage)
+        if table is None:
+            return set()
+        words, phrases, starts, phrase_starts, longest, _ = table
+        if starts.isdisjoint(tokens):
+            return set()
+        found = set()
+        negated = False
+        i, count = 0, len(tokens)
+        while i < count:
+            token, intent, size = tokens[i], None, 1
+            if token in phrase_starts:
+                for size in range(min(longest, count - i), 1, -1):
+                    intent = phrases.get(tuple(tokens[i:i + size]))
+                    if intent is not None:
+                        break
+                else:
+                    size = 1
+            if intent is None:
+                intent = words.get(token)
+            if intent is not None:
+                found.add(intent)
+            elif token in NEGATIONS:
+                negated = True
+            i += size
+        if "yes" in found and (negated or "no" in found):
+            found.discard("yes")
+            if not negated:
+                found.discard("no")
+        return found
+
+    def classify(self, stage, tokens):
+        """The stage's first intent (in handler order) found in the tokens, or None"""
+        found = self.intents(stage, tokens)
+        if not found:
+            return None
+        return next(intent for intent in self._tables[stage][-1] if intent in found)
+
+
+stage_intents = IntentMatcher(STAGE_INTENTS)
+
+
+def tenure_choice(tokens):
+    """Tenure in months named in the tokens ("24", "36 months", "3 years", "two years"), or None"""
+    for i, token in enumerate(tokens):
+        months = TENURE_CHOICES.get(tuple(tokens[i:i + 2])) or TENURE_CHOICES.get((token,))
+        if months:
+            return months
+    return None
+
+
+class RuleRouter:
+    """Per-stage confidence matchers deciding between the rule engine and the LLM"""
+
+    def __init__(self, find_name, threshold=0.8):
+        self.find_name = find_name  # tokens -> a known customer's name mentioned in them, or None
+        self.threshold = threshold
+        self.matchers = {
+            "greeting": self._match_greeting,
+            "identification": self._match_identification,
+            "kyc_verification": self._match_answer,
+            "new_customer_pitch": self._match_answer,
+            "sales_pitch": self._match_answer,
+            "new_customer_info": self._match_customer_info,
+            "loan_type_selection": self._match_loan_type,
+            "loan_requirement": self._match_amount,
+            "terms_confirmation": self._match_terms,
+            "kyc_upload": self._match_answer,
+            "underwriting": lambda agent, message, tokens: 1.0,
+            "conditional_docs": self._match_answer,
+            "sanction": self._match_answer,
+        }
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def confidence(self, agent, message):
+        """How sure we are that the rule handler for the agent's stage understands the message"""
+        matcher = self.matchers.get(agent.conversation_stage)
+        if matcher is None:
+            return 0.0
+        return matcher(agent, message, tokenize(message))
+
+    def route(self, agent, message):
+        """('rules' | 'llm', confidence) for this turn"""
+        score = self.confidence(agent, message)
+        return ("rules" if score >= self.threshold else "llm"), score
+
+    def record(self, route):
+        with self._lock:
+            self.counts[route] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts)
+
+    def _known_name_in(self, tokens):
+        return self.find_name(tokens) is not None
+
+    def _match_greeting(self, agent, message, tokens):
+        if not tokens:
+            return 0.0
+        if tokens[0] in GREETING_WORDS and len(tokens) <= SHORT_REPLY_TOKENS and not self._known_name_in(tokens):
+            return 0.95
+        if self._known_name_in(tokens) and not GREETING_WORDS.intersection(tokens):
+            return 0.9
+        return 0.0
+
+    def _match_identification(self, agent, message, tokens):
+        if self._known_name_in(tokens):
+            return 0.95
+        name = agent._extract_name(message)
+        if name and name.lower() not in NOT_NAMES and len(tokens) <= 4 and not NEGATIONS.intersection(tokens):
+            return 0.85
+        return 0.0
+
+    def _match_answer(self, agent, message, tokens):
+        if len(tokens) <= SHORT_REPLY_TOKENS and stage_intents.intents(agent.conversation_stage, tokens) & {"yes", "no"}:
+            return 0.9
+        return 0.0
+
+    def _match_customer_info(self, agent, message, tokens):
+        if "salary" not in agent.context:
+            return 0.9 if agent._extract_salary(message) else 0.0
+        if "city" not in agent.context:
+            return 0.85 if len(tokens) <= 4 and agent._extract_city(message) else 0.0
+        if "age" not in agent.context:
+            return 0.9 if len(tokens) <= SHORT_REPLY_TOKENS and agent._extract_age(message) else 0.0
+        return 0.0
+
+    def _match_loan_type(self, agent, message, tokens):
+        if len(tokens) <= SHORT_REPLY_TOKENS and agent._extract_loan_type(message):
+            return 0.9
+        return 0.0
+
+    def _match_amount(self, agent, message, tokens):
+        if len(tokens) <= 8 and agent._extract_amount(message.lower()):
+            return 0.9
+        return 0.0
+
+    def _match_terms(self, agent, message, tokens):
+        if len(tokens) > SHORT_REPLY_TOKENS:
+            return 0.0
+        intent = stage_intents.classify("terms_confirmation", tokens)
+        if intent == "yes":
+            return 0.9
+        if intent == "tenure" and tenure_choice(tokens) or intent == "no":
+            return 0.85
+        return 0.0
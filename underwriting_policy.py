@@ -0,0 +1,120 @@
+# underwriting_policy.py
+# The underwriting policy (credit score cutoff, 1x/2x pre-approved limit, EMI/salary cap)
+# One implementation for both the chat (one applicant) and batch scoring (NumPy arrays)
+# Rates come from the pricing grid (pricing.py), the same table the chat quotes from
+
+import numpy as np
+
+import finance
+from pricing import default_pricing
+
+STATUSES = np.array(["Rejected", "Approved", "Conditional"])
+REASONS = np.array([
+    "credit_score_below_threshold", "within_limit", "requires_salary_slip",
+    "emi_ratio_too_high", "exceeds_two_x_limit",
+])
+CONDITIONAL_DOCUMENTS = ["Latest salary slip", "Bank statement - last 6 months"]
+
+
+class UnderwritingPolicy:
+    """Policy thresholds; decide() scores a whole batch of applicants in one vectorized pass"""
+
+    def __init__(self, min_credit_score=700, instant_limit_multiple=1.0, max_limit_multiple=2.0,
+                 max_emi_ratio=50.0, tenure=24, pricing=default_pricing):
+        self.min_credit_score = min_credit_score
+        self.instant_limit_multiple = instant_limit_multiple
+        self.max_limit_multiple = max_limit_multiple
+        self.max_emi_ratio = max_emi_ratio
+        self.tenure = tenure
+        self.pricing = pricing
+
+    def rate_for(self, credit_score, amount, loan_type=None):
+        """Annual rate (%) for one application (loan_type None prices the grid's default type)"""
+        return self.pricing.price_one(loan_type, credit_score, amount)
+
+    def rates(self, credit_scores, amounts, loan_types=None):
+        """Annual rates (%) for arrays of applications; loan_types may be one type for all"""
+        credit_scores = np.asarray(credit_scores, dtype=float)
+        shape = np.broadcast_shapes(credit_scores.shape, np.shape(amounts))
+        loan_types = np.asarray(loan_types, dtype=object)
+        return self.pricing.price({
+            "loan_type": loan_types if loan_types.ndim == 0 else np.broadcast_to(loan_types, shape),
+            "credit_score": np.broadcast_to(credit_scores, shape),
+            "amount": np.broadcast_to(np.asarray(amounts, dtype=float), shape),
+        })
+
+    def affordable_amount(self, salary, rate, tenure):
+        """Largest amount whose EMI stays within the EMI/salary cap (whole rupees, never negative)"""
+        emi_cap = np.maximum(np.asarray(salary, dtype=float), 0) * self.max_emi_ratio / 100
+        return np.floor(finance.principal_for_emi(emi_cap, rate, tenure))
+
+    def decide(self, amount, credit_score, salary, limit, tenure=None, rate=None, loan_type=None):
+        """Decisions for arrays of applicants.
+
+        rate, if given, is the already-quoted rate per applicant; otherwise each application is
+        priced from the grid by loan_type (one type or one per applicant), credit score and
+        amount. Returns a dict of arrays: status, reason, rate, emi, emi_ratio, approved_amount
+        (0 when rejected) and max_amount (the affordable / 2x-limit ceiling for rejections
+        that have one, else 0).
+        """
+        amount = np.asarray(amount, dtype=float)
+        credit_score = np.asarray(credit_score, dtype=float)
+        salary = np.asarray(salary, dtype=float)
+        limit = np.asarray(limit, dtype=float)
+        tenure = np.asarray(self.tenure if tenure is None else tenure, dtype=float)
+
+        rate = self.rates(credit_score, amount, loan_type) if rate is None else np.broadcast_to(np.asarray(rate, dtype=float), amount.shape)
+        emi = finance.emi(amount, rate, tenure)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            emi_ratio = np.where(salary > 0, emi / salary * 100, 100.0)
+        max_amount = limit * self.max_limit_multiple
+
+        low_score = credit_score < self.min_credit_score
+        within_limit = ~low_score & (amount <= limit * self.instant_limit_multiple)
+        within_max = ~low_score & ~within_limit & (amount <= max_amount)
+        affordable = within_max & (emi_ratio <= self.max_emi_ratio)
+        unaffordable = within_max & ~affordable
+        over_max = ~low_score & ~within_limit & ~within_max
+
+        status = np.select([within_limit, affordable], [1, 2], default=0)
+        reason = np.select([low_score, within_limit, affordable, unaffordable], [0, 1, 2, 3], default=4)
+        affordable_amount = self.affordable_amount(salary, rate, tenure)
+        affordable_amount = np.minimum(affordable_amount, max_amount)
+
+        return {
+            "status": STATUSES[status],
+            "reason": REASONS[reason],
+            "rate": rate,
+            "emi": emi,
+            "emi_ratio": emi_ratio,
+            "approved_amount": np.where(status > 0, amount, 0.0),
+            "max_amount": np.select([unaffordable, over_max], [affordable_amount, max_amount], default=0.0),
+        }
+
+    def decide_one(self, amount, credit_score, salary, limit, tenure=None, rate=None, loan_type=None):
+        """Decision for one applicant, shaped like the chat's decision dict"""
+        tenure = self.tenure if tenure is None else tenure
+        rate = self.rate_for(credit_score, amount, loan_type) if rate is None else rate
+        emi = finance.emi(amount, rate, tenure)
+        emi_ratio = (emi / salary) * 100 if salary else 100
+        max_amount = int(limit * self.max_limit_multiple)
+        decision = {"rate": rate, "emi": emi, "emi_ratio": emi_ratio}
+
+        if credit_score < self.min_credit_score:
+            decision.update(status="Rejected", reason="credit_score_below_threshold",
+                            required_credit_score=self.min_credit_score)
+        elif amount <= limit * self.instant_limit_multiple:
+            decision.update(status="Approved", reason="within_limit", approved_amount=amount)
+        elif amount <= max_amount and emi_ratio <= self.max_emi_ratio:
+            decision.update(status="Conditional", reason="requires_salary_slip", approved_amount=amount,
+                            documents=list(CONDITIONAL_DOCUMENTS))
+        elif amount <= max_amount:
+            affordable = int(self.affordable_amount(salary, rate, tenure))
+            decision.update(status="Rejected", reason="emi_ratio_too_high",
+                            max_affordable_amount=min(affordable, max_amount))
+        else:
+            decision.update(status="Rejected", reason="exceeds_two_x_limit", max_eligible_amount=max_amount)
+        return decision
+
+
+default_policy = UnderwritingPolicy()